@@ -0,0 +1,459 @@
+"""
+Standalone HTTP API for the backend, for mobile clients and load-balanced
+deployments (the Streamlit app is a demo host, not an API).
+
+Endpoints (JSON in, JSON out):
+    POST   /v1/chat                {"message", "history"?, "location"?, "session_id"?, "deadline"?}
+                                   -> {"reply", "usage"}
+    POST   /v1/chat/stream         same body -> Server-Sent Events: {"delta"} events, then
+                                   a "done" event with {"timings", "usage"}
+    POST   /v1/sessions            {"location"?, "history"?} -> {"session_id"}
+    GET    /v1/sessions/<id>       -> {"session_id", "messages"}
+    DELETE /v1/sessions/<id>       -> {"session_id", "closed": true}
+    POST   /v1/journal-prompts     {"mood", "deadline"?, "user_id"?, "source"?, "note"?}
+                                   -> the prompt set (502 if generation failed)
+    GET    /healthz                -> {"status": "ok"}
+    GET    /metrics                -> Prometheus text
+
+Each worker process serves many connections concurrently on one asyncio event
+loop, using the async backend API. Workers share one listening socket, so the
+kernel spreads connections across them, and keep sessions in one shared
+SQLite file (--sessions-db) so a session works on any of them. The backend is warmed up before the
+workers are forked, and the socket only listens once a worker is serving. If
+warm-up or a worker fails, the server stops and exits with status 1. On SIGTERM
+or SIGINT a worker stops accepting, lets in-flight requests finish (up to
+--grace seconds) and exits.
+
+Usage:
+    python api_server.py --host 0.0.0.0 --port 8000 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+import traceback
+from http import HTTPStatus
+
+import backend_interface
+from session_store import SessionNotFound
+
+MAX_HEADER_BYTES = 64 * 1024
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class Request:
+    __slots__ = ("method", "path", "headers", "body")
+
+    def __init__(self, method, path, headers, body):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.body = body
+
+    @property
+    def keep_alive(self):
+        return self.headers.get("connection", "").lower() != "close"
+
+    def json(self):
+        try:
+            data = json.loads(self.body or b"{}")
+        except ValueError:
+            raise HttpError(400, "Request body must be JSON")
+        if not isinstance(data, dict):
+            raise HttpError(400, "Request body must be a JSON object")
+        return data
+
+async def read_request(reader, max_body):
+    """
+    Reads one HTTP/1.1 request. Raises asyncio.IncompleteReadError when the
+    client closes the connection between requests.
+    """
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.LimitOverrunError:
+        raise HttpError(431, "Request headers too large")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    if "transfer-encoding" in headers:
+        raise HttpError(411, "Send the body with a Content-Length")
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HttpError(400, "Invalid Content-Length")
+    if length > max_body:
+        raise HttpError(413, f"Request body over {max_body} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return Request(method.upper(), target.split("?", 1)[0], headers, body)
+
+def _field(data, name, kind, required=False):
+    value = data.get(name)
+    if value is None:
+        if required:
+            raise HttpError(400, f"'{name}' is required")
+        return None
+    if not isinstance(value, kind) or isinstance(value, bool):
+        raise HttpError(400, f"'{name}' has the wrong type")
+    return value
+
+def _history(data):
+    history = _field(data, "history", list)
+    for message in history or []:
+        if (not isinstance(message, dict) or message.get("role") not in ("user", "assistant")
+                or not isinstance(message.get("content"), str)):
+            raise HttpError(400, "'history' items must be {\"role\": \"user\"|\"assistant\", \"content\": str}")
+    return history
+
+def _sse(payload, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n".encode()
+
+class ApiServer:
+    """
+    One worker's HTTP server.
+
+    Args:
+        max_body (int): Largest accepted request body in bytes.
+        keepalive_timeout (float): Seconds an idle keep-alive connection is kept open.
+        grace (float): Seconds in-flight requests get to finish on shutdown.
+    """
+    def __init__(self, max_body=1024 * 1024, keepalive_timeout=5.0, grace=30.0):
+        self.max_body = max_body
+        self.keepalive_timeout = keepalive_timeout
+        self.grace = grace
+        self.routes = {
+            ("GET", "/healthz"): self._health,
+            ("GET", "/metrics"): self._metrics,
+            ("POST", "/v1/chat"): self._chat,
+            ("POST", "/v1/chat/stream"): self._chat_stream,
+            ("POST", "/v1/sessions"): self._open_session,
+            ("POST", "/v1/journal-prompts"): self._journal_prompts,
+        }
+        self._server = None
+        self._loop = None
+        self._stop = None
+        self._stopping = False
+        self._connections = set()
+        self._idle = set()
+
+    async def serve(self, host="127.0.0.1", port=8000, sock=None):
+        """
+        Serves until stop() is called (or SIGTERM/SIGINT arrives), then shuts down gracefully.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            try:
+                self._loop.add_signal_handler(signum, self._stop.set)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass  # Not supported on this platform or outside the main thread
+        if sock is not None:
+            self._server = await asyncio.start_server(self._handle_connection, sock=sock, limit=MAX_HEADER_BYTES)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host, port, limit=MAX_HEADER_BYTES)
+        await self._stop.wait()
+        await self._shutdown()
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    def stop(self):
+        """
+        Asks serve() to shut down gracefully; safe to call from any thread.
+        """
+        self._loop.call_soon_threadsafe(self._stop.set)
+
+    async def _shutdown(self):
+        self._stopping = True
+        self._server.close()
+        # Idle keep-alive connections are closed now; busy ones after their current response
+        for task in list(self._idle):
+            task.cancel()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.grace
+        while self._connections and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        for task in list(self._connections):
+            task.cancel()
+        if self._connections:
+            await asyncio.gather(*self._connections, return_exceptions=True)
+
+    async def _handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while not self._stopping:
+                self._idle.add(task)
+                try:
+                    request = await asyncio.wait_for(read_request(reader, self.max_body), self.keepalive_timeout)
+                except HttpError as e:
+                    await self._send_json(writer, e.status, {"error": e.message}, keep_alive=False)
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError):
+                    break
+                finally:
+                    self._idle.discard(task)
+                if not await self._dispatch(request, writer, request.keep_alive and not self._stopping):
+                    break
+        except (asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _dispatch(self, request, writer, keep_alive):
+        """
+        Answers one request. Returns whether the connection can be reused.
+        """
+        handler = self.routes.get((request.method, request.path))
+        try:
+            if handler is None and request.path.startswith("/v1/sessions/"):
+                handler = {"GET": self._session_history, "DELETE": self._close_session}.get(request.method)
+                if handler is None:
+                    raise HttpError(405, "Method not allowed")
+            elif handler is None:
+                known = any(path == request.path for _, path in self.routes)
+                raise HttpError(405 if known else 404, "Method not allowed" if known else "Not found")
+            return await handler(request, writer, keep_alive)
+        except HttpError as e:
+            await self._send_json(writer, e.status, {"error": e.message}, keep_alive)
+        except SessionNotFound as e:
+            await self._send_json(writer, 404, {"error": f"Unknown or expired session: {e.args[0]}"}, keep_alive)
+        except ConnectionError:
+            return False
+        except Exception:
+            traceback.print_exc()
+            await self._send_json(writer, 500, {"error": "Internal server error"}, keep_alive)
+        return keep_alive
+
+    async def _send(self, writer, status, body, content_type, keep_alive, extra_headers=()):
+        head = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}", f"Content-Type: {content_type}"]
+        if body is not None:
+            head.append(f"Content-Length: {len(body)}")
+        head += list(extra_headers)
+        head.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + (body or b""))
+        await writer.drain()
+
+    async def _send_json(self, writer, status, payload, keep_alive):
+        await self._send(writer, status, json.dumps(payload).encode(), "application/json", keep_alive)
+
+    @staticmethod
+    async def _chunk(writer, data):
+        writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        await writer.drain()
+
+    async def _health(self, request, writer, keep_alive):
+        await self._send_json(writer, 200, {"status": "ok"}, keep_alive)
+        return keep_alive
+
+    async def _metrics(self, request, writer, keep_alive):
+        body = backend_interface.get_metrics_text().encode()
+        await self._send(writer, 200, body, "text/plain; version=0.0.4; charset=utf-8", keep_alive)
+        return keep_alive
+
+    @staticmethod
+    def _chat_args(request):
+        data = request.json()
+        message = _field(data, "message", str, required=True)
+        args = {
+            "location": _field(data, "location", str),
+            "deadline": _field(data, "deadline", (int, float)),
+        }
+        session_id = _field(data, "session_id", str)
+        if session_id is None:
+            args["history"] = _history(data)
+        return message, session_id, args
+
+    async def _chat(self, request, writer, keep_alive):
+        message, session_id, args = self._chat_args(request)
+        usage = {}
+        if session_id is not None:
+            reply = await backend_interface.send_async(session_id, message, usage=usage, **args)
+        else:
+            reply = await backend_interface.process_chat_message_async(message, usage=usage, **args)
+        await self._send_json(writer, 200, {"reply": reply, "usage": usage}, keep_alive)
+        return keep_alive
+
+    async def _chat_stream(self, request, writer, keep_alive):
+        message, session_id, args = self._chat_args(request)
+        timings, usage = {}, {}
+        if session_id is not None:
+            stream = backend_interface.send_stream_async(session_id, message, timings=timings, usage=usage, **args)
+        else:
+            stream = backend_interface.process_chat_message_stream_async(message, timings=timings, usage=usage, **args)
+        await self._send(writer, 200, None, "text/event-stream", keep_alive,
+                         ("Cache-Control: no-cache", "Transfer-Encoding: chunked"))
+        try:
+            async for delta in stream:
+                await self._chunk(writer, _sse({"delta": delta}))
+            await self._chunk(writer, _sse({"timings": timings, "usage": usage}, event="done"))
+            await self._chunk(writer, b"")
+        except ConnectionError:
+            # The client went away; stop generating
+            await stream.aclose()
+            return False
+        return keep_alive
+
+    async def _open_session(self, request, writer, keep_alive):
+        data = request.json()
+        session_id = backend_interface.open_session(location=_field(data, "location", str),
+                                                    history=_history(data))
+        await self._send_json(writer, 201, {"session_id": session_id}, keep_alive)
+        return keep_alive
+
+    def _session_id(self, request):
+        session_id = request.path[len("/v1/sessions/"):]
+        if not session_id or "/" in session_id:
+            raise HttpError(404, "Not found")
+        return session_id
+
+    async def _session_history(self, request, writer, keep_alive):
+        session_id = self._session_id(request)
+        messages = backend_interface.get_session_history(session_id)
+        await self._send_json(writer, 200, {"session_id": session_id, "messages": messages}, keep_alive)
+        return keep_alive
+
+    async def _close_session(self, request, writer, keep_alive):
+        session_id = self._session_id(request)
+        backend_interface.close_session(session_id)
+        await self._send_json(writer, 200, {"session_id": session_id, "closed": True}, keep_alive)
+        return keep_alive
+
+    async def _journal_prompts(self, request, writer, keep_alive):
+        data = request.json()
+        mood = _field(data, "mood", str, required=True)
+        source = _field(data, "source", str)
+        if source is not None and source not in backend_interface.PROMPT_SOURCES:
+            raise HttpError(400, f"'source' must be one of {', '.join(backend_interface.PROMPT_SOURCES)}")
+        result = await backend_interface.get_journal_prompts_async(
+            mood, deadline=_field(data, "deadline", (int, float)), user_id=_field(data, "user_id", str),
+            source=source, note=_field(data, "note", str)
+        )
+        # A failed generation is the upstream API's fault, not the client's
+        await self._send_json(writer, 200 if result.ok else 502, result.to_dict(), keep_alive)
+        return keep_alive
+
+def run_worker(sock, grace):
+    """
+    Runs one worker on an already bound socket until it is told to stop. The
+    socket starts listening once the worker's server is up.
+    """
+    asyncio.run(ApiServer(grace=grace).serve(sock=sock))
+
+def bind_socket(host, port):
+    """
+    A socket bound to (host, port) but not yet listening: until a worker is
+    ready to accept, connections are refused instead of left hanging.
+    """
+    family = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0][0]
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    if os.name == "posix":
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    return sock
+
+def main(argv=None):
+    """
+    Returns:
+        int: The exit code: 0 after a clean shutdown, 1 if warm-up or a worker failed.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (default 1)")
+    parser.add_argument("--grace", type=float, default=30.0, help="seconds in-flight requests get on shutdown")
+    parser.add_argument("--sessions-db", help="SQLite file the workers share sessions through (with --workers > 1; "
+                                              "default: SESSION_STORE_PATH or a temporary file)")
+    args = parser.parse_args(argv)
+
+    if args.workers > 1:
+        # Any worker may get a session's next request, so sessions live in one file they all read
+        sessions_db = args.sessions_db or os.getenv("SESSION_STORE_PATH")
+        if not sessions_db:
+            sessions_dir = tempfile.TemporaryDirectory(prefix="api-sessions-")
+            sessions_db = os.path.join(sessions_dir.name, "sessions.sqlite3")
+        backend_interface.enable_session_store(spill_path=sessions_db, shared=True)
+
+    # Warm up once, before forking: workers inherit the trained gate and built clients,
+    # and a broken setup (e.g. no OPENAI_API_KEY) fails here instead of in every worker
+    try:
+        backend_interface.warm_up(async_api=True)
+    except Exception:
+        traceback.print_exc()
+        return 1
+
+    # Bound once in the parent so every worker accepts from the same socket
+    sock = bind_socket(args.host, args.port)
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} worker(s)", file=sys.stderr)
+    if args.workers <= 1 or not hasattr(os, "fork"):
+        try:
+            run_worker(sock, args.grace)
+        finally:
+            sock.close()
+        return 0
+
+    children = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(sock, args.grace)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        children.append(pid)
+
+    # The parent only relays shutdown signals and reaps the workers
+    stopping = False
+
+    def stop_workers():
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def forward(signum, frame):
+        nonlocal stopping
+        stopping = True
+        stop_workers()
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+
+    failed = False
+    remaining = set(children)
+    while remaining:
+        pid, status = os.wait()
+        if pid not in remaining:
+            continue
+        remaining.discard(pid)
+        if os.waitstatus_to_exitcode(status) != 0 and not stopping:
+            # A worker died on its own: take the rest down rather than serve short-handed
+            print(f"Worker {pid} exited unexpectedly; stopping the server", file=sys.stderr)
+            failed = stopping = True
+            stop_workers()
+    sock.close()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,19 +1,198 @@
 import os
-from chatbot_agent import MentalHealthChatbot
-from prompt_generator import generate_prompt
+import time
 
-# Initialize chatbot instance once to reuse connection if possible, 
-# though MentalHealthChatbot re-inits client on each call or init.
-# For stateless serverless functions, this might be re-initialized per request.
+# Heavy modules (openai, the chatbot, the prompt generator) are imported on
+# first use, so importing this module stays cheap in serverless functions that
+# may be re-initialized per request and often need only one of the features.
+# Call warm_up() to pay that cost ahead of the first request instead.
 _chatbot_instance = None
+_async_chatbot_instance = None
+_chat_usage = None
+_prompt_pool = None
+_chat_hedging = None
+_session_store = None
+
+# Where journal prompts come from by default (see set_journal_prompt_source)
+PROMPT_SOURCES = ("api", "local", "personalize")
+_prompt_source = os.getenv("JOURNAL_PROMPT_SOURCE", "api")
 
 def get_chatbot_instance():
     global _chatbot_instance
     if _chatbot_instance is None:
-        _chatbot_instance = MentalHealthChatbot()
+        from chatbot_agent import MentalHealthChatbot
+        _chatbot_instance = MentalHealthChatbot(hedging=_chat_hedging)
+        _chatbot_instance.usage = _get_chat_usage()
     return _chatbot_instance
 
-def process_chat_message(user_input, history=None, location=None):
+def get_async_chatbot_instance():
+    global _async_chatbot_instance
+    if _async_chatbot_instance is None:
+        from chatbot_agent import AsyncMentalHealthChatbot
+        _async_chatbot_instance = AsyncMentalHealthChatbot(hedging=_chat_hedging)
+        _async_chatbot_instance.usage = _get_chat_usage()
+    return _async_chatbot_instance
+
+def _get_chat_usage():
+    # One tracker for the sync and async bots, so usage stats cover every chat path
+    global _chat_usage
+    if _chat_usage is None:
+        from llm_usage import UsageTracker
+        _chat_usage = UsageTracker()
+    return _chat_usage
+
+def set_max_in_flight(max_in_flight):
+    """
+    Cap how many OpenAI requests the async API keeps in flight at once
+    (shared by chat and journal prompts). Defaults to the OPENAI_MAX_IN_FLIGHT
+    environment variable, or 64.
+    """
+    from concurrency import default_limiter
+    default_limiter.set_max_in_flight(max_in_flight)
+
+def enable_hedging(percentile=0.95, budget=0.05):
+    """
+    Hedge slow requests: when a chat reply or journal prompt request has not
+    answered by the `percentile` of recent latencies, send a second identical
+    request and use whichever answers first. Streaming chat is not hedged.
+
+    Calling it again keeps the policies that are already enabled.
+
+    Args:
+        percentile (float): Latency percentile (0-1) after which to hedge.
+        budget (float): Cap on extra requests as a share of all requests (0.05 = 5%).
+
+    Returns:
+        dict: Hedging counters (see get_hedging_stats).
+    """
+    global _chat_hedging
+    import prompt_generator
+    from hedging import HedgingPolicy
+    if _chat_hedging is None:
+        # Chat and journal prompts use different models, so their latencies are tracked apart
+        _chat_hedging = HedgingPolicy(percentile=percentile, budget=budget)
+        prompt_generator.set_hedging(HedgingPolicy(percentile=percentile, budget=budget))
+    for bot in (_chatbot_instance, _async_chatbot_instance):
+        if bot is not None:
+            bot.hedging = _chat_hedging
+    return get_hedging_stats()
+
+def get_hedging_stats():
+    """
+    Hedging counters, or None if hedging is not enabled.
+
+    Returns:
+        dict: {'chat': {...}, 'journal_prompts': {...}}, each with 'requests',
+              'hedges_fired', 'hedges_won' (the hedge answered first) and 'samples'.
+    """
+    if _chat_hedging is None:
+        return None
+    import prompt_generator
+    return {"chat": _chat_hedging.stats(), "journal_prompts": prompt_generator.hedging.stats()}
+
+def enable_prompt_pool(size=3, ttl=3600, prewarm=False):
+    """
+    Serve journal prompts from an in-memory pool of pre-generated sets per mood.
+
+    Calling it again returns the pool that is already enabled.
+
+    Args:
+        size (int): Ready-made prompt sets kept per mood.
+        ttl (int): Seconds before an unused set is discarded.
+        prewarm (bool): If True, start filling every mood's pool in the background now
+                        (one API call per set); otherwise each pool fills after its first request.
+
+    Returns:
+        PromptPool: The active pool (see PromptPool.stats() for hit/miss/refill counters).
+    """
+    global _prompt_pool
+    if _prompt_pool is None:
+        from prompt_pool import PromptPool
+        _prompt_pool = PromptPool(size=size, ttl=ttl)
+        if prewarm:
+            _prompt_pool.prewarm()
+    return _prompt_pool
+
+def enable_prompt_cache(path, ttl=86400, max_entries=10000, max_bytes=50 * 1024 * 1024):
+    """
+    Cache generated journal prompts in a SQLite file shared by all worker processes.
+
+    Workers pointed at the same file reuse each other's results and keep them
+    across restarts. Setting the PROMPT_CACHE_PATH environment variable does the
+    same with default limits.
+
+    Args:
+        path (str): Path of the SQLite cache file (created if missing).
+        ttl (int): Seconds a cached prompt set stays valid.
+        max_entries (int): Least recently used entries are evicted above this count.
+        max_bytes (int): Least recently used entries are evicted above this total size.
+
+    Returns:
+        PersistentCache: The active cache (see PersistentCache.stats()).
+    """
+    import prompt_generator
+    from persistent_cache import PersistentCache
+    cache = PersistentCache(path, ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+    prompt_generator.set_cache(cache)
+    return cache
+
+def get_prompt_pool_stats():
+    """
+    Hit/miss/refill counters for the journal prompt pool, or None if it is not enabled.
+    """
+    return _prompt_pool.stats() if _prompt_pool is not None else None
+
+def get_circuit_breaker_stats():
+    """
+    State of the API circuit breakers. While a breaker is open, its feature is
+    served from the offline fallback bank without calling the API.
+
+    Returns:
+        dict: {'chat': {...}, 'journal_prompts': {...}}, each with 'state'
+              ('closed', 'open' or 'half_open'), 'consecutive_failures',
+              'times_opened' and 'rejected' (calls answered from the fallback bank).
+    """
+    from circuit_breaker import get_breaker
+    return {name: get_breaker(name).stats() for name in ("chat", "journal_prompts")}
+
+def get_model_routing_stats(recent=20):
+    """
+    How chat turns were split between the fast model and the web-search model.
+
+    Args:
+        recent (int, optional): How many of the latest decisions to include. Defaults to 20.
+
+    Returns:
+        dict: 'decisions' (total), 'by_model' and 'by_reason' counts, and 'recent': the
+              latest decisions, each with 'time', 'model', 'reason', 'chars' (message
+              length) and the 'signals' it was based on. Message text is never kept.
+    """
+    from model_router import get_decision_log
+    log = get_decision_log()
+    return {**log.stats(), "recent": log.recent(recent)}
+
+def get_metrics_text():
+    """
+    Per-call metrics for chat and journal prompts in the Prometheus text format:
+    request and error counts (by exception class), latency and time-to-first-token
+    histograms and token counts, labeled by feature and model.
+
+    Returns:
+        str: The exposition text, e.g. for a /metrics route of your own.
+    """
+    from metrics import registry
+    return registry.export_prometheus()
+
+def start_metrics_server(port=9464, host="127.0.0.1"):
+    """
+    Serve get_metrics_text() at http://host:port/metrics from a background thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server (call shutdown() to stop it).
+    """
+    from metrics import serve_metrics
+    return serve_metrics(port=port, host=host)
+
+def process_chat_message(user_input, history=None, location=None, usage=None, deadline=None):
     """
     Process a user's chat message and return the bot's response.
 
@@ -24,14 +203,268 @@ def process_chat_message(user_input, history=None, location=None):
                                   Defaults to empty list.
         location (str, optional): User's current location (e.g. "New York, USA") 
                                   for crisis resource localization.
+        usage (dict, optional): Filled in with the call's 'prompt_tokens', 'completion_tokens'
+                                and 'cached_tokens' (prompt tokens served from the provider's cache).
+        deadline (float, optional): Seconds the call may take in total. If no reply arrives
+                                    in time, a supportive reply from the offline fallback
+                                    bank is returned instead.
 
     Returns:
         str: The text response from the chatbot.
     """
     bot = get_chatbot_instance()
-    return bot.get_response(user_input, conversation_history=history, user_location=location)
+    return bot.get_response(user_input, conversation_history=history, user_location=location, usage=usage, deadline=deadline)
+
+def process_chat_message_stream(user_input, history=None, location=None, timings=None, usage=None, deadline=None):
+    """
+    Stream the bot's response to a user's chat message as it is generated.
+
+    Args:
+        user_input (str): The message text from the user.
+        history (list, optional): List of previous message dictionaries 
+                                  [{'role': 'user'|'assistant', 'content': '...'}].
+                                  Defaults to empty list.
+        location (str, optional): User's current location (e.g. "New York, USA") 
+                                  for crisis resource localization.
+        timings (dict, optional): Filled in with 'first_token' and 'total' latencies
+                                  (seconds) once the stream has been consumed.
+        usage (dict, optional): Filled in with token counts (see process_chat_message)
+                                once the stream has been consumed.
+        deadline (float, optional): Seconds allowed until the stream starts (see process_chat_message).
+
+    Yields:
+        str: Text deltas of the chatbot's response. Joined together they form
+             the same text process_chat_message would return.
+    """
+    bot = get_chatbot_instance()
+    return bot.get_response_stream(user_input, conversation_history=history, user_location=location, timings=timings, usage=usage, deadline=deadline)
+
+def get_usage_stats():
+    """
+    Token usage totals since startup for chat (sync, async and streaming
+    alike) and journal prompts.
+
+    Returns:
+        dict: {'chat': {...}, 'journal_prompts': {...}}, each with 'calls',
+              'prompt_tokens', 'completion_tokens', 'cached_tokens' and
+              'cache_hit_rate' (share of prompt tokens served from the provider's cache).
+    """
+    import prompt_generator
+    return {
+        "chat": _get_chat_usage().totals(),
+        "journal_prompts": prompt_generator.usage_tracker.totals(),
+    }
+
+def enable_session_store(max_sessions=10000, idle_ttl=3600, max_messages=200, max_chars=100000, spill_path=None,
+                         shared=False):
+    """
+    Configure where chat sessions (see open_session) are kept. Without a call,
+    sessions live in memory with the default limits, spilling to the file named
+    by the SESSION_STORE_PATH environment variable if it is set.
+
+    In-memory sessions are only visible to the process that opened them. When
+    several worker processes serve the same clients (api_server.py --workers N),
+    pass shared=True so every session lives in the SQLite file at `spill_path`.
+
+    Sessions already open in the previous store are discarded.
+
+    Args:
+        max_sessions (int): Sessions kept in memory; the least recently used beyond this
+                            are dropped, or moved to `spill_path` if given.
+        idle_ttl (int): Seconds without a message after which a session is deleted.
+        max_messages (int): Messages kept per session (older ones are dropped).
+        max_chars (int): Characters of message text kept per session.
+        spill_path (str): Optional. SQLite file for sessions evicted from memory; they
+                          are loaded back on their next message.
+        shared (bool): Keep every session only in the file at `spill_path`, which any
+                       process on the host can read (see SharedSessionStore).
+
+    Returns:
+        SessionStore: The active store (see SessionStore.stats()).
+
+    Raises:
+        ValueError: If `shared` is set without a `spill_path`.
+    """
+    global _session_store
+    from session_store import SessionStore, SharedSessionStore
+    if shared:
+        if not spill_path:
+            raise ValueError("A shared session store needs a spill_path")
+        _session_store = SharedSessionStore(spill_path, max_sessions=max_sessions, idle_ttl=idle_ttl,
+                                            max_messages=max_messages, max_chars=max_chars)
+    else:
+        _session_store = SessionStore(max_sessions=max_sessions, idle_ttl=idle_ttl, max_messages=max_messages,
+                                      max_chars=max_chars, spill_path=spill_path)
+    return _session_store
+
+def get_session_store():
+    global _session_store
+    if _session_store is None:
+        from session_store import SessionStore
+        _session_store = SessionStore(spill_path=os.getenv("SESSION_STORE_PATH"))
+    return _session_store
+
+def open_session(location=None, history=None):
+    """
+    Start a chat session whose history is kept server-side. Send messages with
+    send(session_id, text): only the new message travels with each request.
+
+    Args:
+        location (str, optional): User's location for crisis resource localization,
+                                  used for every message of the session.
+        history (list, optional): Earlier messages to start from (same format as
+                                  process_chat_message's `history`).
+
+    Returns:
+        str: The session id.
+    """
+    return get_session_store().open(history=history, location=location)
+
+def close_session(session_id):
+    """
+    Delete a session and its history.
+    """
+    get_session_store().close(session_id)
 
-def generate_journal_prompts(mood):
+def get_session_history(session_id):
+    """
+    The session's messages so far, oldest first (e.g. to render a chat after a reload).
+
+    Raises:
+        SessionNotFound: If the session does not exist or has expired.
+    """
+    return get_session_store().history(session_id)
+
+_ERROR_PREFIX = "Error generating response: "
+
+def is_error_reply(reply):
+    """
+    Whether a chat reply (from process_chat_message, send or their streaming
+    variants, joined) is or ends in an "Error generating response" message
+    rather than being all text from the model.
+    """
+    return reply.startswith(_ERROR_PREFIX) or f"\n\n{_ERROR_PREFIX}" in reply
+
+def _record_turn(store, session_id, user_input, reply):
+    # Failed replies are not part of the conversation the model should see
+    if is_error_reply(reply):
+        return
+    store.append(session_id, {"role": "user", "content": user_input}, {"role": "assistant", "content": reply})
+
+def send(session_id, user_input, location=None, usage=None, deadline=None):
+    """
+    Send a message in a session and return the bot's response. The session's
+    history is used as context, and the exchange is added to it.
+
+    Args:
+        session_id (str): An id returned by open_session.
+        user_input (str): The message text from the user.
+        location (str, optional): Overrides the session's location for this message.
+        usage (dict, optional): See process_chat_message.
+        deadline (float, optional): See process_chat_message.
+
+    Returns:
+        str: The text response from the chatbot.
+
+    Raises:
+        SessionNotFound: (a KeyError) If the session does not exist or has expired; open a new one.
+    """
+    store = get_session_store()
+    session = store.get(session_id)
+    reply = get_chatbot_instance().get_response(user_input, conversation_history=session.messages,
+                                                user_location=location or session.location, usage=usage,
+                                                deadline=deadline)
+    _record_turn(store, session_id, user_input, reply)
+    return reply
+
+def send_stream(session_id, user_input, location=None, timings=None, usage=None, deadline=None):
+    """
+    Streaming version of send; takes the same arguments plus `timings` (see
+    process_chat_message_stream). The exchange is added to the session once the
+    stream has been consumed.
+
+    Yields:
+        str: Text deltas of the chatbot's response.
+    """
+    store = get_session_store()
+    session = store.get(session_id)
+    deltas = get_chatbot_instance().get_response_stream(user_input, conversation_history=session.messages,
+                                                        user_location=location or session.location,
+                                                        timings=timings, usage=usage, deadline=deadline)
+
+    def stream():
+        parts = []
+        for delta in deltas:
+            parts.append(delta)
+            yield delta
+        _record_turn(store, session_id, user_input, "".join(parts))
+    return stream()
+
+async def send_async(session_id, user_input, location=None, usage=None, deadline=None):
+    """
+    Async version of send; takes the same arguments.
+    """
+    store = get_session_store()
+    session = store.get(session_id)
+    reply = await get_async_chatbot_instance().get_response(user_input, conversation_history=session.messages,
+                                                            user_location=location or session.location,
+                                                            usage=usage, deadline=deadline)
+    _record_turn(store, session_id, user_input, reply)
+    return reply
+
+def send_stream_async(session_id, user_input, location=None, timings=None, usage=None, deadline=None):
+    """
+    Async version of send_stream; takes the same arguments.
+
+    Returns:
+        An async iterator of text deltas (use `async for`).
+    """
+    store = get_session_store()
+    session = store.get(session_id)
+    deltas = get_async_chatbot_instance().get_response_stream(user_input, conversation_history=session.messages,
+                                                              user_location=location or session.location,
+                                                              timings=timings, usage=usage, deadline=deadline)
+
+    async def stream():
+        parts = []
+        async for delta in deltas:
+            parts.append(delta)
+            yield delta
+        _record_turn(store, session_id, user_input, "".join(parts))
+    return stream()
+
+def get_session_stats():
+    """
+    Counters for the session store: sessions in memory ('active'), opened,
+    expired, dropped or spilled to disk under memory pressure, and restored.
+    """
+    return get_session_store().stats()
+
+def set_journal_prompt_source(source):
+    """
+    Choose where journal prompts come from when a call doesn't say. Defaults to the
+    JOURNAL_PROMPT_SOURCE environment variable, or "api".
+
+    Args:
+        source (str): "api" generates each set with the model. "local" draws it from
+                      the bundled question bank in microseconds, without an API call.
+                      "personalize" draws locally, then has the model reword the set.
+    """
+    global _prompt_source
+    _prompt_source = _check_prompt_source(source)
+
+def _check_prompt_source(source):
+    if source not in PROMPT_SOURCES:
+        raise ValueError(f"Unknown journal prompt source {source!r}; expected one of {', '.join(PROMPT_SOURCES)}")
+    return source
+
+def _draw_local_prompts(mood, user_id):
+    from question_bank import get_question_bank
+    from metrics import registry as metrics
+    metrics.record_local_reply("journal_prompts", "question_bank")
+    return get_question_bank().draw(mood, user_id=user_id)
+
+def generate_journal_prompts(mood, deadline=None, user_id=None, source=None, note=None):
     """
     Generate a list of journal prompts based on the user's mood.
 
@@ -39,9 +472,222 @@ def generate_journal_prompts(mood):
         mood (str): The user's current mood. 
                     Valid values: "excellent", "very good", "good", "okay", "neutral", 
                                   "slightly off", "low", "stressed", "sad", "awful".
+        deadline (float, optional): Seconds the call may take in total. If no prompt set
+                                    arrives in time, the mood's curated offline set is returned.
+        user_id (str, optional): Seeds local draws per user and day, and keeps questions
+                                 the user saw recently, even reworded, out of their next sets.
+        source (str, optional): "api", "local" or "personalize" (see set_journal_prompt_source).
+                                Defaults to the process-wide setting.
+        note (str, optional): What the user shared about their day, used by "personalize".
+
+    Returns:
+        str: A JSON string containing the mood and a list of questions, or an "error" key.
+             Example: '{"mood": "happy", "questions": [{"question": "Q1"}, ...]}'
+    """
+    return get_journal_prompts(mood, deadline=deadline, user_id=user_id, source=source, note=note).to_json()
+
+def get_journal_prompts(mood, deadline=None, user_id=None, source=None, note=None):
+    """
+    Like generate_journal_prompts, but returns the validated result itself, so
+    callers don't have to parse JSON.
+
+    Returns:
+        PromptSet or PromptError: Check `.ok`. A PromptSet has `.mood`, `.questions`
+            (a tuple of at least 6 strings) and `.fallback`; a PromptError has `.kind`
+            ("api_error" or "invalid_response") and `.message`. Both have `.to_json()`.
+    """
+    source = _check_prompt_source(source or _prompt_source)
+    if source == "local":
+        return _draw_local_prompts(mood, user_id)
+    from llm_client import Deadline
+    deadline = Deadline.coerce(deadline)
+    if source == "personalize":
+        from prompt_generator import personalize_prompt
+        result = personalize_prompt(_draw_local_prompts(mood, user_id), note=note, deadline=deadline)
+    else:
+        result = _prompt_pool.take(mood) if _prompt_pool is not None else None
+        if result is None:
+            from prompt_generator import generate_prompt
+            result = generate_prompt(mood, deadline=deadline)
+    if user_id is None or not result.ok or result.fallback:
+        return result
+
+    kept, dropped, missing = _filter_repeats(result, user_id)
+    extra = []
+    if missing:
+        from prompt_generator import top_up_prompt
+        extra = top_up_prompt(result.mood, missing, kept + dropped, deadline=deadline)
+    return _complete_set(result, user_id, kept, dropped, extra)
+
+def _filter_repeats(result, user_id):
+    """
+    Drops questions that repeat, in other words, one the user was served recently
+    or one earlier in the same set. Returns (kept, dropped, slots to top up).
+    """
+    from question_dedup import get_question_dedup
+    from prompt_schema import MIN_QUESTIONS
+    kept, dropped = get_question_dedup().filter(user_id, result.questions)
+    return kept, dropped, max(0, MIN_QUESTIONS - len(kept))
+
+def _complete_set(result, user_id, kept, dropped, extra):
+    # Only the missing slots are filled: first from the model's top-up answer,
+    # then, if that fell short, from the local question bank
+    if not dropped:
+        return result
+    from question_dedup import get_question_dedup
+    from prompt_schema import MIN_QUESTIONS, PromptSet
+    dedup = get_question_dedup()
+    if len(kept) < MIN_QUESTIONS and extra:
+        kept += dedup.top_up(user_id, extra, MIN_QUESTIONS - len(kept))[0]
+    if len(kept) < MIN_QUESTIONS:
+        from question_bank import get_question_bank
+        kept += dedup.top_up(user_id, get_question_bank().draw(result.mood).questions, MIN_QUESTIONS - len(kept))[0]
+    if len(kept) < MIN_QUESTIONS:
+        # The user has recently seen everything on offer. Repeats from the model's
+        # set beat a short one, and the set had at least MIN_QUESTIONS to start with
+        kept += dropped[:MIN_QUESTIONS - len(kept)]
+    return PromptSet(result.mood, kept, fallback=result.fallback)
+
+def generate_journal_prompts_batch(moods, max_workers=8, pack=False):
+    """
+    Generate journal prompts for many moods (e.g. many users) at once.
+
+    Requests run concurrently on a bounded worker pool, and each mood succeeds
+    or fails on its own.
+
+    Args:
+        moods (list): Moods to generate prompts for, one per user or slot.
+        max_workers (int, optional): Most requests in flight at once. Defaults to 8.
+        pack (bool, optional): Ask for several moods in one JSON-mode request and split
+                               the answer (fewer, larger requests). Defaults to False.
+
+    Returns:
+        list: One dict per input mood, in input order:
+              {'mood': str, 'result': JSON string as from generate_journal_prompts or None,
+               'error': str or None, 'elapsed': seconds, 'packed': bool}
+    """
+    from prompt_generator import generate_prompts_batch
+    results = generate_prompts_batch(moods, max_workers=max_workers, pack=pack)
+    for item in results:
+        if item["result"] is not None:
+            item["result"] = item["result"].to_json()
+    return results
+
+def pregenerate_journal_prompts(moods=None, job_id=None, wait=True, timeout=None, store=None):
+    """
+    Fill the prompt cache ahead of time through the Batch API (see prompt_batch.py),
+    e.g. from a nightly job. Slower to finish but cheaper than generating on demand.
+
+    Args:
+        moods (list or dict, optional): Moods to generate, or a dict of key -> mood with a
+                                        custom `store`. Defaults to every mood.
+        job_id (str, optional): Names the run, so a retried job reuses its batch instead of
+                                submitting another. Defaults to journal-prompts-<today>.
+        wait (bool, optional): Wait for the batch and store its results. Defaults to True.
+        timeout (float, optional): Seconds to wait before raising DeadlineExceeded.
+        store (callable, optional): store(key, prompt_set) for each valid result. Defaults
+                                    to the prompt cache (see enable_prompt_cache).
+
+    Returns:
+        dict: 'job_id', 'batch_id', 'status', 'submitted', 'stored', 'failed', 'failures'.
+    """
+    import prompt_generator
+    from prompt_batch import PromptBatchRunner, default_job_id
+    return PromptBatchRunner().run(
+        moods if moods is not None else prompt_generator.valid_moods, job_id or default_job_id(),
+        store=store, wait=wait, timeout=timeout
+    )
+
+async def process_chat_message_async(user_input, history=None, location=None, usage=None, deadline=None):
+    """
+    Async version of process_chat_message; takes the same arguments.
+
+    Many calls can be awaited concurrently from one event loop; the number of
+    requests actually in flight is capped (see set_max_in_flight).
+
+    Returns:
+        str: The text response from the chatbot.
+    """
+    bot = get_async_chatbot_instance()
+    return await bot.get_response(user_input, conversation_history=history, user_location=location, usage=usage, deadline=deadline)
+
+def process_chat_message_stream_async(user_input, history=None, location=None, timings=None, usage=None, deadline=None):
+    """
+    Async version of process_chat_message_stream; takes the same arguments.
+
+    Returns:
+        An async iterator of text deltas (use `async for`).
+    """
+    bot = get_async_chatbot_instance()
+    return bot.get_response_stream(user_input, conversation_history=history, user_location=location, timings=timings, usage=usage, deadline=deadline)
+
+async def generate_journal_prompts_async(mood, deadline=None, user_id=None, source=None, note=None):
+    """
+    Async version of generate_journal_prompts; takes the same arguments.
 
     Returns:
         str: A JSON string containing the mood and a list of questions.
-             Example: '{"mood": "happy", "questions": ["Q1", "Q2"]}'
     """
-    return generate_prompt(mood)
+    return (await get_journal_prompts_async(mood, deadline=deadline, user_id=user_id, source=source, note=note)).to_json()
+
+async def get_journal_prompts_async(mood, deadline=None, user_id=None, source=None, note=None):
+    """
+    Async version of get_journal_prompts; takes the same arguments.
+
+    Returns:
+        PromptSet or PromptError: See get_journal_prompts.
+    """
+    source = _check_prompt_source(source or _prompt_source)
+    if source == "local":
+        return _draw_local_prompts(mood, user_id)
+    from llm_client import Deadline
+    deadline = Deadline.coerce(deadline)
+    if source == "personalize":
+        from prompt_generator import personalize_prompt_async
+        result = await personalize_prompt_async(_draw_local_prompts(mood, user_id), note=note, deadline=deadline)
+    else:
+        result = _prompt_pool.take(mood) if _prompt_pool is not None else None
+        if result is None:
+            from prompt_generator import generate_prompt_async
+            result = await generate_prompt_async(mood, deadline=deadline)
+    if user_id is None or not result.ok or result.fallback:
+        return result
+
+    kept, dropped, missing = _filter_repeats(result, user_id)
+    extra = []
+    if missing:
+        from prompt_generator import top_up_prompt_async
+        extra = await top_up_prompt_async(result.mood, missing, kept + dropped, deadline=deadline)
+    return _complete_set(result, user_id, kept, dropped, extra)
+
+def warm_up(chat=True, journal_prompts=True, async_api=False):
+    """
+    Import dependencies and build clients now instead of on the first request
+    (e.g. in a serverless init phase or right after a worker starts). No API
+    requests are made.
+
+    Args:
+        chat (bool): Prepare the chatbot (client, topic gate, token counter).
+        journal_prompts (bool): Prepare the journal prompt generator, its client and the question bank.
+        async_api (bool): Also prepare the async variants.
+
+    Returns:
+        dict: Seconds spent on each part that was warmed up.
+    """
+    timings = {}
+    if chat:
+        start = time.perf_counter()
+        get_chatbot_instance().warm_up()
+        if async_api:
+            get_async_chatbot_instance().warm_up()
+        timings["chat"] = time.perf_counter() - start
+    if journal_prompts:
+        start = time.perf_counter()
+        import prompt_generator
+        prompt_generator.get_client()
+        if async_api:
+            prompt_generator.get_async_client()
+        from question_bank import get_question_bank
+        get_question_bank()
+        timings["journal_prompts"] = time.perf_counter() - start
+    return timings
@@ -0,0 +1,204 @@
+"""
+Offline benchmark for the backend against a local stub of the OpenAI API.
+
+Drives backend_interface.process_chat_message(_stream) and
+generate_journal_prompts at several concurrency levels and history lengths,
+and reports throughput, p50/p95/p99 latency and the per-call overhead beyond
+the time requests spent in the (stub) server. No API key or network is needed.
+
+Usage:
+    python benchmark.py                      # full run, writes benchmark_results/<commit>.json
+    python benchmark.py --quick              # a smaller run for quick checks
+    python benchmark.py --compare benchmark_results/<older commit>.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from stub_openai_server import StubOpenAIServer, latency_profile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CHAT_MESSAGE = "I've been feeling stressed about work lately and I can't switch off in the evenings."
+MOODS = ["Excited", "Happy", "Calm", "Neutral", "Tired", "Slightly Off", "Anxious", "Stressed", "Sad", "Awful"]
+
+def scenarios(quick):
+    """
+    The scenario grid. Each entry sets the feature under test and the stub's behavior.
+    """
+    concurrency = [1, 8] if quick else [1, 8, 32]
+    histories = [0, 40] if quick else [0, 10, 40]
+    grid = []
+    for c in concurrency:
+        for h in histories:
+            grid.append({"feature": "chat", "concurrency": c, "history": h})
+        grid.append({"feature": "journal_prompts", "concurrency": c, "history": 0})
+    grid.append({"feature": "chat_stream", "concurrency": 8, "history": 10, "chunk_delay": 0.005})
+    grid.append({"feature": "chat", "concurrency": 8, "history": 10, "error_rate": 0.05})
+    grid.append({"feature": "chat", "concurrency": 8, "history": 10, "profile": "bimodal"})
+    for s in grid:
+        s.setdefault("profile", "lognormal")
+        s.setdefault("error_rate", 0.0)
+        s.setdefault("chunk_delay", 0.0)
+        s["name"] = (f"{s['feature']}/c{s['concurrency']}/h{s['history']}/{s['profile']}"
+                     + (f"/err{s['error_rate']:g}" if s["error_rate"] else ""))
+    return grid
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = p / 100 * (len(ordered) - 1)
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def build_history(length):
+    history = []
+    for n in range(length):
+        if n % 2 == 0:
+            history.append({"role": "user", "content": f"Message {n}: work has been piling up and I keep replaying meetings in my head."})
+        else:
+            history.append({"role": "assistant", "content": f"Reply {n}: that sounds exhausting. What part of it stays with you the most?"})
+    return history
+
+def _classify(feature, result):
+    if feature == "journal_prompts":
+        data = json.loads(result)
+        return "error" if "error" in data else "fallback" if data.get("fallback") else "ok"
+    from fallback_bank import get_fallback_bank
+    if result.startswith("Error generating response"):
+        return "error"
+    return "fallback" if result in get_fallback_bank().chat_replies else "ok"
+
+def _one_call(scenario, history, index):
+    import backend_interface
+    feature = scenario["feature"]
+    timings = {}
+    start = time.perf_counter()
+    if feature == "journal_prompts":
+        result = backend_interface.generate_journal_prompts(MOODS[index % len(MOODS)])
+    elif feature == "chat_stream":
+        result = "".join(backend_interface.process_chat_message_stream(CHAT_MESSAGE, history=history, timings=timings))
+    else:
+        result = backend_interface.process_chat_message(CHAT_MESSAGE, history=history)
+    return time.perf_counter() - start, timings.get("first_token"), _classify(feature, result)
+
+def run_scenario(server, scenario, requests):
+    from circuit_breaker import get_breaker
+    for name in ("chat", "journal_prompts"):
+        get_breaker(name).reset()
+    server.latency = latency_profile(scenario["profile"], median=scenario["median"], seed=1)
+    server.error_rate = scenario["error_rate"]
+    server.chunk_delay = scenario["chunk_delay"]
+    server.server_times.clear()
+    history = build_history(scenario["history"])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=scenario["concurrency"]) as executor:
+        results = list(executor.map(lambda i: _one_call(scenario, history, i), range(requests)))
+    wall = time.perf_counter() - start
+
+    latencies = [r[0] for r in results]
+    first_tokens = [r[1] for r in results if r[1] is not None]
+    outcomes = [r[2] for r in results]
+    server_total = sum(server.server_times)
+    ms = lambda seconds: None if seconds is None else round(seconds * 1000, 2)
+    return {
+        **scenario,
+        "requests": requests,
+        "api_requests": len(server.server_times),
+        "errors": outcomes.count("error"),
+        "fallbacks": outcomes.count("fallback"),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(requests / wall, 2),
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(sum(latencies) / len(latencies)),
+        "ttft_p50_ms": ms(percentile(first_tokens, 50)),
+        "server_ms_per_call": ms(server_total / requests),
+        # Everything a call spends outside the stub: our code, the SDK, loopback HTTP
+        "overhead_ms_per_call": ms((sum(latencies) - server_total) / requests),
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(old, new):
+    """
+    Prints per-scenario changes between two result files.
+    """
+    old_by_name = {s["name"]: s for s in old["scenarios"]}
+    print(f"\nCompared with {old.get('commit')}:")
+    print(f"{'scenario':45} {'p50':>16} {'p95':>16} {'rps':>14} {'overhead':>14}")
+    for s in new["scenarios"]:
+        before = old_by_name.get(s["name"])
+        if before is None:
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms", "throughput_rps", "overhead_ms_per_call"):
+            a, b = before[key], s[key]
+            change = f"{(b - a) / a:+.0%}" if a else "n/a"
+            cells.append(f"{b:>9} ({change:>4})")
+        print(f"{s['name']:45} " + " ".join(cells))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="fewer scenarios and requests")
+    parser.add_argument("--requests", type=int, help="calls per scenario (default 64, or 24 with --quick)")
+    parser.add_argument("--median-latency", type=float, default=0.1, help="stub median latency in seconds")
+    parser.add_argument("--output", help="results file (default benchmark_results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+    requests = args.requests or (24 if args.quick else 64)
+
+    with StubOpenAIServer() as server:
+        # Point every client at the stub before anything builds one
+        os.environ["OPENAI_BASE_URL"] = server.url
+        os.environ["OPENAI_API_KEY"] = "stub-key"
+        os.environ.pop("PROMPT_CACHE_PATH", None)
+        import backend_interface
+        backend_interface.warm_up()
+
+        results = []
+        for scenario in scenarios(args.quick):
+            scenario["median"] = args.median_latency
+            result = run_scenario(server, scenario, requests)
+            results.append(result)
+            print(f"{result['name']:45} {result['throughput_rps']:>8} rps  p50 {result['p50_ms']:>8}ms  "
+                  f"p95 {result['p95_ms']:>8}ms  p99 {result['p99_ms']:>8}ms  overhead {result['overhead_ms_per_call']:>7}ms"
+                  + (f"  errors {result['errors']}" if result["errors"] else "")
+                  + (f"  fallbacks {result['fallbacks']}" if result["fallbacks"] else ""))
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "scenarios": results,
+    }
+    output = args.output or os.path.join(HERE, "benchmark_results", f"{commit or 'results'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+    return report
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,84 @@
+"""
+Benchmark of the near-duplicate question filter (question_dedup.py).
+
+Builds prompt sets from the local question bank, with some questions reworded
+slightly as a model would, and times filtering each set against a user's index
+that already holds a full history. The bank is small, so most questions turn
+out to be repeats; that is the costly case, since every lookup has candidates
+to check. No API key or network is needed.
+
+Usage:
+    python benchmark_dedup.py               # 2000 sets
+    python benchmark_dedup.py --sets 10000 --per-user 128
+"""
+import argparse
+import random
+import sys
+import time
+
+from question_bank import get_question_bank
+from question_dedup import QuestionDedup
+
+# Small edits of the kind that make a repeated question look new
+REWORDINGS = [
+    lambda q: q.replace("today", "lately"),
+    lambda q: q.rstrip("?") + " right now?",
+    lambda q: "Thinking about it, " + q[0].lower() + q[1:],
+    lambda q: q.replace("What", "Which thing"),
+]
+
+def build_sets(count, seed=7):
+    rng = random.Random(seed)
+    bank = get_question_bank()
+    moods = list(bank.moods)
+    sets = []
+    for n in range(count):
+        questions = list(bank.draw(moods[n % len(moods)], day=str(n)).questions)
+        for i in range(len(questions)):
+            if rng.random() < 0.25:
+                questions[i] = rng.choice(REWORDINGS)(questions[i])
+        sets.append(questions)
+    return sets
+
+def measure(sets=2000, users=50, per_user=64):
+    """
+    Filters `sets` prompt sets spread over `users` users.
+
+    Returns:
+        dict: us_per_set and us_per_question (mean filter cost), checked and dropped counts.
+    """
+    prompt_sets = build_sets(sets)
+    dedup = QuestionDedup(per_user=per_user)
+    # Fill every user's index first, so the timed filters run against full indexes
+    for n, questions in enumerate(build_sets(users * (per_user // 6 + 1), seed=11)):
+        dedup.filter(f"user-{n % users}", questions)
+
+    dropped_before = dedup.stats()["dropped"]
+    start = time.perf_counter()
+    for n, questions in enumerate(prompt_sets):
+        dedup.filter(f"user-{n % users}", questions)
+    elapsed = time.perf_counter() - start
+
+    checked = sum(len(questions) for questions in prompt_sets)
+    return {
+        "us_per_set": elapsed / sets * 1e6,
+        "us_per_question": elapsed / checked * 1e6,
+        "checked": checked,
+        "dropped": dedup.stats()["dropped"] - dropped_before,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sets", type=int, default=2000, help="prompt sets to filter")
+    parser.add_argument("--users", type=int, default=50, help="users the sets are spread over")
+    parser.add_argument("--per-user", type=int, default=64, help="questions kept in each user's index")
+    args = parser.parse_args(argv)
+
+    result = measure(args.sets, args.users, args.per_user)
+    print(f"{args.sets} sets, {result['checked']} questions, {args.users} users with {args.per_user} questions each")
+    print(f"filter cost: {result['us_per_set']:.1f}us per set, {result['us_per_question']:.1f}us per question")
+    print(f"dropped as near-duplicates: {result['dropped']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
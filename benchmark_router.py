@@ -0,0 +1,144 @@
+"""
+Replay benchmark of per-turn model routing (model_router.py).
+
+Replays the chat turns in data/router_replay.jsonl through MentalHealthChatbot
+twice against the local stub server: once with every turn on the web-search
+model (the behavior before routing) and once routed. The stub answers each
+model after its own lognormal latency, so the search model can be made as slow
+relative to the fast model as it is in production. Cost comes from each call's
+token usage and the list prices in model_router.MODEL_PROFILES. No API key or
+network is needed.
+
+Crisis turns are replayed with crisis_followup=True, so they reach the model
+(and the router) instead of ending at the immediate safety message.
+
+Usage:
+    python benchmark_router.py
+    python benchmark_router.py --search-latency 3.0 --listening-latency 0.8   # closer to real medians
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPLAY_PATH = os.path.join(HERE, "data", "router_replay.jsonl")
+
+def load_turns(path=REPLAY_PATH):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = p / 100 * (len(ordered) - 1)
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def replay(server_url, turns, route_models):
+    """
+    Sends every turn through a fresh chatbot.
+
+    Returns:
+        dict: 'latencies' (seconds per turn), 'cost' (dollars), 'calls' per model and 'errors'.
+    """
+    from openai import OpenAI
+    from chatbot_agent import MentalHealthChatbot
+    from llm_client import client_options
+    from model_router import DecisionLog, get_profile
+
+    bot = MentalHealthChatbot(summarize_history=False, crisis_followup=True, route_models=route_models)
+    bot.client = OpenAI(**client_options(base_url=server_url))
+    log = DecisionLog()
+    if bot.router is not None:
+        bot.router.log = log
+
+    latencies, calls, cost, errors = [], {}, 0.0, 0
+    for turn in turns:
+        usage = {}
+        decided = log.stats()["decisions"]
+        start = time.perf_counter()
+        reply = bot.get_response(turn["text"], user_location=turn.get("location"), usage=usage)
+        latencies.append(time.perf_counter() - start)
+        if reply.startswith("Error generating response"):
+            errors += 1
+        if not usage:
+            continue  # Answered locally, or the call failed
+        routed = log.stats()["decisions"] > decided
+        model = log.recent(1)[0]["model"] if routed else bot.search_model
+        calls[model] = calls.get(model, 0) + 1
+        cost += get_profile(model).cost(usage)
+    return {"latencies": latencies, "cost": cost, "calls": calls, "errors": errors}
+
+def summarize(run, turns):
+    latencies = run["latencies"]
+    ms = lambda seconds: round(seconds * 1000, 1)
+    return {
+        "turns": turns,
+        "calls": run["calls"],
+        "errors": run["errors"],
+        "mean_ms": ms(sum(latencies) / len(latencies)),
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "cost_usd": round(run["cost"], 6),
+        "cost_per_1k_turns_usd": round(run["cost"] / turns * 1000, 4),
+    }
+
+def measure(turns=None, search_latency=0.3, listening_latency=0.08):
+    """
+    Replays `turns` (default: the replay file) unrouted and routed.
+
+    Returns:
+        dict: 'unrouted' and 'routed' summaries, plus 'latency_saved' and
+              'cost_saved' as fractions of the unrouted run.
+    """
+    from chatbot_agent import MentalHealthChatbot
+    from circuit_breaker import get_breaker
+    from stub_openai_server import StubOpenAIServer, latency_profile
+
+    turns = turns if turns is not None else load_turns()
+    model_latency = {
+        MentalHealthChatbot.search_model: latency_profile("lognormal", median=search_latency, seed=1),
+        MentalHealthChatbot.model: latency_profile("lognormal", median=listening_latency, seed=2),
+    }
+    # Both runs start with a closed circuit, and failures here never leak into the process's breaker
+    breaker = get_breaker("chat")
+    try:
+        with StubOpenAIServer(model_latency=model_latency) as server:
+            breaker.reset()
+            unrouted = summarize(replay(server.url, turns, route_models=False), len(turns))
+            breaker.reset()
+            routed = summarize(replay(server.url, turns, route_models=True), len(turns))
+    finally:
+        breaker.reset()
+    saved = lambda key: 1 - routed[key] / unrouted[key] if unrouted[key] else 0.0
+    return {"unrouted": unrouted, "routed": routed, "latency_saved": saved("mean_ms"), "cost_saved": saved("cost_usd")}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replay", default=REPLAY_PATH, help="JSONL of turns: {text, location?}")
+    parser.add_argument("--search-latency", type=float, default=0.3, help="stub median latency of the search model (s)")
+    parser.add_argument("--listening-latency", type=float, default=0.08, help="stub median latency of the fast model (s)")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("OPENAI_API_KEY", "stub-key")
+    result = measure(load_turns(args.replay), args.search_latency, args.listening_latency)
+    for name in ("unrouted", "routed"):
+        run = result[name]
+        calls = ", ".join(f"{model} x{count}" for model, count in sorted(run["calls"].items()))
+        print(f"{name:9} mean {run['mean_ms']:>7}ms  p50 {run['p50_ms']:>7}ms  p95 {run['p95_ms']:>7}ms  "
+              f"${run['cost_per_1k_turns_usd']:>8} per 1k turns  ({calls})"
+              + (f"  errors {run['errors']}" if run["errors"] else ""))
+    print(f"routing saved {result['latency_saved']:.0%} of mean latency and {result['cost_saved']:.0%} of cost "
+          f"over {result['routed']['turns']} turns")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
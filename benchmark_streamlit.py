@@ -0,0 +1,110 @@
+"""
+Headless benchmark of streamlit_app.py reruns as the chat history grows.
+
+Runs the app with streamlit.testing's AppTest against the local stub of the
+OpenAI API (no API key or browser needed). For each history length it times a
+plain rerun (what every widget interaction costs) and a chat turn, and checks
+that rerun time stays flat instead of growing with the history. Histories
+shorter than the app's CHAT_WINDOW render fewer messages, so the check starts
+at the first length that fills the window.
+
+Usage:
+    python benchmark_streamlit.py                    # 0 to 800 messages
+    python benchmark_streamlit.py --turns 0 100 400  # history lengths in turns
+"""
+import argparse
+import ast
+import os
+import statistics
+import sys
+import time
+
+from stub_openai_server import StubOpenAIServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(HERE, "streamlit_app.py")
+
+def chat_window():
+    """
+    streamlit_app.CHAT_WINDOW, read from the source (importing the app would run it).
+    """
+    with open(APP, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), APP)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "CHAT_WINDOW" for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise RuntimeError(f"CHAT_WINDOW not found in {APP}")
+
+def build_history(turns):
+    history = []
+    for n in range(turns):
+        history.append({"role": "user", "content": f"Message {n}: work has been piling up and I keep **replaying** meetings in my head."})
+        history.append({"role": "assistant", "content": f"Reply {n}: that sounds exhausting. What part of it stays with you the most?"})
+    return history
+
+def time_app(turns, repeats):
+    """
+    Median seconds for a plain rerun and for a chat turn with `turns` earlier turns.
+    """
+    from streamlit.testing.v1 import AppTest
+    import backend_interface
+
+    history = build_history(turns)
+    app = AppTest.from_file(APP, default_timeout=60)
+    app.secrets["OPENAI_API_KEY"] = "stub-key"
+    app.run()
+    app.session_state["messages"] = list(history)
+    app.session_state["session_id"] = backend_interface.open_session(history=history)
+
+    reruns = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        app.run()
+        reruns.append(time.perf_counter() - start)
+    if app.exception:
+        raise RuntimeError(app.exception[0].value)
+
+    chat_turns = []
+    for n in range(repeats):
+        start = time.perf_counter()
+        app.chat_input[0].set_value(f"Another evening of not switching off ({n}).").run()
+        chat_turns.append(time.perf_counter() - start)
+    if app.exception:
+        raise RuntimeError(app.exception[0].value)
+    return statistics.median(reruns), statistics.median(chat_turns), len(app.chat_message)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, nargs="+", default=[0, 25, 100, 200, 400],
+                        help="history lengths to test, in turns of two messages")
+    parser.add_argument("--repeats", type=int, default=5, help="timed runs per history length")
+    parser.add_argument("--max-growth", type=float, default=1.5,
+                        help="fail if the longest history reruns this many times slower than the shortest "
+                             "one that fills the chat window")
+    args = parser.parse_args(argv)
+    window = chat_window()
+    compared = sorted(t for t in set(args.turns) if 2 * t >= window)
+    if len(compared) < 2:
+        parser.error(f"--turns needs at least two lengths of {-(-window // 2)} turns or more "
+                     f"(the app renders {window} messages)")
+
+    with StubOpenAIServer() as server:
+        os.environ["OPENAI_BASE_URL"] = server.url
+        os.environ["OPENAI_API_KEY"] = "stub-key"
+        results = {}
+        print(f"{'turns':>6} {'messages':>9} {'rendered':>9} {'rerun ms':>9} {'chat turn ms':>13}")
+        for turns in args.turns:
+            rerun, chat_turn, rendered = time_app(turns, args.repeats)
+            results[turns] = rerun
+            print(f"{turns:>6} {2 * turns:>9} {rendered:>9} {rerun * 1000:>9.1f} {chat_turn * 1000:>13.1f}")
+
+    growth = results[compared[-1]] / results[compared[0]]
+    print(f"\nRerun time with {compared[-1]} turns is {growth:.2f}x that with {compared[0]}.")
+    if growth > args.max_growth:
+        print(f"FAIL: rerun time grows with history (limit {args.max_growth}x)")
+        return 1
+    print("OK: rerun time stays flat as history grows.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
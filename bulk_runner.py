@@ -0,0 +1,291 @@
+"""
+Runs a JSONL file of chat or journal prompt jobs through backend_interface.
+
+Each input line is one job:
+    {"id"?, "type": "chat", "message", "history"?, "location"?, "deadline"?}
+    {"id"?, "type": "journal_prompts", "mood", "user_id"?, "source"?, "note"?, "deadline"?}
+
+Jobs run on a bounded pool of worker threads and each result is appended to
+the output JSONL as soon as it finishes (so output order can differ from input
+order; every record carries the input line number):
+    {"line", "id", "type", "ok": true, "result", "elapsed"}
+    {"line", "id", "type", "ok": false, "error", "kind", "elapsed"}
+
+Progress is checkpointed next to the output (<output>.checkpoint). After a crash
+or Ctrl-C, running the same command again continues where it stopped, without
+repeating or duplicating finished jobs. Memory use does not grow with the
+input: the file is read line by line and only the jobs in flight are held.
+
+Usage:
+    python bulk_runner.py jobs.jsonl results.jsonl --workers 16
+    python bulk_runner.py jobs.jsonl results.jsonl --restart   # ignore the checkpoint
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+class JobError(Exception):
+    """
+    A job that could not be run or whose reply was an error. `kind` groups failures in the report.
+    """
+    def __init__(self, kind, message):
+        super().__init__(message)
+        self.kind = kind
+
+def _field(job, name, kind, required=False):
+    value = job.get(name)
+    if value is None:
+        if required:
+            raise JobError("invalid_job", f"'{name}' is required")
+        return None
+    if not isinstance(value, kind) or isinstance(value, bool):
+        raise JobError("invalid_job", f"'{name}' has the wrong type")
+    return value
+
+def run_chat(job):
+    import backend_interface
+    usage = {}
+    reply = backend_interface.process_chat_message(
+        _field(job, "message", str, required=True), history=_field(job, "history", list),
+        location=_field(job, "location", str), usage=usage, deadline=_field(job, "deadline", (int, float))
+    )
+    if backend_interface.is_error_reply(reply):
+        raise JobError("chat_error", reply)
+    return {"reply": reply, "usage": usage}
+
+def run_journal_prompts(job):
+    import backend_interface
+    result = backend_interface.get_journal_prompts(
+        _field(job, "mood", str, required=True), deadline=_field(job, "deadline", (int, float)),
+        user_id=_field(job, "user_id", str), source=_field(job, "source", str), note=_field(job, "note", str)
+    )
+    if not result.ok:
+        raise JobError(result.kind, result.message)
+    return result.to_dict()
+
+JOB_TYPES = {"chat": run_chat, "journal_prompts": run_journal_prompts}
+
+def run_job(line, raw, job_types=JOB_TYPES):
+    """
+    Runs one input line and returns its output record (never raises).
+    """
+    start = time.perf_counter()
+    record = {"line": line, "id": None, "type": None}
+    try:
+        try:
+            job = json.loads(raw)
+        except ValueError:
+            raise JobError("invalid_job", "line is not valid JSON")
+        if not isinstance(job, dict):
+            raise JobError("invalid_job", "line is not a JSON object")
+        record["id"], record["type"] = job.get("id"), job.get("type")
+        handler = job_types.get(job.get("type"))
+        if handler is None:
+            raise JobError("invalid_job", f"'type' must be one of {', '.join(job_types)}")
+        record["result"] = handler(job)
+        record["ok"] = True
+    except JobError as e:
+        record.update(ok=False, error=str(e), kind=e.kind)
+    except Exception as e:
+        record.update(ok=False, error=str(e), kind=type(e).__name__)
+    record["elapsed"] = round(time.perf_counter() - start, 4)
+    return record
+
+class BulkRunner:
+    """
+    Streams jobs from `input_path` through a pool of `workers` threads into
+    `output_path`, checkpointing every `checkpoint_every` finished jobs.
+
+    The checkpoint holds the byte offset and number of the first unfinished
+    input line, the finished lines after it (at most the jobs in flight) and
+    the output file size at that moment. Output is flushed to disk before the
+    checkpoint is replaced, and a resumed run first truncates the output back
+    to the checkpointed size, so records written after the last checkpoint are
+    dropped and their jobs run again instead of appearing twice.
+    """
+    def __init__(self, input_path, output_path, workers=8, checkpoint_path=None, checkpoint_every=100,
+                 job_types=None, progress_every=10.0, log=sys.stderr):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.workers = workers
+        self.checkpoint_path = checkpoint_path or output_path + ".checkpoint"
+        self.checkpoint_every = checkpoint_every
+        self.job_types = job_types or JOB_TYPES
+        self.progress_every = progress_every
+        self.log = log
+
+    def _load_checkpoint(self, restart):
+        if restart or not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("input") != os.path.abspath(self.input_path):
+            raise ValueError(f"{self.checkpoint_path} belongs to {checkpoint.get('input')}; use --restart to start over")
+        return checkpoint
+
+    def _save_checkpoint(self, out, offset, line, done_above, stats, complete=False):
+        out.flush()
+        os.fsync(out.fileno())
+        checkpoint = {
+            "input": os.path.abspath(self.input_path),
+            "offset": offset,
+            "line": line,
+            "done_above": sorted(done_above),
+            "output_size": out.tell(),
+            "ok": stats["ok"],
+            "failed": stats["failed"],
+            "failures": dict(stats["failures"]),
+            "complete": complete,
+        }
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    @staticmethod
+    def _write(out, record, stats):
+        out.write(json.dumps(record, ensure_ascii=False).encode() + b"\n")
+        if record["ok"]:
+            stats["ok"] += 1
+        else:
+            stats["failed"] += 1
+            stats["failures"][record["kind"]] += 1
+
+    def run(self, restart=False):
+        """
+        Runs (or resumes) the file.
+
+        Returns:
+            dict: 'ok', 'failed' and 'skipped' (finished in an earlier run) counts,
+                  'failures' by kind, 'elapsed' seconds, 'jobs_per_second' for this run,
+                  and 'interrupted'.
+        """
+        checkpoint = self._load_checkpoint(restart)
+        stats = {"ok": 0, "failed": 0, "skipped": 0, "failures": Counter(), "interrupted": False}
+        start_offset, next_line, done_above = 0, 1, set()
+        mode = "wb"
+        if checkpoint is not None:
+            start_offset, next_line = checkpoint["offset"], checkpoint["line"]
+            done_above = set(checkpoint["done_above"])
+            stats["skipped"] = checkpoint["ok"] + checkpoint["failed"]
+            stats["ok"], stats["failed"] = checkpoint["ok"], checkpoint["failed"]
+            stats["failures"].update(checkpoint.get("failures", {}))
+            mode = "r+b"
+            if checkpoint.get("complete"):
+                stats.update(elapsed=0.0, jobs_per_second=0.0)
+                return stats
+
+        started = time.perf_counter()
+        last_progress = started
+        finished_here = 0
+        # line number -> byte offset of each job in flight, to find the first unfinished line
+        in_flight = {}
+        since_checkpoint = 0
+        window = self.workers * 2
+
+        with open(self.input_path, "rb") as source, open(self.output_path, mode) as out, \
+                ThreadPoolExecutor(max_workers=self.workers) as pool:
+            if checkpoint is not None:
+                out.truncate(checkpoint["output_size"])
+                out.seek(checkpoint["output_size"])
+            source.seek(start_offset)
+            line = next_line
+            futures = {}
+            exhausted = False
+            read_offset = start_offset
+
+            def low_water():
+                # The first line not yet finished: the oldest job in flight, or the next unread line
+                if in_flight:
+                    first = min(in_flight)
+                    return in_flight[first], first
+                return read_offset, line
+
+            try:
+                while futures or not exhausted:
+                    while not exhausted and len(futures) < window:
+                        offset = source.tell()
+                        raw = source.readline()
+                        if not raw:
+                            exhausted = True
+                            break
+                        number, line = line, line + 1
+                        read_offset = source.tell()
+                        if number in done_above or not raw.strip():
+                            continue
+                        in_flight[number] = offset
+                        futures[pool.submit(run_job, number, raw, self.job_types)] = number
+                    if not futures:
+                        continue
+
+                    finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        number = futures.pop(future)
+                        self._write(out, future.result(), stats)
+                        del in_flight[number]
+                        done_above.add(number)
+                        finished_here += 1
+                        since_checkpoint += 1
+
+                    # Lines before the first unfinished one are covered by the offset
+                    first_unfinished = low_water()[1]
+                    done_above = {n for n in done_above if n > first_unfinished}
+                    if since_checkpoint >= self.checkpoint_every:
+                        self._save_checkpoint(out, *low_water(), done_above, stats)
+                        since_checkpoint = 0
+                    now = time.perf_counter()
+                    if self.log is not None and now - last_progress >= self.progress_every:
+                        last_progress = now
+                        print(f"{finished_here} jobs in {now - started:.0f}s ({finished_here / (now - started):.1f}/s), "
+                              f"{stats['failed']} failed", file=self.log)
+            except KeyboardInterrupt:
+                # Let running jobs finish and record them, but start no new ones
+                stats["interrupted"] = True
+                for future in futures:
+                    future.cancel()
+                for future, number in futures.items():
+                    if not future.cancelled():
+                        self._write(out, future.result(), stats)
+                        del in_flight[number]
+                        done_above.add(number)
+                        finished_here += 1
+                # Cancelled jobs stay in flight, so the checkpoint resumes from the first of them
+                offset, first_unfinished = low_water()
+                self._save_checkpoint(out, offset, first_unfinished, {n for n in done_above if n > first_unfinished}, stats)
+            else:
+                self._save_checkpoint(out, *low_water(), set(), stats, complete=True)
+
+        elapsed = time.perf_counter() - started
+        stats["elapsed"] = round(elapsed, 3)
+        stats["jobs_per_second"] = round(finished_here / elapsed, 2) if elapsed > 0 else 0.0
+        return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of jobs")
+    parser.add_argument("output", help="JSONL file for results (appended to when resuming)")
+    parser.add_argument("--workers", type=int, default=8, help="jobs run at once")
+    parser.add_argument("--checkpoint-every", type=int, default=100, help="finished jobs between checkpoints")
+    parser.add_argument("--restart", action="store_true", help="ignore any checkpoint and start from the first line")
+    args = parser.parse_args(argv)
+
+    runner = BulkRunner(args.input, args.output, workers=args.workers, checkpoint_every=args.checkpoint_every)
+    stats = runner.run(restart=args.restart)
+    if stats["skipped"]:
+        print(f"Resumed: {stats['skipped']} jobs were already done")
+    print(f"{stats['ok']} ok, {stats['failed']} failed in {stats['elapsed']}s ({stats['jobs_per_second']} jobs/s this run)")
+    for kind, count in stats["failures"].most_common():
+        print(f"  {kind}: {count}")
+    if stats["interrupted"]:
+        print("Interrupted; run the same command again to resume.")
+        return 130
+    return 0 if not stats["failed"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
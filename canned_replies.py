@@ -0,0 +1,80 @@
+import itertools
+import json
+import os
+import re
+import threading
+import unicodedata
+
+CANNED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "canned_replies.json")
+
+# Intents whose answer does not depend on the conversation; the others are only
+# answered locally as the opening turn
+STATELESS_INTENTS = {"identity"}
+
+_APOSTROPHES = {ord("'"): None, ord("’"): None, ord("`"): None}
+_REPEATS = re.compile(r"(\w)\1{2,}")
+
+def normalize(text):
+    """
+    Canonical form of a short message for exact matching: NFKC-normalized,
+    casefolded, apostrophes removed ("what's" -> "whats"), other punctuation
+    and symbols (emoji included) turned into spaces, letters repeated three or
+    more times collapsed ("heyyy" -> "hey") and whitespace collapsed.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold().translate(_APOSTROPHES)
+    text = "".join(" " if unicodedata.category(ch)[0] in "PS" else ch for ch in text)
+    return " ".join(_REPEATS.sub(r"\1", text).split())
+
+class CannedReplies:
+    """
+    Pre-written replies for turns whose answer is nearly fixed, such as bare
+    greetings and "who are you?", so they don't need a model call.
+
+    Messages match only if their normalized text is exactly one of an intent's
+    phrases; "hi, I feel awful" is not a greeting. Each intent keeps a few
+    variants that rotate so repeated visits don't get identical text.
+    """
+    def __init__(self, intents):
+        self.replies = {intent: spec["replies"] for intent, spec in intents.items()}
+        self.phrases = {normalize(phrase): intent for intent, spec in intents.items() for phrase in spec["phrases"]}
+        self._next_reply = {intent: itertools.cycle(range(len(replies))) for intent, replies in self.replies.items()}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path=CANNED_PATH):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def match(self, text, opening=True):
+        """
+        The intent `text` expresses, or None.
+
+        Args:
+            text (str): The user's message.
+            opening (bool): Whether this is the first turn of the conversation. Only
+                            stateless intents (identity questions) match later turns.
+        """
+        if len(text) > 60:
+            return None
+        intent = self.phrases.get(normalize(text))
+        if intent is None or (not opening and intent not in STATELESS_INTENTS):
+            return None
+        return intent
+
+    def reply(self, intent):
+        """
+        The next variant for `intent`, rotating.
+        """
+        with self._lock:
+            return self.replies[intent][next(self._next_reply[intent])]
+
+_default_replies = None
+
+def get_canned_replies():
+    """
+    The replies loaded from data/canned_replies.json (loaded once, on first use).
+    """
+    global _default_replies
+    if _default_replies is None:
+        _default_replies = CannedReplies.from_file()
+    return _default_replies
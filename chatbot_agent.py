@@ -1,13 +1,87 @@
-import os
-from dotenv import load_dotenv
-from openai import OpenAI
+import functools
+import time
+from openai import OpenAI, AsyncOpenAI
+from concurrency import default_limiter
+from llm_client import Deadline, DeadlineExceeded, client_options, async_client_options, default_retry_policy, load_environment
+from circuit_breaker import CircuitOpenError, get_breaker
+from fallback_bank import get_fallback_bank
+from history_budget import HistoryTrimmer, count_text_tokens, MESSAGE_OVERHEAD_TOKENS
+from llm_usage import UsageTracker, extract_usage
+from metrics import registry as metrics
+from crisis_detector import CrisisAssessment, get_default_detector, crisis_response
+from topic_gate import get_default_gate, off_topic_response
+from canned_replies import get_canned_replies
+from model_router import ModelProfile, ModelRouter, needs_search
 
 # Load environment variables
-load_dotenv()
+load_environment()
+
+SUMMARY_SYSTEM_PROMPT = """
+You keep a short running summary of a conversation between a user and a mental-wellbeing companion.
+Update the existing summary with the new messages. Keep what matters for continuing the conversation:
+the user's feelings, situation, people and events they mentioned, anything they asked to remember,
+and any safety concerns. Write at most 120 words in the third person. Output only the summary.
+"""
+
+def _hold_trailing_space(text):
+    """
+    Splits a stream delta into the text to yield now and its trailing
+    whitespace, which is only sent once more text follows it.
+    """
+    body = text.rstrip()
+    return body, text[len(body):]
 
 class MentalHealthChatbot:
-    def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    model = "gpt-4o-mini" # Ordinary turns (see model_router.py)
+    search_model = "gpt-4o-search-preview" # Turns that need web search
+    max_tokens = 300 # Limit response length for conciseness
+    summary_model = "gpt-4o-mini"
+    summary_max_tokens = 200
+
+    def __init__(self, input_token_budget=4000, max_history_messages=20, summarize_history=True,
+                 detect_crisis=True, crisis_followup=False, gate_off_topic=True, hedging=None, canned_replies=True,
+                 route_models=True):
+        """
+        Args:
+            input_token_budget (int): Upper bound on prompt tokens per request (system prompt,
+                                      summary, history and the new message). History is trimmed
+                                      from the oldest end to fit.
+            max_history_messages (int): Most history messages sent verbatim, whatever their size.
+            summarize_history (bool): Fold trimmed messages into a running summary (one small
+                                      extra request per turn in which messages fall out of the window)
+                                      instead of dropping them.
+            detect_crisis (bool): Scan each message locally for suicidal or self-harm phrasing and
+                                  answer a clear hit with the crisis protocol response immediately.
+                                  Method or lethality questions are never answered locally
+                                  (no canned reply or off-topic redirect); the model answers them.
+            crisis_followup (bool): After the immediate crisis response, also ask the model for a
+                                    reply and append it. Off by default so the safety message never
+                                    waits on, or depends on, the API.
+            gate_off_topic (bool): Answer clearly off-topic requests (trivia, coding, politics, ...)
+                                   with the domain redirect locally instead of calling the model.
+            hedging (HedgingPolicy): Optional. Hedge slow non-streaming requests (see hedging.py).
+            canned_replies (bool): Answer bare greetings opening a conversation and "who are you?"
+                                   questions with pre-written replies instead of calling the model.
+            route_models (bool): Send each turn to `model`, or to `search_model` when local signals
+                                 say it needs web search (a crisis with a known location, a request
+                                 for help resources or a factual health question). When False,
+                                 every turn goes to `search_model` with the request sent before
+                                 routing existed (no profile parameters such as web_search_options).
+        """
+        self.client = self._create_client()
+        self.retry_policy = default_retry_policy()
+        self.breaker = get_breaker("chat")
+        self.hedging = hedging
+        self.crisis_detector = get_default_detector() if detect_crisis else None
+        self.crisis_followup = crisis_followup
+        self.gate_off_topic = gate_off_topic
+        self.canned_replies = canned_replies
+        self.router = ModelRouter(self.model, self.search_model) if route_models else None
+        self.input_token_budget = input_token_budget
+        self.summarize_history = summarize_history
+        self.history_trimmer = HistoryTrimmer(max_messages=max_history_messages)
+        self.usage = UsageTracker()
+        self._system_prompt_tokens = None
         self.system_prompt = """
 Identity and purpose
 
@@ -93,7 +167,25 @@ Operational checklist (apply every reply)
 – Keep the conversation flowing.
 """
 
-    def get_response(self, user_input, conversation_history=None, user_location=None):
+    def _create_client(self):
+        return OpenAI(**client_options())
+
+    def _create(self, deadline=None, **kwargs):
+        """
+        One chat completions request, through the circuit breaker, retry policy
+        and (for non-streaming requests) hedging. Raises CircuitOpenError without
+        calling the API while the circuit is open, and DeadlineExceeded once
+        `deadline` has passed.
+        """
+        attempt = self.client.chat.completions.create
+        if kwargs.get("stream"):
+            # Streams are timed by get_response_stream, up to their last chunk
+            return self.breaker.call(self.retry_policy.call, attempt, deadline=deadline, **kwargs)
+        if self.hedging is not None:
+            attempt = functools.partial(self.hedging.call, attempt, deadline=deadline)
+        return metrics.call("chat", self.breaker.call, self.retry_policy.call, attempt, deadline=deadline, **kwargs)
+
+    def get_response(self, user_input, conversation_history=None, user_location=None, usage=None, deadline=None):
         """
         Generates a response from the chatbot based on user input and history.
 
@@ -103,39 +195,457 @@ Operational checklist (apply every reply)
                                          Defaults to None.
             user_location (str): Optional. The user's location (e.g., "New York, USA") to provide 
                                  local crisis resources. Defaults to None.
+            usage (dict): Optional. Filled in with the call's 'prompt_tokens', 'completion_tokens'
+                          and 'cached_tokens' (prompt tokens served from the provider's cache).
+            deadline (float): Optional. Seconds the whole call may take, including history
+                              summarization and retries. Each API request gets the time left
+                              as its timeout.
 
         Returns:
-            str: The chatbot's response.
+            str: The chatbot's response. While the API's circuit breaker is open (after
+                 repeated outage errors), or once the deadline has passed, a listening
+                 reply from the offline fallback bank.
         """
-        if conversation_history is None:
-            conversation_history = []
+        deadline = Deadline.coerce(deadline)
+        assessment = self._assess(user_input)
+        crisis_reply = self._crisis_reply(assessment, user_location)
+        if crisis_reply is not None and not self.crisis_followup:
+            return crisis_reply
+        local_reply = self._local_reply(user_input, conversation_history, assessment)
+        if local_reply is not None:
+            return local_reply
+
+        profile = self._route(user_input, user_location, assessment.at_risk)
+        messages = self._prepare_messages(user_input, conversation_history, user_location, deadline)
 
-        # Dynamic system prompt with location if provided
-        current_system_prompt = self.system_prompt
+        try:
+            response = self._create(
+                deadline=deadline,
+                **profile.request_kwargs(messages=messages, max_tokens=self.max_tokens)
+            )
+            self._record_usage(response, usage)
+            reply = response.choices[0].message.content.strip()
+        except (CircuitOpenError, DeadlineExceeded):
+            # The API is down or too slow: answer from the offline bank instead of waiting on it
+            if crisis_reply is not None:
+                return crisis_reply
+            return get_fallback_bank().chat_reply()
+        except Exception as e:
+            if crisis_reply is not None:
+                return crisis_reply
+            return f"Error generating response: {e}"
+        if crisis_reply is not None:
+            return f"{crisis_reply}\n\n{reply}"
+        return reply
+
+    def get_response_stream(self, user_input, conversation_history=None, user_location=None, timings=None, usage=None,
+                            deadline=None):
+        """
+        Streams the chatbot's response as it is generated.
+
+        Takes the same arguments as get_response. If the request fails before any
+        text arrives, the usual "Error generating response" message is yielded
+        instead; if the stream breaks partway through, the text already yielded
+        is kept and the error is appended as a final delta.
+
+        Args:
+            user_input (str): The user's message.
+            conversation_history (list): List of previous messages (dicts with 'role' and 'content').
+                                         Defaults to None.
+            user_location (str): Optional. The user's location for local crisis resources.
+                                 Defaults to None.
+            timings (dict): Optional. Filled in with 'first_token' (seconds until the first
+                            text delta, if any arrived) and 'total' (seconds until the stream ended).
+            usage (dict): Optional. Filled in with token counts (see get_response) once the
+                          stream has finished.
+            deadline (float): Optional. Seconds allowed until the stream starts (see get_response).
+
+        Yields:
+            str: Text deltas of the chatbot's response, in order.
+        """
+        if timings is None:
+            timings = {}
+
+        deadline = Deadline.coerce(deadline)
+        start = time.perf_counter()
+        assessment = self._assess(user_input)
+        crisis_reply = self._crisis_reply(assessment, user_location)
+        if crisis_reply is not None:
+            # The safety message goes out before anything touches the network
+            timings["first_token"] = time.perf_counter() - start
+            yield crisis_reply
+            if not self.crisis_followup:
+                timings["total"] = time.perf_counter() - start
+                return
+        else:
+            local_reply = self._local_reply(user_input, conversation_history, assessment)
+            if local_reply is not None:
+                timings["first_token"] = timings["total"] = time.perf_counter() - start
+                yield local_reply
+                return
+
+        profile = self._route(user_input, user_location, assessment.at_risk)
+        messages = self._prepare_messages(user_input, conversation_history, user_location, deadline)
+        received_text, held_space = False, ""
+        call, stream_usage, stream_error = metrics.start_call("chat", profile.model), None, None
+        try:
+            stream = self._create(
+                deadline=deadline,
+                **profile.request_kwargs(messages=messages, max_tokens=self.max_tokens,
+                                         stream=True, stream_options={"include_usage": True})
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    # The final chunk carries token usage and no choices
+                    if getattr(chunk, "usage", None) is not None:
+                        stream_usage = self._record_usage(chunk, usage)
+                    continue
+                delta, held_space = _hold_trailing_space(held_space + (chunk.choices[0].delta.content or ""))
+                if not received_text:
+                    # Match get_response, which strips the reply: leading whitespace is dropped here,
+                    # trailing whitespace is held back until more text follows it
+                    delta = delta.lstrip()
+                if not delta:
+                    continue
+                if not received_text:
+                    call.first_token()
+                    if crisis_reply is not None:
+                        delta = "\n\n" + delta
+                    else:
+                        timings["first_token"] = time.perf_counter() - start
+                    received_text = True
+                yield delta
+        except Exception as e:
+            stream_error = e
+            if crisis_reply is not None:
+                # The safety message has been shown; a failed follow-up adds nothing useful
+                pass
+            elif isinstance(e, (CircuitOpenError, DeadlineExceeded)):
+                timings["first_token"] = time.perf_counter() - start
+                yield get_fallback_bank().chat_reply()
+            elif received_text:
+                yield f"\n\nError generating response: {e}"
+            else:
+                yield f"Error generating response: {e}"
+        finally:
+            timings["total"] = time.perf_counter() - start
+            call.finish(usage=stream_usage, error=stream_error)
+
+    def warm_up(self):
+        """
+        Does the one-off local work of a first request ahead of time: trains
+        the topic gate and loads the token counter and canned replies. No API
+        request is made.
+        """
+        if self.gate_off_topic:
+            get_default_gate()
+        if self.canned_replies:
+            get_canned_replies()
+        self._history_token_budget("", None)
+
+    def _assess(self, user_input):
+        """
+        The local crisis detector's CrisisAssessment of the message ("none" when
+        detection is off).
+        """
+        if self.crisis_detector is None:
+            return CrisisAssessment("none", [])
+        return self.crisis_detector.assess(user_input)
+
+    def _crisis_reply(self, assessment, user_location):
+        """
+        The immediate crisis protocol response if the local detector flags the
+        message as a crisis, otherwise None.
+        """
+        if assessment.is_crisis:
+            return crisis_response(user_location)
+        return None
+
+    def _local_reply(self, user_input, conversation_history, assessment):
+        """
+        A canned reply or off-topic redirect answered without the model, or None.
+        A message with any sign of risk (see CrisisAssessment.at_risk) always
+        goes to the model and its crisis protocol.
+        """
+        if assessment.at_risk:
+            return None
+        return self._canned_reply(user_input, conversation_history) or self._off_topic_reply(user_input)
+
+    def _canned_reply(self, user_input, conversation_history):
+        """
+        A pre-written reply if the message is a bare greeting opening the
+        conversation or an identity question, otherwise None.
+        """
+        if not self.canned_replies:
+            return None
+        canned = get_canned_replies()
+        intent = canned.match(user_input, opening=not conversation_history)
+        if intent is None:
+            return None
+        metrics.record_local_reply("chat", intent)
+        return canned.reply(intent)
+
+    def _route(self, user_input, user_location, crisis):
+        """
+        The ModelProfile (model and request parameters) that answers this turn.
+        Without routing, a bare profile for `search_model`, so requests carry no
+        parameters beyond those sent before routing existed.
+        """
+        if self.router is None:
+            return ModelProfile(self.search_model)
+        return self.router.route(user_input, user_location, crisis).profile
+
+    def _off_topic_reply(self, user_input):
+        """
+        The domain redirect if the local topic gate is confident the message is
+        off-topic, otherwise None. Health questions and requests for help
+        resources are never redirected, however much they read like trivia.
+        """
+        if not self.gate_off_topic or needs_search(user_input):
+            return None
+        decision = get_default_gate().check(user_input)
+        if decision.off_topic:
+            return off_topic_response(decision.topic)
+        return None
+
+    def _prepare_messages(self, user_input, conversation_history, user_location, deadline=None):
+        summarizer = functools.partial(self._summarize, deadline=deadline) if self.summarize_history else None
+        summary, recent = self.history_trimmer.trim(
+            conversation_history or [], self._history_token_budget(user_input, user_location), summarizer
+        )
+        return self._build_messages(user_input, recent, user_location, summary)
+
+    def _history_token_budget(self, user_input, user_location):
+        """
+        Tokens left for history once the fixed parts of the request are counted.
+        """
+        if self._system_prompt_tokens is None:
+            # The system prompt never changes, so it is only counted once
+            self._system_prompt_tokens = count_text_tokens(self.system_prompt) + MESSAGE_OVERHEAD_TOKENS
+        used = self._system_prompt_tokens + count_text_tokens(user_input) + MESSAGE_OVERHEAD_TOKENS
         if user_location:
-            current_system_prompt += f"\n\nUSER LOCATION INFO:\nThe user is located in: {user_location}.\nIf the user expresses a crisis (self-harm, suicide, etc.), you MUST explicitly mention this location and suggest searching for or contacting emergency services in {user_location}."
+            used += count_text_tokens(self._location_info(user_location)) + MESSAGE_OVERHEAD_TOKENS
+        if self.summarize_history:
+            used += self.summary_max_tokens + MESSAGE_OVERHEAD_TOKENS
+        return max(0, self.input_token_budget - used)
 
-        # Construct messages list starting with system prompt
-        messages = [{"role": "system", "content": current_system_prompt}]
-        
-        # Add conversation history
-        # Limit history length to the last 20 messages to save tokens
-        if len(conversation_history) > 20:
-            conversation_history = conversation_history[-20:]
-        messages.extend(conversation_history)
+    def _summary_messages(self, previous_summary, messages):
+        transcript = "\n".join(f"{m.get('role', 'user').capitalize()}: {m.get('content') or ''}" for m in messages)
+        return [
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Existing summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"}
+        ]
+
+    def _summarize(self, previous_summary, messages, deadline=None):
+        """
+        Folds `messages` into `previous_summary`. Returns None if the request fails,
+        in which case the previous summary is used for this turn.
+        """
+        try:
+            response = self._create(
+                deadline=deadline,
+                model=self.summary_model,
+                messages=self._summary_messages(previous_summary, messages),
+                max_tokens=self.summary_max_tokens
+            )
+            return response.choices[0].message.content.strip()
+        except Exception:
+            return None
+
+    def _record_usage(self, response, usage):
+        call_usage = extract_usage(response)
+        self.usage.record(call_usage)
+        if usage is not None:
+            usage.update(call_usage)
+        return call_usage
+
+    def _location_info(self, user_location):
+        return f"USER LOCATION INFO:\nThe user is located in: {user_location}.\nIf the user expresses a crisis (self-harm, suicide, etc.), you MUST explicitly mention this location and suggest searching for or contacting emergency services in {user_location}."
+
+    def _build_messages(self, user_input, recent_history, user_location, summary=None):
+        """
+        Assembles the message list sent to the model.
+
+        The system prompt always comes first and is sent byte-for-byte
+        unchanged, so every user and call shares the same prefix and the
+        provider can serve it from its prompt cache. Per-user data (location,
+        summary of older turns) follows in separate system messages, then the
+        recent history and the current user input.
+        """
+        messages = [{"role": "system", "content": self.system_prompt}]
+
+        if user_location:
+            messages.append({"role": "system", "content": self._location_info(user_location)})
+
+        # Older turns that no longer fit the token budget are represented by a summary
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+
+        # Add the most recent history that fits the budget
+        messages.extend(recent_history)
         
         # Add current user input
         messages.append({"role": "user", "content": user_input})
+        return messages
+
+class AsyncMentalHealthChatbot(MentalHealthChatbot):
+    """
+    Asyncio-native variant of MentalHealthChatbot.
+
+    Built on AsyncOpenAI so one process can wait on many chats at once without
+    a thread per user. The number of requests in flight is capped by `limiter`
+    (the process-wide default_limiter unless another one is passed in).
+    """
+    def __init__(self, limiter=None, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter or default_limiter
+
+    def _create_client(self):
+        return AsyncOpenAI(**async_client_options())
+
+    async def _create_async(self, deadline=None, **kwargs):
+        attempt = self.client.chat.completions.create
+        if kwargs.get("stream"):
+            return await self.breaker.call_async(self.retry_policy.call_async, attempt, deadline=deadline, **kwargs)
+        if self.hedging is not None:
+            attempt = functools.partial(self.hedging.call_async, attempt, deadline=deadline)
+        return await metrics.call_async(
+            "chat", self.breaker.call_async, self.retry_policy.call_async, attempt, deadline=deadline, **kwargs
+        )
+
+    async def _prepare_messages_async(self, user_input, conversation_history, user_location, deadline=None):
+        summarizer = functools.partial(self._summarize, deadline=deadline) if self.summarize_history else None
+        summary, recent = await self.history_trimmer.trim_async(
+            conversation_history or [], self._history_token_budget(user_input, user_location), summarizer
+        )
+        return self._build_messages(user_input, recent, user_location, summary)
 
+    async def _summarize(self, previous_summary, messages, deadline=None):
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-search-preview",
-                messages=messages,
-                max_tokens=300 # Limit response length for conciseness
-            )
+            async with self.limiter.slot():
+                response = await self._create_async(
+                    deadline=deadline,
+                    model=self.summary_model,
+                    messages=self._summary_messages(previous_summary, messages),
+                    max_tokens=self.summary_max_tokens
+                )
             return response.choices[0].message.content.strip()
+        except Exception:
+            return None
+
+    async def get_response(self, user_input, conversation_history=None, user_location=None, usage=None, deadline=None):
+        """
+        Async version of MentalHealthChatbot.get_response; takes the same arguments.
+
+        Returns:
+            str: The chatbot's response.
+        """
+        deadline = Deadline.coerce(deadline)
+        assessment = self._assess(user_input)
+        crisis_reply = self._crisis_reply(assessment, user_location)
+        if crisis_reply is not None and not self.crisis_followup:
+            return crisis_reply
+        local_reply = self._local_reply(user_input, conversation_history, assessment)
+        if local_reply is not None:
+            return local_reply
+
+        profile = self._route(user_input, user_location, assessment.at_risk)
+        messages = await self._prepare_messages_async(user_input, conversation_history, user_location, deadline)
+
+        try:
+            async with self.limiter.slot():
+                response = await self._create_async(
+                    deadline=deadline,
+                    **profile.request_kwargs(messages=messages, max_tokens=self.max_tokens)
+                )
+            self._record_usage(response, usage)
+            reply = response.choices[0].message.content.strip()
+        except (CircuitOpenError, DeadlineExceeded):
+            # The API is down or too slow: answer from the offline bank instead of waiting on it
+            if crisis_reply is not None:
+                return crisis_reply
+            return get_fallback_bank().chat_reply()
         except Exception as e:
+            if crisis_reply is not None:
+                return crisis_reply
             return f"Error generating response: {e}"
+        if crisis_reply is not None:
+            return f"{crisis_reply}\n\n{reply}"
+        return reply
+
+    async def get_response_stream(self, user_input, conversation_history=None, user_location=None, timings=None, usage=None,
+                                  deadline=None):
+        """
+        Async version of MentalHealthChatbot.get_response_stream; takes the same
+        arguments and follows the same error behavior.
+
+        Yields:
+            str: Text deltas of the chatbot's response, in order.
+        """
+        if timings is None:
+            timings = {}
+
+        deadline = Deadline.coerce(deadline)
+        start = time.perf_counter()
+        assessment = self._assess(user_input)
+        crisis_reply = self._crisis_reply(assessment, user_location)
+        if crisis_reply is not None:
+            timings["first_token"] = time.perf_counter() - start
+            yield crisis_reply
+            if not self.crisis_followup:
+                timings["total"] = time.perf_counter() - start
+                return
+        else:
+            local_reply = self._local_reply(user_input, conversation_history, assessment)
+            if local_reply is not None:
+                timings["first_token"] = timings["total"] = time.perf_counter() - start
+                yield local_reply
+                return
+
+        profile = self._route(user_input, user_location, assessment.at_risk)
+        messages = await self._prepare_messages_async(user_input, conversation_history, user_location, deadline)
+        received_text, held_space = False, ""
+        call, stream_usage, stream_error = metrics.start_call("chat", profile.model), None, None
+        try:
+            # The slot is held until the stream is fully consumed
+            async with self.limiter.slot():
+                stream = await self._create_async(
+                    deadline=deadline,
+                    **profile.request_kwargs(messages=messages, max_tokens=self.max_tokens,
+                                             stream=True, stream_options={"include_usage": True})
+                )
+                async for chunk in stream:
+                    if not chunk.choices:
+                        if getattr(chunk, "usage", None) is not None:
+                            stream_usage = self._record_usage(chunk, usage)
+                        continue
+                    delta, held_space = _hold_trailing_space(held_space + (chunk.choices[0].delta.content or ""))
+                    if not received_text:
+                        delta = delta.lstrip()
+                    if not delta:
+                        continue
+                    if not received_text:
+                        call.first_token()
+                        if crisis_reply is not None:
+                            delta = "\n\n" + delta
+                        else:
+                            timings["first_token"] = time.perf_counter() - start
+                        received_text = True
+                    yield delta
+        except Exception as e:
+            stream_error = e
+            if crisis_reply is not None:
+                pass
+            elif isinstance(e, (CircuitOpenError, DeadlineExceeded)):
+                timings["first_token"] = time.perf_counter() - start
+                yield get_fallback_bank().chat_reply()
+            elif received_text:
+                yield f"\n\nError generating response: {e}"
+            else:
+                yield f"Error generating response: {e}"
+        finally:
+            timings["total"] = time.perf_counter() - start
+            call.finish(usage=stream_usage, error=stream_error)
 
 if __name__ == "__main__":
     # Simple interactive test loop
@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+from llm_client import DeadlineExceeded, is_transient_error
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling the service while its circuit is open.
+    """
+
+class CircuitBreaker:
+    """
+    Stops calling a failing service so requests fail fast during an outage.
+
+    Closed: calls go through. After `failure_threshold` consecutive outage
+    failures (see llm_client.is_transient_error) the circuit opens and every
+    call raises CircuitOpenError without touching the service. After
+    `recovery_timeout` seconds it goes half-open and lets up to
+    `half_open_max_calls` probe calls through: a success closes the circuit,
+    a failure opens it again for another `recovery_timeout`.
+
+    Errors that are not outages (e.g. a 400 for a bad request) mean the service
+    answered, so they count as successes here and are re-raised as usual. A
+    caller's own deadline running out says nothing about the service and is
+    not counted either way.
+    """
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30.0, half_open_max_calls=1,
+                 is_failure=is_transient_error, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.is_failure = is_failure
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def _refresh(self):
+        if self._state == OPEN and self.clock() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._probes = 0
+
+    def before_call(self):
+        """
+        Raises CircuitOpenError if the call must not go through right now.
+        """
+        with self._lock:
+            self._refresh()
+            if self._state == OPEN or (self._state == HALF_OPEN and self._probes >= self.half_open_max_calls):
+                self.rejected += 1
+                raise CircuitOpenError(f"The {self.name} service is temporarily unavailable")
+            if self._state == HALF_OPEN:
+                self._probes += 1
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state != CLOSED:
+                self._state = CLOSED
+                self._probes = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = self.clock()
+                self.times_opened += 1
+
+    def release(self):
+        """
+        Ends a call without a verdict, freeing its half-open probe slot.
+        """
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_error(self, exc):
+        if isinstance(exc, DeadlineExceeded):
+            self.release()
+        elif self.is_failure(exc):
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def call(self, fn, *args, **kwargs):
+        self.before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.record_error(e)
+            raise
+        self.record_success()
+        return result
+
+    async def call_async(self, fn, *args, **kwargs):
+        self.before_call()
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception as e:
+            self.record_error(e)
+            raise
+        except BaseException:
+            # Cancelled by the caller
+            self.release()
+            raise
+        self.record_success()
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def stats(self):
+        with self._lock:
+            self._refresh()
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name):
+    """
+    The process-wide breaker for `name` ("chat", "journal_prompts", ...),
+    created on first use. Thresholds come from OPENAI_BREAKER_FAILURES
+    (default 5) and OPENAI_BREAKER_RECOVERY seconds (default 30).
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=int(os.getenv("OPENAI_BREAKER_FAILURES", "5")),
+                recovery_timeout=float(os.getenv("OPENAI_BREAKER_RECOVERY", "30")),
+            )
+            _breakers[name] = breaker
+        return breaker
@@ -0,0 +1,56 @@
+import asyncio
+import contextlib
+import os
+import weakref
+
+# Default cap on OpenAI requests awaiting a response at once (per event loop).
+DEFAULT_MAX_IN_FLIGHT = int(os.getenv("OPENAI_MAX_IN_FLIGHT", "64"))
+
+class InFlightLimiter:
+    """
+    Caps how many async OpenAI requests are in flight at the same time.
+
+    Usage:
+        async with limiter.slot():
+            response = await client.chat.completions.create(...)
+
+    asyncio semaphores belong to a single event loop, so one is created lazily
+    for each running loop and the cap applies within that loop.
+    """
+    def __init__(self, max_in_flight=None):
+        self.max_in_flight = max_in_flight or DEFAULT_MAX_IN_FLIGHT
+        self.in_flight = 0
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def set_max_in_flight(self, max_in_flight):
+        """
+        Changes the cap. Requests already in flight are unaffected; the new cap
+        applies to requests started afterwards.
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.max_in_flight = max_in_flight
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """
+        Waits for a free slot and holds it for the duration of the block.
+        """
+        async with self._semaphore():
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+
+# Shared by the chatbot and the prompt generator so the cap is process-wide.
+default_limiter = InFlightLimiter()
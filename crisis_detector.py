@@ -0,0 +1,171 @@
+import re
+
+# High-confidence phrasings of suicidal intent, self-harm or immediate danger.
+# Each entry is a regular expression over normalized (lowercased, straight
+# apostrophe, single-spaced) text. They are compiled into one alternation so a
+# message is scanned in a single pass.
+HIGH_RISK_PATTERNS = [
+    r"\b(?:kill|killing|hurt|hurting|harm|harming|cut|cutting|burn|burning|hang|hanging|shoot|shooting|poison|poisoning|starve|starving) myself\b",
+    r"\b(?:i|i've been|i have been|i keep|i started|i'm|i am) (?:\w+ )?self[- ]?harm(?:ing)?\b",
+    r"\b(?:end|ending|take|taking) (?:my|my own) life\b",
+    r"\bend(?:ing)? it all\b",
+    r"\b(?:commit|committing|attempt|attempting|considering|contemplating|thinking about|thinking of|thoughts of|planning) suicide\b",
+    r"\b(?:i'm|i am|im|i feel|i've been feeling|i have been feeling|feeling|i've been|i have been) (?:so |really |very |pretty |kind of |kinda )?suicidal\b",
+    r"\bsuicidal (?:thoughts|ideation|feelings)\b",
+    r"\b(?:i|i really|i just) (?:want|wanna|wish) (?:to )?(?:die|be dead|disappear forever|not exist|stop existing)\b",
+    r"\bi (?:don't|do not|dont) want to (?:live|be alive|exist|wake up)(?: anymore| any more)?\b",
+    r"\b(?:everyone|everybody|they|my family|the world) (?:would be|is|are|'d be) better off without me\b",
+    r"\bbetter off dead\b",
+    r"\b(?:no|no point|no reason) (?:in |to )?(?:living|live|going on)\b",
+    r"\b(?:life is|my life is|it's) not worth living\b",
+    r"\b(?:overdose|od) on\b",
+    r"\btake (?:all|a bunch) of (?:my|these|the) (?:pills|meds|medication)\b",
+    r"\b(?:jump|jumping) (?:off|from) (?:a|the|this) (?:bridge|building|roof|cliff|balcony)\b",
+    r"\b(?:wrote|writing|write) (?:a|my) (?:suicide|goodbye) note\b",
+    r"\bi (?:have|got|bought) (?:a|the) (?:gun|rope|pills|blade) (?:to|and)\b",
+    r"\b(?:plan|plans|planning|going) to (?:kill|end) (?:myself|it|my life)\b",
+    r"\bi can't (?:go on|do this) (?:anymore|any more) (?:and|i) (?:want|need) (?:to )?(?:die|end it)\b",
+]
+
+# Questions about methods or lethality ("lethal dose", "how do I tie a noose").
+# Too varied to answer with the crisis protocol on their own, but never safe to
+# answer locally: an "elevated" match disables every local shortcut (topic gate,
+# canned replies) so the model and its crisis protocol see the message. Same
+# normalized form as above; negation is not checked for these.
+ELEVATED_RISK_PATTERNS = [
+    r"\b(?:lethal|fatal|deadly|toxic) (?:dose|doses|dosage|amount|amounts|overdose)\b",
+    r"\boverdos(?:e|es|ed|ing)\b",
+    r"\bhow (?:many|much) (?:\w+ ){0,3}(?:pills|tablets|tylenol|paracetamol|acetaminophen|ibuprofen|aspirin|insulin)\b",
+    r"\b(?:pills|tablets) (?:does it|would it|will it|do you need to|would you need to) take\b",
+    r"\bnooses?\b",
+    r"\b(?:hang|hanging) (?:yourself|oneself|a person|someone)\b",
+    r"\b(?:painless|quickest|fastest|easiest|quick|easy|surest) (?:\w+ )?(?:way|ways|method|methods) to (?:die|go|end it|end my life|kill)\b",
+    r"\b(?:not|never) (?:survive|wake up)\b",
+    r"\bsurvive (?:a|the|that) (?:fall|jump)\b",
+    r"\bhow (?:high|tall|far) (?:\w+ ){0,6}(?:fall|jump|drop)\b",
+    r"\b(?:bridge|building|roof|cliff|balcony) (?:\w+ ){0,4}(?:high|tall) enough\b",
+    r"\b(?:buy|get|find|buying|getting) (?:a |my )?(?:gun|guns|firearm|firearms|handgun|rope)\b",
+]
+
+# Words that, shortly before a match, usually mean the user is denying rather
+# than expressing the thought ("I would never hurt myself").
+NEGATION_CUES = {
+    "not", "never", "no", "don't", "dont", "do not", "won't", "wont", "wouldn't", "wouldnt",
+    "isn't", "aren't", "am not", "i'm not", "im not", "nor", "stopped", "quit",
+}
+
+# Negation phrases that do not negate what follows ("I'm not sure if I want to die").
+NEGATION_EXCEPTIONS = re.compile(
+    r"\b(?:not sure|no idea|don't know|dont know|do not know|not certain|can't tell|never (?:thought|felt)|no one|nobody)\b"
+)
+
+NEGATION_WINDOW_TOKENS = 4
+
+_APOSTROPHES = str.maketrans({"’": "'", "‘": "'", "ʼ": "'"})
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize(text):
+    return _WHITESPACE.sub(" ", text.translate(_APOSTROPHES).lower()).strip()
+
+class CrisisAssessment:
+    """
+    Result of CrisisDetector.assess().
+
+    Attributes:
+        level (str): "high" (short-circuit to the safety response), "elevated"
+                     (a method or lethality question: no local shortcut, the model
+                     answers), "negated" (crisis phrasing that appears to be denied)
+                     or "none".
+        matches (list): The matched phrases, in order.
+    """
+    __slots__ = ("level", "matches")
+
+    def __init__(self, level, matches):
+        self.level = level
+        self.matches = matches
+
+    @property
+    def is_crisis(self):
+        return self.level == "high"
+
+    @property
+    def at_risk(self):
+        """
+        True for "high" and "elevated": the message must never get a local shortcut.
+        """
+        return self.level in ("high", "elevated")
+
+    def __repr__(self):
+        return f"CrisisAssessment(level={self.level!r}, matches={self.matches!r})"
+
+class CrisisDetector:
+    """
+    Fast local scan for self-harm and suicidal-intent phrasing.
+
+    All patterns are compiled into a single alternation, so assessing a
+    message is one regex pass plus a short look-behind for negation cues;
+    typical chat messages take a few microseconds.
+    """
+    def __init__(self, patterns=None, elevated_patterns=None):
+        self.patterns = list(patterns or HIGH_RISK_PATTERNS)
+        self.elevated_patterns = list(ELEVATED_RISK_PATTERNS if elevated_patterns is None else elevated_patterns)
+        self._matcher = re.compile("|".join(f"(?:{p})" for p in self.patterns))
+        self._elevated_matcher = (re.compile("|".join(f"(?:{p})" for p in self.elevated_patterns))
+                                  if self.elevated_patterns else None)
+
+    def assess(self, text):
+        """
+        Scans `text` for crisis phrasing.
+
+        Returns:
+            CrisisAssessment: "high" if at least one crisis match is not negated,
+                              otherwise "elevated" if a method or lethality pattern matches.
+        """
+        normalized = normalize(text or "")
+        matches = []
+        negated = 0
+        for match in self._matcher.finditer(normalized):
+            matches.append(match.group(0))
+            if self._is_negated(normalized, match.start(), match.group(0)):
+                negated += 1
+        if matches and negated < len(matches):
+            return CrisisAssessment("high", matches)
+        elevated = self._elevated_matcher.findall(normalized) if self._elevated_matcher is not None else []
+        if elevated:
+            return CrisisAssessment("elevated", matches + elevated)
+        return CrisisAssessment("negated" if matches else "none", matches)
+
+    @staticmethod
+    def _is_negated(text, start, phrase):
+        if phrase.startswith(("i don't", "i do not", "i dont", "no ")):
+            # The negation is part of the crisis phrase itself
+            return False
+        # Only look back within the current clause
+        clause_start = max(text.rfind(sep, 0, start) for sep in (".", "!", "?", ",", ";", " but ")) + 1
+        preceding = text[clause_start:start]
+        if NEGATION_EXCEPTIONS.search(preceding):
+            return False
+        window = " ".join(preceding.split()[-NEGATION_WINDOW_TOKENS:])
+        padded = f" {window} "
+        return any(f" {cue} " in padded for cue in NEGATION_CUES)
+
+def crisis_response(user_location=None):
+    """
+    The crisis protocol reply from the chatbot system prompt, with the user's
+    location when it is known.
+    """
+    services = f"emergency services in {user_location}" if user_location else "emergency services"
+    return (
+        "I’m so sorry you’re in this much pain. Please know you’re not alone. "
+        "I can’t provide emergency help, but I care about what happens to you. "
+        "Are you safe right now? "
+        f"Please reach out to a crisis hotline or {services} right away."
+    )
+
+_default_detector = None
+
+def get_default_detector():
+    global _default_detector
+    if _default_detector is None:
+        _default_detector = CrisisDetector()
+    return _default_detector
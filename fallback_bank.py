@@ -0,0 +1,57 @@
+import itertools
+import json
+import os
+import threading
+from prompt_schema import PromptSet
+
+BANK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "fallback_bank.json")
+
+class FallbackBank:
+    """
+    Curated offline responses, served while the API is unavailable: supportive
+    listening replies for chat and a fixed question set per mood for journal
+    prompts.
+    """
+    def __init__(self, chat_replies, journal_prompts):
+        self.chat_replies = chat_replies
+        # Keyed by casefolded mood, like the prompt pool
+        self.journal_prompts = {mood.casefold(): (mood, questions) for mood, questions in journal_prompts.items()}
+        self._next_reply = itertools.cycle(range(len(chat_replies)))
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path=BANK_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["chat"], data["journal_prompts"])
+
+    def chat_reply(self):
+        """
+        The next listening reply, rotating so consecutive turns differ.
+        """
+        with self._lock:
+            return self.chat_replies[next(self._next_reply)]
+
+    def journal_prompt(self, mood):
+        """
+        Returns:
+            PromptSet: The curated set, with fallback=True so callers can tell it
+                 apart (and avoid caching it). Unknown moods get the "Neutral" set
+                 under the requested mood name.
+        """
+        name, questions = self.journal_prompts.get(str(mood).strip().casefold(), (None, None))
+        if questions is None:
+            questions = self.journal_prompts["neutral"][1]
+            name = mood
+        return PromptSet(name, questions, fallback=True)
+
+_default_bank = None
+
+def get_fallback_bank():
+    """
+    The bank loaded from data/fallback_bank.json (loaded once, on first use).
+    """
+    global _default_bank
+    if _default_bank is None:
+        _default_bank = FallbackBank.from_file()
+    return _default_bank
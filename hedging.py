@@ -0,0 +1,157 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from llm_client import with_deadline
+
+class HedgingPolicy:
+    """
+    Hedged requests: if an attempt has not answered by the `percentile` of
+    recent latencies, a second identical attempt is started and whichever
+    finishes first wins. This trims the slow tail at the cost of a few extra
+    requests.
+
+    Hedges are capped at `budget` (a share of all requests, e.g. 0.05 = at
+    most one extra request per 20) and only start once `min_samples`
+    latencies have been seen. In the async version the losing attempt is
+    cancelled; a sync loser runs to completion on a worker thread and its
+    answer is discarded.
+
+    Args:
+        percentile (float): Latency percentile (0-1) after which to hedge.
+        budget (float): Most hedges per request, on average.
+        min_delay (float): Never hedge sooner than this many seconds.
+        min_samples (int): Latencies needed before hedging starts.
+        window (int): Recent latencies the percentile is computed over.
+        max_workers (int): Threads for sync attempts.
+    """
+    def __init__(self, percentile=0.95, budget=0.05, min_delay=0.05, min_samples=20, window=200, max_workers=32):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._max_workers = max_workers
+        self.requests = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+    def record_latency(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def hedge_delay(self):
+        """
+        Seconds to wait before hedging, or None while there are too few samples.
+        """
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+        return max(self.min_delay, ordered[index])
+
+    def _start_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def _take_hedge(self):
+        with self._lock:
+            if self.hedges_fired >= self.budget * self.requests:
+                return False
+            self.hedges_fired += 1
+            return True
+
+    def _won(self):
+        with self._lock:
+            self.hedges_won += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedges_fired": self.hedges_fired,
+                "hedges_won": self.hedges_won,
+                "samples": len(self._latencies),
+            }
+
+    def _timed(self, fn, args, kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.record_latency(time.perf_counter() - start)
+        return result
+
+    def _submit(self, fn, args, kwargs, deadline):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="hedge")
+        return self._executor.submit(self._timed, fn, args, with_deadline(kwargs, deadline))
+
+    def call(self, fn, *args, deadline=None, **kwargs):
+        """
+        Calls fn(*args, **kwargs), hedging it when it is slow. With a
+        `deadline`, each attempt gets the time left as its `timeout`.
+        """
+        self._start_request()
+        delay = self.hedge_delay()
+        if delay is None:
+            return self._timed(fn, args, with_deadline(kwargs, deadline))
+
+        first = self._submit(fn, args, kwargs, deadline)
+        done, _ = wait([first], timeout=delay)
+        if done or not self._take_hedge():
+            return first.result()
+
+        second = self._submit(fn, args, kwargs, deadline)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self._won()
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    async def _timed_async(self, fn, args, kwargs):
+        start = time.perf_counter()
+        result = await fn(*args, **kwargs)
+        self.record_latency(time.perf_counter() - start)
+        return result
+
+    async def call_async(self, fn, *args, deadline=None, **kwargs):
+        self._start_request()
+        delay = self.hedge_delay()
+        if delay is None:
+            return await self._timed_async(fn, args, with_deadline(kwargs, deadline))
+
+        first = asyncio.ensure_future(self._timed_async(fn, args, with_deadline(kwargs, deadline)))
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done or not self._take_hedge():
+                return await first
+
+            second = asyncio.ensure_future(self._timed_async(fn, args, with_deadline(kwargs, deadline)))
+            tasks.append(second)
+            pending = {first, second}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self._won()
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            # The loser (or both, if the caller was cancelled) stops here
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
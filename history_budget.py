@@ -0,0 +1,165 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    import tiktoken
+except ImportError: # Optional; fall back to a character-based estimate
+    tiktoken = None
+
+# Rough per-message framing cost (role markers etc.) in chat-format requests.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_encoding = None
+_encoding_loaded = False
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        if tiktoken is not None:
+            try:
+                _encoding = tiktoken.get_encoding("o200k_base") # gpt-4o family
+            except Exception:
+                # The encoding file may need a download that isn't possible offline
+                _encoding = None
+    return _encoding
+
+def count_text_tokens(text):
+    """
+    Counts tokens in `text` with tiktoken when available, otherwise estimates
+    about four characters per token.
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, (len(text) + 3) // 4) if text else 0
+
+class TokenCounter:
+    """
+    Counts tokens per chat message, remembering results so the same message is
+    not re-encoded on every turn it stays in the history.
+    """
+    def __init__(self, max_cached=4096):
+        self.max_cached = max_cached
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count_message(self, message):
+        key = (message.get("role", ""), message.get("content") or "")
+        with self._lock:
+            count = self._cache.get(key)
+            if count is not None:
+                self._cache.move_to_end(key)
+                return count
+        count = count_text_tokens(key[1]) + MESSAGE_OVERHEAD_TOKENS
+        with self._lock:
+            self._cache[key] = count
+            if len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        return count
+
+class _TrimPlan:
+    __slots__ = ("recent", "summary", "pending", "fingerprint")
+
+    def __init__(self, recent, summary, pending, fingerprint):
+        self.recent = recent
+        self.summary = summary
+        self.pending = pending
+        self.fingerprint = fingerprint
+
+class HistoryTrimmer:
+    """
+    Fits conversation history into a token budget, folding older turns into a
+    running summary.
+
+    The newest messages are kept while they fit in the budget (and
+    `max_messages`); everything older is represented by a summary. Summaries
+    are remembered by a fingerprint of the messages they cover, so on the next
+    turn only the messages that have newly fallen out of the window are sent
+    to the summarizer, together with the previous summary.
+    """
+    def __init__(self, max_messages=20, counter=None, max_summaries=256):
+        self.max_messages = max_messages
+        self.counter = counter or TokenCounter()
+        self.max_summaries = max_summaries
+        self._summaries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def trim(self, history, token_budget, summarizer=None):
+        """
+        Trims `history` to fit `token_budget` tokens.
+
+        Args:
+            history (list): Messages (dicts with 'role' and 'content'), oldest first.
+            token_budget (int): Tokens available for the kept messages.
+            summarizer (callable): Optional. Called as summarizer(previous_summary, messages)
+                                   and returns the updated summary text (or None on failure).
+                                   Without one, older messages are simply dropped.
+
+        Returns:
+            tuple: (summary, recent) where summary is a str or None and recent is
+                   the list of messages kept verbatim.
+        """
+        plan = self._plan(history, token_budget, summarizer is not None)
+        if plan.pending:
+            plan.summary = self._store(plan, summarizer(plan.summary, plan.pending))
+        return plan.summary, plan.recent
+
+    async def trim_async(self, history, token_budget, summarizer=None):
+        """
+        Same as trim(), for an async summarizer (a coroutine function).
+        """
+        plan = self._plan(history, token_budget, summarizer is not None)
+        if plan.pending:
+            plan.summary = self._store(plan, await summarizer(plan.summary, plan.pending))
+        return plan.summary, plan.recent
+
+    def _plan(self, history, token_budget, summarize):
+        start = len(history)
+        used = 0
+        while start > 0 and len(history) - start < self.max_messages:
+            cost = self.counter.count_message(history[start - 1])
+            if used + cost > token_budget:
+                break
+            used += cost
+            start -= 1
+
+        recent = list(history[start:])
+        dropped = history[:start]
+        if not dropped or not summarize:
+            return _TrimPlan(recent, None, [], None)
+
+        fingerprints = _prefix_fingerprints(dropped)
+        with self._lock:
+            # Find the longest already-summarized prefix of the dropped messages
+            for covered in range(len(dropped), 0, -1):
+                summary = self._summaries.get(fingerprints[covered])
+                if summary is not None:
+                    self._summaries.move_to_end(fingerprints[covered])
+                    break
+            else:
+                covered, summary = 0, None
+        return _TrimPlan(recent, summary, dropped[covered:], fingerprints[-1])
+
+    def _store(self, plan, new_summary):
+        if not new_summary:
+            # Summarizer failed; keep the older summary and retry next turn
+            return plan.summary
+        with self._lock:
+            self._summaries[plan.fingerprint] = new_summary
+            if len(self._summaries) > self.max_summaries:
+                self._summaries.popitem(last=False)
+        return new_summary
+
+def _prefix_fingerprints(messages):
+    """
+    Returns [fp_0, fp_1, ..., fp_n] where fp_i identifies messages[:i].
+    """
+    fingerprints = [""]
+    digest = hashlib.sha1()
+    for message in messages:
+        digest.update(message.get("role", "").encode("utf-8") + b"\0")
+        digest.update((message.get("content") or "").encode("utf-8") + b"\0")
+        fingerprints.append(digest.copy().hexdigest())
+    return fingerprints
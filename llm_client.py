@@ -0,0 +1,312 @@
+import asyncio
+import email.utils
+import os
+import random
+import threading
+import time
+
+from dotenv import load_dotenv
+
+# Status codes worth retrying: rate limits, timeouts and transient server errors.
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+class ClientSettings:
+    """
+    Connection settings shared by every OpenAI client in the package.
+
+    Defaults can be overridden with environment variables (shown in brackets).
+    """
+    def __init__(self):
+        self.api_key = os.getenv("OPENAI_API_KEY")
+        self.base_url = os.getenv("OPENAI_BASE_URL") or None
+        self.connect_timeout = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))   # [OPENAI_CONNECT_TIMEOUT]
+        self.read_timeout = float(os.getenv("OPENAI_READ_TIMEOUT", "60"))        # [OPENAI_READ_TIMEOUT]
+        self.pool_timeout = float(os.getenv("OPENAI_POOL_TIMEOUT", "10"))        # [OPENAI_POOL_TIMEOUT]
+        self.max_connections = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))   # [OPENAI_MAX_CONNECTIONS]
+        self.max_keepalive = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))        # [OPENAI_MAX_KEEPALIVE]
+        self.keepalive_expiry = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30")) # [OPENAI_KEEPALIVE_EXPIRY]
+        self.max_retries = int(os.getenv("OPENAI_MAX_RETRIES", "3"))             # [OPENAI_MAX_RETRIES]
+        self.backoff_base = float(os.getenv("OPENAI_BACKOFF_BASE", "0.5"))       # [OPENAI_BACKOFF_BASE]
+        self.backoff_max = float(os.getenv("OPENAI_BACKOFF_MAX", "8"))           # [OPENAI_BACKOFF_MAX]
+
+    def timeout(self):
+        import httpx
+        return httpx.Timeout(
+            connect=self.connect_timeout, read=self.read_timeout, write=self.connect_timeout, pool=self.pool_timeout
+        )
+
+    def limits(self):
+        import httpx
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+_lock = threading.Lock()
+_environment_loaded = False
+_settings = None
+_http_client = None
+_async_http_client = None
+
+def load_environment():
+    """
+    Loads variables from a .env file into os.environ (once per process).
+    """
+    global _environment_loaded
+    if not _environment_loaded:
+        load_dotenv()
+        _environment_loaded = True
+
+def get_settings():
+    global _settings
+    load_environment()
+    with _lock:
+        if _settings is None:
+            _settings = ClientSettings()
+        return _settings
+
+def shared_http_client():
+    """
+    The process-wide httpx.Client (connection pool with keep-alive) used by
+    every synchronous OpenAI client.
+    """
+    global _http_client
+    import httpx
+    settings = get_settings()
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(timeout=settings.timeout(), limits=settings.limits())
+        return _http_client
+
+def shared_async_http_client():
+    """
+    The process-wide httpx.AsyncClient used by every AsyncOpenAI client. Its
+    connections belong to the event loop that first uses them, so a process
+    should run its async work on one loop.
+    """
+    global _async_http_client
+    import httpx
+    settings = get_settings()
+    with _lock:
+        if _async_http_client is None:
+            _async_http_client = httpx.AsyncClient(timeout=settings.timeout(), limits=settings.limits())
+        return _async_http_client
+
+def client_options(**overrides):
+    """
+    Keyword arguments for OpenAI(...) that share one connection pool and the
+    configured timeouts. Retries are left to RetryPolicy (max_retries=0), so
+    they are not applied twice.
+    """
+    settings = get_settings()
+    options = {
+        "api_key": settings.api_key,
+        "base_url": settings.base_url,
+        "timeout": settings.timeout(),
+        "max_retries": 0,
+        "http_client": shared_http_client(),
+    }
+    options.update(overrides)
+    return options
+
+def async_client_options(**overrides):
+    """
+    Keyword arguments for AsyncOpenAI(...); see client_options().
+    """
+    options = client_options(http_client=shared_async_http_client())
+    options.update(overrides)
+    return options
+
+def reset_clients():
+    """
+    Closes the shared connection pools and re-reads settings from the
+    environment on next use (for tests and configuration changes).
+    """
+    global _settings, _http_client, _async_http_client
+    with _lock:
+        if _http_client is not None:
+            _http_client.close()
+        _settings = _http_client = _async_http_client = None
+
+def _connection_errors():
+    import httpx
+    errors = [httpx.TransportError]
+    try:
+        import openai
+        errors.append(openai.APIConnectionError)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+def is_transient_error(exc):
+    """
+    True for failures that say the service is unavailable or overloaded (rate
+    limits, 5xx, timeouts, connection errors) rather than a problem with the
+    request itself.
+    """
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS
+    return isinstance(exc, _connection_errors())
+
+def parse_retry_after(exc):
+    """
+    Seconds the server asked us to wait (Retry-After / retry-after-ms headers),
+    or None.
+    """
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms is not None:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000)
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if retry_after is None:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised when a call's deadline passes before it could complete.
+    """
+    def __init__(self, deadline):
+        super().__init__(f"Deadline of {deadline.seconds:g}s exceeded")
+        self.deadline = deadline
+
+class Deadline:
+    """
+    A point in time by which a request must finish, `seconds` from creation.
+    """
+    def __init__(self, seconds, clock=time.monotonic):
+        self.seconds = seconds
+        self.clock = clock
+        self.expires_at = clock() + seconds
+
+    @classmethod
+    def coerce(cls, deadline):
+        """
+        Accepts None, a number of seconds or a Deadline.
+        """
+        if deadline is None or isinstance(deadline, Deadline):
+            return deadline
+        return cls(deadline)
+
+    def remaining(self):
+        return max(0.0, self.expires_at - self.clock())
+
+    def expired(self):
+        return self.clock() >= self.expires_at
+
+def with_deadline(kwargs, deadline):
+    """
+    `kwargs` with the request `timeout` capped at the time left before
+    `deadline`. Raises DeadlineExceeded if none is left.
+    """
+    if deadline is None:
+        return kwargs
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise DeadlineExceeded(deadline)
+    timeout = kwargs.get("timeout")
+    if isinstance(timeout, (int, float)):
+        remaining = min(remaining, timeout)
+    return {**kwargs, "timeout": remaining}
+
+class RetryPolicy:
+    """
+    Retries a call on rate limits, transient server errors and connection
+    failures, with full-jitter exponential backoff.
+
+    When the server sends Retry-After, that delay is used instead (capped at
+    `max_retry_after`). Any other exception is raised immediately.
+    """
+    def __init__(self, max_retries=None, backoff_base=None, backoff_max=None, max_retry_after=60.0, sleep=time.sleep):
+        settings = get_settings()
+        self.max_retries = settings.max_retries if max_retries is None else max_retries
+        self.backoff_base = settings.backoff_base if backoff_base is None else backoff_base
+        self.backoff_max = settings.backoff_max if backoff_max is None else backoff_max
+        self.max_retry_after = max_retry_after
+        self.sleep = sleep
+        self.retries = 0
+
+    def is_retryable(self, exc):
+        return is_transient_error(exc)
+
+    def delay(self, attempt, exc=None):
+        """
+        Seconds to wait before retry number `attempt` (0-based).
+        """
+        retry_after = parse_retry_after(exc) if exc is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _backoff(self, attempt, exc, deadline):
+        """
+        Seconds to wait before the next attempt; re-raises `exc` when it should
+        not be retried.
+        """
+        if deadline is not None and deadline.expired():
+            # Usually the request's own timeout firing at the deadline
+            raise DeadlineExceeded(deadline) from exc
+        if attempt >= self.max_retries or not self.is_retryable(exc):
+            raise exc
+        delay = self.delay(attempt, exc)
+        if deadline is not None and delay >= deadline.remaining():
+            raise exc
+        return delay
+
+    def call(self, fn, *args, deadline=None, **kwargs):
+        """
+        Calls fn(*args, **kwargs), retrying transient failures. With a
+        `deadline`, every attempt gets the remaining time as its `timeout` and
+        no retry is started that could not finish in time.
+        """
+        attempt = 0
+        while True:
+            try:
+                return fn(*args, **with_deadline(kwargs, deadline))
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                self.sleep(self._backoff(attempt, e, deadline))
+                self.retries += 1
+                attempt += 1
+
+    async def call_async(self, fn, *args, deadline=None, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return await fn(*args, **with_deadline(kwargs, deadline))
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                await asyncio.sleep(self._backoff(attempt, e, deadline))
+                self.retries += 1
+                attempt += 1
+
+_default_policy = None
+
+def default_retry_policy():
+    global _default_policy
+    with _lock:
+        policy = _default_policy
+    if policy is None:
+        policy = RetryPolicy()
+        with _lock:
+            _default_policy = _default_policy or policy
+            policy = _default_policy
+    return policy
@@ -0,0 +1,47 @@
+import threading
+
+def _as_int(value):
+    return value if isinstance(value, int) else 0
+
+def extract_usage(response_or_chunk):
+    """
+    Pulls token counts out of a chat completion (or the final usage chunk of a
+    stream).
+
+    Returns:
+        dict: 'prompt_tokens', 'completion_tokens' and 'cached_tokens' (prompt
+              tokens the provider served from its prompt cache). Missing fields are 0.
+    """
+    usage = getattr(response_or_chunk, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": _as_int(getattr(usage, "prompt_tokens", 0)),
+        "completion_tokens": _as_int(getattr(usage, "completion_tokens", 0)),
+        "cached_tokens": _as_int(getattr(details, "cached_tokens", 0)),
+    }
+
+class UsageTracker:
+    """
+    Running totals of token usage, including how much of the prompt the
+    provider served from its prompt cache.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+
+    def record(self, usage):
+        with self._lock:
+            self._totals["calls"] += 1
+            for key in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+                self._totals[key] += usage.get(key, 0)
+
+    def totals(self):
+        """
+        Returns the totals plus 'cache_hit_rate', the share of prompt tokens that
+        were cached (0.0 when nothing has been recorded).
+        """
+        with self._lock:
+            totals = dict(self._totals)
+        prompt_tokens = totals["prompt_tokens"]
+        totals["cache_hit_rate"] = totals["cached_tokens"] / prompt_tokens if prompt_tokens else 0.0
+        return totals
@@ -0,0 +1,292 @@
+import bisect
+import threading
+import time
+from llm_usage import extract_usage
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+TOKEN_TYPES = ("prompt_tokens", "completion_tokens", "cached_tokens")
+
+class _Shard:
+    """
+    One thread's metric values. Only its own thread writes to it, so
+    recording needs no lock; the exporter merges all shards.
+    """
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        self.counters = {}    # (name, labels) -> number
+        self.histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+
+class CallRecord:
+    """
+    Tracks one LLM call from start to finish; see MetricsRegistry.start_call.
+    """
+    __slots__ = ("registry", "feature", "model", "start", "first_token_at")
+
+    def __init__(self, registry, feature, model):
+        self.registry = registry
+        self.feature = feature
+        self.model = model
+        self.start = time.perf_counter()
+        self.first_token_at = None
+
+    def first_token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def finish(self, usage=None, error=None):
+        """
+        Records the call.
+
+        Args:
+            usage (dict): Token counts as returned by llm_usage.extract_usage.
+            error (Exception): The exception the call failed with, if any.
+        """
+        self.registry.record_call(
+            self.feature, self.model, time.perf_counter() - self.start,
+            first_token=None if self.first_token_at is None else self.first_token_at - self.start,
+            usage=usage, error=error,
+        )
+
+class MetricsRegistry:
+    """
+    In-process metrics for LLM calls: request and error counts, latency and
+    time-to-first-token histograms, and token counts, labeled by feature and
+    model. Exported in the Prometheus text format.
+
+    Each thread records into its own shard without locking; the shards are
+    only combined when metrics are exported. Shards of threads that have
+    finished are folded into one retired shard, so a thread per request (or
+    per Streamlit rerun) does not grow the registry.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._shards = []  # (thread, shard) pairs
+        self._retired = _Shard()
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = _Shard()
+            self._local.shard = shard
+            with self._lock:
+                self._retire_finished()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _retire_finished(self):
+        """
+        Folds the shards of finished threads into the retired shard. Callers
+        hold self._lock; a finished thread can no longer write to its shard.
+        """
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                self._merge(self._retired, shard)
+        self._shards = live
+
+    @staticmethod
+    def _merge(into, shard):
+        for key, value in list(shard.counters.items()):
+            into.counters[key] = into.counters.get(key, 0) + value
+        for key, values in list(shard.histograms.items()):
+            merged = into.histograms.setdefault(key, [0] * len(values))
+            for i, value in enumerate(list(values)):
+                merged[i] += value
+
+    def shard_count(self):
+        """
+        Shards currently kept: one per live thread that has recorded, plus the retired one.
+        """
+        with self._lock:
+            return len(self._shards) + 1
+
+    def start_call(self, feature, model):
+        """
+        Starts timing a call. Mark the first streamed token with
+        CallRecord.first_token() and record the call with CallRecord.finish().
+        """
+        return CallRecord(self, feature, model)
+
+    def call(self, feature, fn, *args, **kwargs):
+        """
+        Calls fn(*args, **kwargs), a non-streaming chat completions request, and
+        records its latency, token usage (from the response) or error class.
+        The model label comes from the `model` keyword argument.
+        """
+        record = self.start_call(feature, kwargs.get("model"))
+        try:
+            response = fn(*args, **kwargs)
+        except Exception as e:
+            record.finish(error=e)
+            raise
+        record.finish(usage=extract_usage(response))
+        return response
+
+    async def call_async(self, feature, fn, *args, **kwargs):
+        """
+        Async version of call: awaits fn(*args, **kwargs).
+        """
+        record = self.start_call(feature, kwargs.get("model"))
+        try:
+            response = await fn(*args, **kwargs)
+        except Exception as e:
+            record.finish(error=e)
+            raise
+        record.finish(usage=extract_usage(response))
+        return response
+
+    def record_call(self, feature, model, latency, first_token=None, usage=None, error=None):
+        shard = self._shard()
+        labels = (("feature", feature), ("model", model or "unknown"))
+        status = "ok" if error is None else "error"
+        self._inc(shard, "llm_requests_total", labels + (("status", status),))
+        if error is not None:
+            self._inc(shard, "llm_errors_total", labels + (("error", type(error).__name__),))
+        self._observe(shard, "llm_request_duration_seconds", labels, latency)
+        if first_token is not None:
+            self._observe(shard, "llm_time_to_first_token_seconds", labels, first_token)
+        if usage:
+            for token_type in TOKEN_TYPES:
+                count = usage.get(token_type) or 0
+                if count:
+                    self._inc(shard, "llm_tokens_total", labels + (("type", token_type.replace("_tokens", "")),), count)
+
+    def record_local_reply(self, feature, reason):
+        """
+        Counts a reply served locally, without an API call (e.g. a canned greeting).
+        """
+        self._inc(self._shard(), "llm_local_replies_total", (("feature", feature), ("reason", reason)))
+
+    def record_route(self, feature, model, reason):
+        """
+        Counts a model routing decision (see model_router.py).
+        """
+        self._inc(self._shard(), "llm_route_decisions_total", (("feature", feature), ("model", model), ("reason", reason)))
+
+    @staticmethod
+    def _inc(shard, name, labels, amount=1):
+        key = (name, labels)
+        shard.counters[key] = shard.counters.get(key, 0) + amount
+
+    def _observe(self, shard, name, labels, value):
+        key = (name, labels)
+        histogram = shard.histograms.get(key)
+        if histogram is None:
+            histogram = shard.histograms[key] = [0] * (len(self.buckets) + 2)
+        histogram[bisect.bisect_left(self.buckets, value)] += 1
+        histogram[-1] += value
+
+    def snapshot(self):
+        """
+        Merged values from every thread.
+
+        Returns:
+            tuple: ({(name, labels): count}, {(name, labels): [bucket counts..., +Inf count, sum]})
+        """
+        merged = _Shard()
+        with self._lock:
+            self._retire_finished()
+            self._merge(merged, self._retired)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            self._merge(merged, shard)
+        return merged.counters, merged.histograms
+
+    def export_prometheus(self):
+        """
+        All metrics in the Prometheus text exposition format (version 0.0.4).
+        """
+        counters, histograms = self.snapshot()
+        lines = []
+        for name, help_text in _COUNTERS:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for name, help_text in _HISTOGRAMS:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for (metric, labels), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _format_value(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(values[-1])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            for _, shard in self._shards:
+                shard.counters.clear()
+                shard.histograms.clear()
+            self._retired = _Shard()
+
+_COUNTERS = (
+    ("llm_requests_total", "LLM calls by feature, model and status."),
+    ("llm_errors_total", "Failed LLM calls by feature, model and exception class."),
+    ("llm_tokens_total", "Tokens used by LLM calls, by type (prompt, completion, cached)."),
+    ("llm_local_replies_total", "Replies served locally without an LLM call, by reason."),
+    ("llm_route_decisions_total", "Model chosen per turn by the router, by reason."),
+)
+
+_HISTOGRAMS = (
+    ("llm_request_duration_seconds", "Duration of LLM calls, retries included."),
+    ("llm_time_to_first_token_seconds", "Time until the first streamed token arrived."),
+)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+def _format_value(value):
+    # Whole numbers print without a trailing ".0"; Prometheus reads both
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+# The registry every module records into
+registry = MetricsRegistry()
+
+def serve_metrics(port=9464, host="127.0.0.1", metrics_registry=None):
+    """
+    Serves GET /metrics in the Prometheus text format from a daemon thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server (call shutdown() to stop it).
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    source = metrics_registry or registry
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = source.export_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,253 @@
+import collections
+import json
+import os
+import re
+import threading
+import time
+
+from crisis_detector import normalize
+from metrics import registry as metrics
+
+# Cheap local signals that a turn needs the web-search model. Each is a regular
+# expression over normalized (lowercased, straight apostrophe, single-spaced)
+# text, so routing a message costs a few regex passes.
+
+# Wording that asks for facts rather than for someone to listen
+FACTUAL_CUES = re.compile(
+    r"\b(?:what (?:is|are|causes|helps with)|what's the|how (?:does|long|much|many|common|effective)|is it (?:true|safe)"
+    r"|safe to (?:take|use|mix|stop)"
+    r"|are there|signs of|symptoms of|side effects?|difference between|research|studies|study|evidence|statistics"
+    r"|according to|facts about|recommended|guidelines)\b"
+)
+
+# Health topics a factual question has to be about to need sources
+HEALTH_TERMS = re.compile(
+    r"\b(?:symptoms?|side effects?|medications?|meds|antidepressants?|ssris?|sertraline|fluoxetine|dosage|diagnos\w*"
+    r"|disorders?|adhd|ocd|ptsd|bipolar|insomnia|panic attacks?|depression|anxiety|burnout|therapy|cbt|dbt|emdr"
+    r"|mindfulness|meditation|melatonin|caffeine|sleep|serotonin|dopamine|mental health|seasonal affective)\b"
+)
+
+# Asking where to find help: answers depend on current, local information
+RESOURCE_CUES = re.compile(
+    r"\b(?:hotlines?|helplines?|crisis (?:lines?|text lines?|centers?|centres?)|emergency number"
+    r"|support groups?|(?:therapists?|counsell?ors?|psychologists?|clinics?) (?:near|in)|where can i (?:find|get|call))\b"
+)
+
+# Explicitly asking for sources counts as a factual question on any topic
+SOURCE_CUES = re.compile(r"\b(?:sources?|citations?|references?|links? to)\b")
+
+_QUESTION_START = re.compile(r"^(?:what|how|why|is|are|does|do|can|could|should|which|where|when|tell me|explain)\b")
+
+class ModelProfile:
+    """
+    Request parameters and list prices for one model.
+
+    Attributes:
+        model (str): Model name sent to the API.
+        params (dict): Extra request parameters (e.g. temperature).
+        unsupported (frozenset): Parameters the model rejects; request_kwargs drops them.
+        input_price, output_price (float): US dollars per million prompt / completion tokens.
+        call_price (float): US dollars per request on top of tokens (web search fees).
+    """
+    __slots__ = ("model", "params", "unsupported", "input_price", "output_price", "call_price")
+
+    def __init__(self, model, params=None, unsupported=(), input_price=0.0, output_price=0.0, call_price=0.0):
+        self.model = model
+        self.params = dict(params or {})
+        self.unsupported = frozenset(unsupported)
+        self.input_price = input_price
+        self.output_price = output_price
+        self.call_price = call_price
+
+    def request_kwargs(self, **kwargs):
+        """
+        Keyword arguments for chat.completions.create: the model, its params and
+        `kwargs`, without any parameter the model rejects.
+        """
+        merged = {"model": self.model, **self.params, **kwargs}
+        return {key: value for key, value in merged.items() if key not in self.unsupported}
+
+    def cost(self, usage):
+        """
+        Dollars for one call with `usage` (a dict as from llm_usage.extract_usage).
+        """
+        return (self.call_price + usage.get("prompt_tokens", 0) * self.input_price / 1e6
+                + usage.get("completion_tokens", 0) * self.output_price / 1e6)
+
+    def __repr__(self):
+        return f"ModelProfile(model={self.model!r}, params={self.params!r})"
+
+# List prices at the time of writing; check the provider's pricing page before relying on cost reports
+MODEL_PROFILES = {
+    "gpt-4o-mini": ModelProfile("gpt-4o-mini", params={"temperature": 0.7}, input_price=0.15, output_price=0.60),
+    # The search models reject sampling parameters ("Model incompatible request argument supplied: temperature")
+    "gpt-4o-search-preview": ModelProfile(
+        "gpt-4o-search-preview", params={"web_search_options": {"search_context_size": "low"}},
+        unsupported=("temperature", "top_p", "n", "presence_penalty", "frequency_penalty", "logit_bias",
+                     "logprobs", "top_logprobs"),
+        input_price=2.50, output_price=10.00, call_price=0.030,
+    ),
+    "gpt-4o": ModelProfile("gpt-4o", params={"temperature": 0.7}, input_price=2.50, output_price=10.00),
+}
+
+def get_profile(model):
+    """
+    The registered profile for `model`, or one with no extra parameters.
+    """
+    profile = MODEL_PROFILES.get(model)
+    return profile if profile is not None else ModelProfile(model)
+
+class RouteDecision:
+    """
+    Result of ModelRouter.route().
+
+    Attributes:
+        model (str): The model the turn goes to.
+        reason (str): "crisis_with_location", "resource_lookup", "health_question" or "listening".
+        signals (dict): The local signals the decision was made from.
+    """
+    __slots__ = ("model", "reason", "signals")
+
+    def __init__(self, model, reason, signals):
+        self.model = model
+        self.reason = reason
+        self.signals = signals
+
+    @property
+    def profile(self):
+        return get_profile(self.model)
+
+    def __repr__(self):
+        return f"RouteDecision(model={self.model!r}, reason={self.reason!r})"
+
+def signals(user_input, user_location=None, crisis=False):
+    """
+    The local signals routing looks at, for one message.
+    """
+    text = normalize(user_input or "")
+    return {
+        "crisis": bool(crisis),
+        "location": bool(user_location),
+        "question": text.endswith("?") or bool(_QUESTION_START.match(text)),
+        "factual": bool(FACTUAL_CUES.search(text)),
+        "health": bool(HEALTH_TERMS.search(text)),
+        "resource": bool(RESOURCE_CUES.search(text)),
+        "sources": bool(SOURCE_CUES.search(text)),
+    }
+
+def reason_for(found):
+    """
+    Why a turn with these signals goes where it does: "crisis_with_location",
+    "resource_lookup" or "health_question" (the search model) or "listening".
+    """
+    if found["crisis"] and found["location"]:
+        return "crisis_with_location"
+    if found["resource"]:
+        return "resource_lookup"
+    if found["question"] and ((found["factual"] and found["health"]) or found["sources"]):
+        return "health_question"
+    return "listening"
+
+def needs_search(user_input, user_location=None, crisis=False):
+    """
+    True if the turn should be answered by the search model. Nothing is logged.
+    """
+    return reason_for(signals(user_input, user_location, crisis)) != "listening"
+
+class DecisionLog:
+    """
+    The latest routing decisions plus running counts, and optionally every
+    decision appended to a JSONL file. Entries hold the signals and the message
+    length, never the message itself.
+    """
+    def __init__(self, max_entries=1000, path=None):
+        self.path = path
+        self._entries = collections.deque(maxlen=max_entries)
+        self._counts = collections.Counter()
+        self._lock = threading.Lock()
+
+    def record(self, decision, chars):
+        entry = {"time": round(time.time(), 3), "model": decision.model, "reason": decision.reason,
+                 "chars": chars, "signals": decision.signals}
+        with self._lock:
+            self._entries.append(entry)
+            self._counts[(decision.model, decision.reason)] += 1
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+
+    def recent(self, limit=50):
+        """
+        The last `limit` decisions, oldest first.
+        """
+        with self._lock:
+            return list(self._entries)[-limit:]
+
+    def stats(self):
+        """
+        Decision counts in total, by model and by reason.
+        """
+        with self._lock:
+            counts = dict(self._counts)
+        by_model, by_reason = collections.Counter(), collections.Counter()
+        for (model, reason), count in counts.items():
+            by_model[model] += count
+            by_reason[reason] += count
+        return {"decisions": sum(counts.values()), "by_model": dict(by_model), "by_reason": dict(by_reason)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counts.clear()
+
+class ModelRouter:
+    """
+    Picks the model for each chat turn from local signals, so the slow and
+    costly web-search model only answers turns that need current or sourced
+    information:
+
+    - a crisis message from a user whose location is known (to find local services)
+    - a request for help resources such as hotlines or support groups
+    - an explicit factual question about a health topic, or a request for sources
+
+    Every other turn, ordinary reflective listening included, goes to `model`.
+    """
+    def __init__(self, model, search_model, log=None, feature="chat"):
+        self.model = model
+        self.search_model = search_model
+        self.log = log if log is not None else get_decision_log()
+        self.feature = feature
+
+    def route(self, user_input, user_location=None, crisis=False):
+        """
+        Decides which model answers `user_input`, and records the decision.
+
+        Args:
+            user_input (str): The user's message.
+            user_location (str): Optional. The user's location, if known.
+            crisis (bool): Whether the crisis detector flagged the message.
+
+        Returns:
+            RouteDecision: The chosen model and why.
+        """
+        found = signals(user_input, user_location, crisis)
+        reason = reason_for(found)
+        decision = RouteDecision(self.model if reason == "listening" else self.search_model, reason, found)
+        self.log.record(decision, len(user_input or ""))
+        metrics.record_route(self.feature, decision.model, reason)
+        return decision
+
+_default_log = None
+_log_lock = threading.Lock()
+
+def get_decision_log():
+    """
+    The process-wide decision log. Set CHAT_ROUTE_LOG to a file path to also
+    append every decision to it as JSON lines.
+    """
+    global _default_log
+    if _default_log is None:
+        with _log_lock:
+            if _default_log is None:
+                _default_log = DecisionLog(path=os.getenv("CHAT_ROUTE_LOG"))
+    return _default_log
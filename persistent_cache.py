@@ -0,0 +1,132 @@
+import hashlib
+import threading
+import time
+
+from sqlite_connections import LocalConnections
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS entries ("
+    "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+    "created_at REAL NOT NULL, accessed_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)",
+)
+
+class PersistentCache:
+    """
+    On-disk cache for LLM outputs, shared by every worker process on the host.
+
+    Entries live in a local SQLite file opened in WAL mode, so many processes
+    can read while one writes, and a restarted worker starts with everything
+    its predecessors cached. Entries expire `ttl` seconds after they were
+    written, and the least recently used ones are evicted once the cache holds
+    more than `max_entries` entries or `max_bytes` bytes of values.
+
+    Keys are built with make_key() from the model, a hash of the system prompt
+    and the input, so changing the prompt or model naturally misses.
+    """
+    # Reads only refresh an entry's LRU timestamp when it is older than this,
+    # which keeps hot keys from turning every read into a write.
+    touch_interval = 60
+
+    def __init__(self, path, ttl=86400, max_entries=10000, max_bytes=50 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._connections = LocalConnections(path, SCHEMA)
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._connect()
+
+    @staticmethod
+    def make_key(model, system_prompt, user_input):
+        """
+        Builds a cache key from the model name, the system prompt and the input.
+        """
+        prompt_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{model}\0{prompt_hash}\0{user_input}".encode("utf-8")).hexdigest()
+
+    def _connect(self):
+        return self._connections.get()
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def get(self, key):
+        """
+        Returns the cached value for `key`, or None if it is missing or expired.
+        """
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, created_at, accessed_at FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or now - row[1] >= self.ttl:
+            self._count("misses")
+            return None
+        if now - row[2] >= self.touch_interval:
+            conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return row[0]
+
+    def set(self, key, value):
+        """
+        Stores `value` (a string) under `key`, then evicts expired and least
+        recently used entries if the cache is over its limits.
+        """
+        conn = self._connect()
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            evicted = self._evict(conn, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._count("writes")
+        if evicted:
+            self._count("evictions", evicted)
+
+    def _evict(self, conn, now):
+        evicted = conn.execute("DELETE FROM entries WHERE created_at <= ?", (now - self.ttl,)).rowcount
+        count, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if count <= self.max_entries and total_bytes <= self.max_bytes:
+            return evicted
+
+        excess_entries = max(0, count - self.max_entries)
+        excess_bytes = max(0, total_bytes - self.max_bytes)
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+            if excess_entries <= 0 and excess_bytes <= 0:
+                break
+            doomed.append((key,))
+            excess_entries -= 1
+            excess_bytes -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        return evicted + len(doomed)
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM entries")
+
+    def stats(self):
+        """
+        Returns this process's hit/miss/write/eviction counters plus the current
+        number of entries and bytes stored in the shared file.
+        """
+        count, total_bytes = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["entries"] = count
+        stats["bytes"] = total_bytes
+        return stats
@@ -0,0 +1,291 @@
+"""
+Pre-generates journal prompts through the OpenAI Batch API.
+
+Batch requests cost about half as much as synchronous ones and have their own
+rate limits, in exchange for finishing within a 24 hour window instead of
+seconds. That suits the nightly pre-generation of prompt sets, which nobody is
+waiting on. A run has four steps:
+
+    1. write one JSON-mode chat completions request per mood to a JSONL file
+    2. upload the file and create a batch tagged with the caller's job id
+    3. poll the batch, backing off exponentially, until it finishes
+    4. stream the output file line by line, validate every answer and hand
+       it to a store (by default the persistent prompt cache)
+
+Job ids make submission idempotent. Before a batch is created, the most
+recent batches are searched for one carrying the same job id, and one that is
+still running or has completed is reused. A create call that fails after the
+request went out is checked the same way before it is retried. Re-running a
+crashed or interrupted nightly job therefore picks up the batch it already
+paid for instead of submitting a second one. Only batches that failed,
+expired or were cancelled are submitted again.
+
+Usage:
+    python prompt_batch.py --cache prompts.sqlite                       # all moods, job id journal-prompts-<today>
+    python prompt_batch.py --cache prompts.sqlite --job-id nightly-42 --no-wait
+    python prompt_batch.py --cache prompts.sqlite --moods Happy,Sad --timeout 3600
+"""
+import argparse
+import datetime
+import json
+import random
+import sys
+import time
+from collections import Counter
+
+import prompt_generator
+from llm_client import Deadline, DeadlineExceeded, default_retry_policy
+from prompt_schema import PromptError, PromptSet, PromptValidationError
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+
+# A batch in one of these states is reused for its job id instead of submitting again
+REUSABLE_STATUSES = ("validating", "in_progress", "finalizing", "completed")
+FINISHED_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+def default_job_id(day=None):
+    """
+    The job id of a nightly run: one batch per calendar day.
+    """
+    return f"journal-prompts-{day or datetime.date.today().isoformat()}"
+
+def _items(moods):
+    # (key, mood) pairs: a list of moods is keyed by the moods themselves
+    if isinstance(moods, dict):
+        return list(moods.items())
+    return [(mood, mood) for mood in dict.fromkeys(moods)]
+
+def build_batch_file(moods):
+    """
+    The batch input file: one JSON-mode chat completions request per mood, with
+    the same model and messages as generate_prompt.
+
+    Args:
+        moods (list or dict): Moods, or a dict of key (e.g. a user id) -> mood.
+
+    Returns:
+        bytes: JSONL, one request per line. Each custom_id is "<key>|<mood>".
+    """
+    lines = []
+    for key, mood in _items(moods):
+        lines.append(json.dumps({
+            "custom_id": f"{key}|{mood}",
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": {
+                "model": prompt_generator.MODEL,
+                "messages": prompt_generator._build_messages(mood),
+                "response_format": {"type": "json_object"},
+            },
+        }, ensure_ascii=False))
+    return "".join(line + "\n" for line in lines).encode()
+
+def _usage(body):
+    usage = body.get("usage") or {}
+    details = usage.get("prompt_tokens_details") or {}
+    return {
+        "prompt_tokens": usage.get("prompt_tokens") or 0,
+        "completion_tokens": usage.get("completion_tokens") or 0,
+        "cached_tokens": details.get("cached_tokens") or 0,
+    }
+
+def parse_result_line(record):
+    """
+    Turns one line of a batch output or error file into (key, result).
+
+    Returns:
+        tuple: The request's key and a PromptSet, or a PromptError when the
+               request failed or its answer did not validate.
+    """
+    key, _, mood = str(record.get("custom_id") or "").rpartition("|")
+    response = record.get("response") or {}
+    body = response.get("body") or {}
+    if record.get("error") or response.get("status_code") != 200:
+        error = record.get("error") or body.get("error") or {}
+        message = error.get("message") or f"status {response.get('status_code')}"
+        return key, PromptError(mood, "api_error", f"Batch request failed: {message}")
+
+    prompt_generator.usage_tracker.record(_usage(body))
+    try:
+        content = body["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        content = None
+    try:
+        return key, PromptSet.from_json(content, mood)
+    except PromptValidationError as e:
+        return key, PromptError(mood, "invalid_response", f"Invalid prompt set: {e}")
+
+class PromptBatchRunner:
+    """
+    Submits, polls and collects journal prompt batches.
+
+    Args:
+        client (OpenAI): Client to use. Defaults to the prompt generator's shared client.
+        retry_policy (RetryPolicy): Retries for each API call. Defaults to the shared policy.
+        lookup_limit (int): Most recent batches searched for an earlier batch with the same job id.
+        sleep (callable): Waits between status checks.
+    """
+    def __init__(self, client=None, retry_policy=None, lookup_limit=100, sleep=time.sleep):
+        self.client = client or prompt_generator.get_client()
+        self.retry_policy = retry_policy or default_retry_policy()
+        self.lookup_limit = lookup_limit
+        self.sleep = sleep
+
+    def find(self, job_id):
+        """
+        The most recent batch tagged with `job_id`, or None.
+        """
+        batches = self.retry_policy.call(self.client.batches.list, limit=min(self.lookup_limit, 100))
+        for n, batch in enumerate(batches):
+            if n >= self.lookup_limit:
+                break
+            if (batch.metadata or {}).get("job_id") == job_id:
+                return batch
+        return None
+
+    def _reusable(self, job_id):
+        batch = self.find(job_id)
+        return batch if batch is not None and batch.status in REUSABLE_STATUSES else None
+
+    def submit(self, moods, job_id):
+        """
+        Uploads the batch file for `moods` and creates the batch, unless a
+        usable batch with `job_id` exists already.
+
+        Returns:
+            tuple: (batch, submitted), where `submitted` is False when an earlier
+                   batch was reused.
+        """
+        existing = self._reusable(job_id)
+        if existing is not None:
+            return existing, False
+        data = build_batch_file(moods)
+        if not data:
+            raise ValueError("No moods to submit")
+        upload = self.retry_policy.call(self.client.files.create, file=(f"{job_id}.jsonl", data), purpose="batch")
+
+        attempts = []
+        def create():
+            if attempts:
+                # The failed attempt may have reached the API before the connection broke
+                existing = self._reusable(job_id)
+                if existing is not None:
+                    return existing, False
+            attempts.append(1)
+            batch = self.client.batches.create(
+                input_file_id=upload.id, endpoint=BATCH_ENDPOINT,
+                completion_window=COMPLETION_WINDOW, metadata={"job_id": job_id}
+            )
+            return batch, True
+        return self.retry_policy.call(create)
+
+    def wait(self, batch_id, interval=5.0, max_interval=300.0, timeout=None):
+        """
+        Polls the batch until it has finished. The wait between checks starts at
+        `interval` seconds and doubles (with jitter) up to `max_interval`.
+
+        Raises:
+            DeadlineExceeded: If `timeout` seconds pass first. The batch keeps
+                              running; a later run with the same job id picks it up.
+        """
+        deadline = Deadline.coerce(timeout)
+        delay = interval
+        while True:
+            batch = self.retry_policy.call(self.client.batches.retrieve, batch_id)
+            if batch.status in FINISHED_STATUSES:
+                return batch
+            pause = random.uniform(delay / 2, delay)
+            if deadline is not None:
+                if deadline.expired():
+                    raise DeadlineExceeded(deadline)
+                pause = min(pause, deadline.remaining())
+            self.sleep(pause)
+            delay = min(max_interval, delay * 2)
+
+    def results(self, batch):
+        """
+        Yields (key, PromptSet or PromptError) for every request in a finished
+        batch, reading its output and error files one line at a time.
+        """
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            with self.client.files.with_streaming_response.content(file_id) as response:
+                for line in response.iter_lines():
+                    if line.strip():
+                        yield parse_result_line(json.loads(line))
+
+    def run(self, moods, job_id, store=None, wait=True, interval=5.0, max_interval=300.0, timeout=None):
+        """
+        Submits (or picks up) the batch for `job_id`, waits for it and stores every valid result.
+
+        Args:
+            moods (list or dict): Moods, or a dict of key (e.g. a user id) -> mood.
+            job_id (str): Names the run; re-running with the same id never submits twice.
+            store (callable): Called as store(key, prompt_set) for each valid result.
+                              Defaults to writing into the prompt cache, which needs a
+                              cache to be set and `moods` to be a list.
+            wait (bool): Wait for the batch to finish. If False, only submit.
+            interval, max_interval, timeout: Polling, as for wait().
+
+        Returns:
+            dict: 'job_id', 'batch_id', 'status', 'submitted', 'stored', 'failed'
+                  and 'failures' by kind.
+        """
+        if store is None:
+            if prompt_generator.cache is None:
+                raise ValueError("No prompt cache is set; enable one or pass store=")
+            if isinstance(moods, dict):
+                raise ValueError("Results keyed by something other than the mood need their own store=")
+            store = lambda mood, result: prompt_generator._cache_set(prompt_generator.cache, mood, result)
+
+        batch, submitted = self.submit(moods, job_id)
+        summary = {"job_id": job_id, "batch_id": batch.id, "status": batch.status, "submitted": submitted,
+                   "stored": 0, "failed": 0, "failures": Counter()}
+        if not wait:
+            return summary
+
+        batch = self.wait(batch.id, interval=interval, max_interval=max_interval, timeout=timeout)
+        summary["status"] = batch.status
+        # An expired batch still returns the requests it finished
+        for key, result in self.results(batch):
+            if result.ok:
+                store(key, result)
+                summary["stored"] += 1
+            else:
+                summary["failed"] += 1
+                summary["failures"][result.kind] += 1
+        return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cache", required=True, help="SQLite prompt cache file to fill (see enable_prompt_cache)")
+    parser.add_argument("--job-id", default=None, help="names the run; defaults to journal-prompts-<today>")
+    parser.add_argument("--moods", default=None, help="comma-separated moods; defaults to all of them")
+    parser.add_argument("--no-wait", action="store_true", help="submit (or find) the batch and exit")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds to wait for the batch")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="seconds before the first status check")
+    args = parser.parse_args(argv)
+
+    import backend_interface
+    backend_interface.enable_prompt_cache(args.cache)
+    moods = args.moods.split(",") if args.moods else prompt_generator.valid_moods
+    job_id = args.job_id or default_job_id()
+    try:
+        summary = PromptBatchRunner().run(moods, job_id, wait=not args.no_wait, interval=args.poll_interval,
+                                          timeout=args.timeout)
+    except DeadlineExceeded:
+        print(f"Batch for {job_id} is still running; run the same command again to collect it.")
+        return 75
+    print(f"{job_id}: batch {summary['batch_id']} {summary['status']}"
+          f" ({'submitted' if summary['submitted'] else 'already submitted'})")
+    if args.no_wait:
+        return 0
+    print(f"{summary['stored']} prompt sets stored, {summary['failed']} failed")
+    for kind, count in summary["failures"].most_common():
+        print(f"  {kind}: {count}")
+    return 0 if summary["status"] == "completed" and not summary["failed"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,32 +1,50 @@
+import functools
+import json
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from openai import OpenAI, AsyncOpenAI
+from concurrency import default_limiter
+from llm_client import Deadline, DeadlineExceeded, client_options, async_client_options, default_retry_policy, load_environment
+from circuit_breaker import CircuitOpenError, get_breaker
+from fallback_bank import get_fallback_bank
+from persistent_cache import PersistentCache
+from llm_usage import UsageTracker, extract_usage
+from metrics import registry as metrics
+from prompt_schema import PromptError, PromptSet, PromptValidationError
 
 # Load environment variables
-load_dotenv()
+load_environment()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Clients are built on first use (see get_client); both share the package-wide
+# connection pools and timeouts from llm_client.
+client = None
+async_client = None
+_client_lock = threading.Lock()
 
-def generate_prompt(mood):
-    """
-    Generates a reflective journal prompt based on the user's mood.
-    
-    Args:
-        mood (str): The user's mood. Expected values: 'Excited', 'Happy', 'Calm', 'Neutral', 'Tired', 'Slightly Off', 'Anxious', 'Stressed', 'Sad', 'Awful'.
-        
-    Returns:
-        str: A JSON string containing the mood and a list of questions.
-    """
-    # Validate mood (optional, but good for debugging)
-    # New 10 moods as requested
-    valid_moods = [
-        "Excited", "Happy", "Calm", "Neutral", "Tired", "Slightly Off", "Anxious", "Stressed", "Sad", "Awful"
-    ]
-    
-    # Normalize input mood to lowercase and remove potential numbering/emojis if passed loosely
-    # For now, we assume the input is relatively clean or we just pass it to the prompt.
-    
-    system_prompt = """
+MODEL = "gpt-4o"
+
+# Requests per prompt set: an answer that fails validation is re-requested once
+VALIDATION_ATTEMPTS = 2
+
+# Optional on-disk cache shared by worker processes (see set_cache).
+# Set PROMPT_CACHE_PATH to enable it at import time.
+cache = PersistentCache(os.environ["PROMPT_CACHE_PATH"]) if os.getenv("PROMPT_CACHE_PATH") else None
+
+# Optional HedgingPolicy for slow requests (see set_hedging)
+hedging = None
+
+# Token usage totals, including prompt tokens served from the provider's cache
+usage_tracker = UsageTracker()
+
+# New 10 moods as requested
+valid_moods = [
+    "Excited", "Happy", "Calm", "Neutral", "Tired", "Slightly Off", "Anxious", "Stressed", "Sad", "Awful"
+]
+
+SYSTEM_PROMPT = """
 You are a helpful mental health journaling assistant.
 Your goal is to generate 6 to 8 thoughtful, open-ended journal prompt questions based on the user’s current mood.
 
@@ -68,19 +86,426 @@ Behavior Rules
 - Keep language simple, supportive, and warm.
 """
 
+PACKED_INSTRUCTIONS = """
+This request covers several moods at once. Instead of a single object, output one JSON object
+with a "results" array that holds one entry per mood, in the order the moods are listed:
+
+{
+"results": [
+{ "mood": "<mood 1>", "questions": [ { "question": "<Question 1>" }, ... ] },
+{ "mood": "<mood 2>", "questions": [ { "question": "<Question 1>" }, ... ] }
+]
+}
+
+Every entry must follow all of the rules above.
+"""
+
+PERSONALIZE_INSTRUCTIONS = """
+This request comes with draft questions. Adapt them to the user instead of writing new ones:
+keep their number, order and intent, and reword them so they fit the mood and anything the
+user shared about their day. Output the single JSON object described above.
+"""
+
+TOP_UP_INSTRUCTIONS = """
+This request comes with questions the user already has. Write only the number of new questions
+asked for, each clearly different in wording and focus from all of the listed ones.
+Output the single JSON object described above, holding just the new questions.
+"""
+
+def get_client():
+    """
+    The shared OpenAI client, created on first use.
+    """
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                client = OpenAI(**client_options())
+    return client
+
+def get_async_client():
+    """
+    The shared AsyncOpenAI client, created on first use.
+    """
+    global async_client
+    if async_client is None:
+        with _client_lock:
+            if async_client is None:
+                async_client = AsyncOpenAI(**async_client_options())
+    return async_client
+
+def _create(deadline=None, **kwargs):
+    """
+    One chat completions request, through the circuit breaker, retry policy and
+    hedging (if enabled). Raises CircuitOpenError without calling the API while
+    the circuit is open, and DeadlineExceeded once `deadline` has passed.
+    """
+    attempt = get_client().chat.completions.create
+    if hedging is not None:
+        attempt = functools.partial(hedging.call, attempt, deadline=deadline)
+    return metrics.call(
+        "journal_prompts", get_breaker("journal_prompts").call, default_retry_policy().call, attempt,
+        deadline=deadline, **kwargs
+    )
+
+async def _create_async(deadline=None, **kwargs):
+    attempt = get_async_client().chat.completions.create
+    if hedging is not None:
+        attempt = functools.partial(hedging.call_async, attempt, deadline=deadline)
+    return await metrics.call_async(
+        "journal_prompts", get_breaker("journal_prompts").call_async, default_retry_policy().call_async, attempt,
+        deadline=deadline, **kwargs
+    )
+
+def _build_messages(mood):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"The user is feeling: {mood}"}
+    ]
+
+def _build_personalize_messages(prompt_set, note):
+    request = f"The user is feeling: {prompt_set.mood}"
+    if note:
+        request += f"\nWhat they shared about their day: {note}"
+    draft = "\n".join(f"- {question}" for question in prompt_set.questions)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT + PERSONALIZE_INSTRUCTIONS},
+        {"role": "user", "content": f"{request}\n\nDraft questions:\n{draft}"}
+    ]
+
+def _build_top_up_messages(mood, count, existing):
+    listing = "\n".join(f"- {question}" for question in existing)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT + TOP_UP_INSTRUCTIONS},
+        {"role": "user", "content": f"The user is feeling: {mood}\n\nQuestions they already have:\n{listing}\n\nNew questions needed: {count}"}
+    ]
+
+def set_hedging(policy):
+    """
+    Sets (or, with None, removes) the HedgingPolicy used for prompt requests.
+    """
+    global hedging
+    hedging = policy
+
+def set_cache(new_cache):
+    """
+    Sets (or, with None, removes) the PersistentCache used for generated prompts.
+    """
+    global cache
+    cache = new_cache
+
+def _cache_key(mood):
+    return PersistentCache.make_key(MODEL, SYSTEM_PROMPT, _build_messages(mood)[1]["content"])
+
+def _cache_get(active_cache, mood):
+    # A locked or unreadable cache file should cost a cache miss, not the request
+    if active_cache is None:
+        return None
+    try:
+        cached = active_cache.get(_cache_key(mood))
+    except sqlite3.Error:
+        return None
+    if cached is None:
+        return None
+    try:
+        return PromptSet.from_json(cached, mood)
+    except PromptValidationError:
+        # Written before validation existed; generate a fresh set instead
+        return None
+
+def _cache_set(active_cache, mood, result):
+    if active_cache is None or not result.ok or result.fallback:
+        return
+    try:
+        active_cache.set(_cache_key(mood), result.to_json())
+    except sqlite3.Error:
+        pass
+
+def _parse(response, mood):
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        return PromptSet.from_json(response.choices[0].message.content, mood)
+    except PromptValidationError as e:
+        return PromptError(mood, "invalid_response", f"Invalid prompt set: {e}")
+
+def generate_prompt(mood, use_cache=True, deadline=None):
+    """
+    Generates a reflective journal prompt based on the user's mood.
+    
+    Args:
+        mood (str): The user's mood. Expected values: 'Excited', 'Happy', 'Calm', 'Neutral', 'Tired', 'Slightly Off', 'Anxious', 'Stressed', 'Sad', 'Awful'.
+        use_cache (bool): Read from and write to the persistent cache, if one is set.
+        deadline (float): Optional. Seconds the call may take, retries included.
+        
+    Returns:
+        PromptSet or PromptError: The validated questions (PromptSet.to_json() gives the
+             JSON form), or what went wrong. An answer that fails validation (e.g. fewer
+             than 6 questions) is re-requested once. While the API's circuit breaker is
+             open, or once the deadline has passed, the mood's curated set from the
+             offline fallback bank (with fallback=True).
+    """
+    # Normalize input mood to lowercase and remove potential numbering/emojis if passed loosely
+    # For now, we assume the input is relatively clean or we just pass it to the prompt.
+
+    deadline = Deadline.coerce(deadline)
+    active_cache = cache if use_cache else None
+    cached = _cache_get(active_cache, mood)
+    if cached is not None:
+        return cached
+
+    try:
+        for _ in range(VALIDATION_ATTEMPTS):
+            response = _create(
+                deadline=deadline,
+                model=MODEL,
+                messages=_build_messages(mood),
+                response_format={"type": "json_object"} # Enforce JSON mode
+            )
+            usage_tracker.record(extract_usage(response))
+            result = _parse(response, mood)
+            if result.ok:
+                break
+    except (CircuitOpenError, DeadlineExceeded):
+        # The API is down or too slow: serve the curated set for this mood (never cached)
+        return get_fallback_bank().journal_prompt(mood)
+    except Exception as e:
+        return PromptError(mood, "api_error", f"Failed to generate prompt: {e}")
+
+    _cache_set(active_cache, mood, result)
+    return result
+
+async def generate_prompt_async(mood, limiter=None, use_cache=True, deadline=None):
+    """
+    Async version of generate_prompt, built on AsyncOpenAI.
+
+    Args:
+        mood (str): The user's mood (see generate_prompt).
+        limiter (InFlightLimiter): Optional. Caps concurrent requests; defaults to
+                                   the process-wide limiter shared with the chatbot.
+        use_cache (bool): Read from and write to the persistent cache, if one is set.
+        deadline (float): Optional. Seconds the call may take, retries included.
+
+    Returns:
+        PromptSet or PromptError: See generate_prompt.
+    """
+    deadline = Deadline.coerce(deadline)
+    limiter = limiter or default_limiter
+    # Cache lookups are local SQLite reads, cheap enough to run on the event loop
+    active_cache = cache if use_cache else None
+    cached = _cache_get(active_cache, mood)
+    if cached is not None:
+        return cached
+
+    try:
+        for _ in range(VALIDATION_ATTEMPTS):
+            async with limiter.slot():
+                response = await _create_async(
+                    deadline=deadline,
+                    model=MODEL,
+                    messages=_build_messages(mood),
+                    response_format={"type": "json_object"} # Enforce JSON mode
+                )
+            usage_tracker.record(extract_usage(response))
+            result = _parse(response, mood)
+            if result.ok:
+                break
+    except (CircuitOpenError, DeadlineExceeded):
+        # The API is down or too slow: serve the curated set for this mood (never cached)
+        return get_fallback_bank().journal_prompt(mood)
+    except Exception as e:
+        return PromptError(mood, "api_error", f"Failed to generate prompt: {e}")
+
+    _cache_set(active_cache, mood, result)
+    return result
+
+def personalize_prompt(prompt_set, note=None, deadline=None):
+    """
+    Rewords a locally drawn prompt set (see question_bank) with the model so it
+    fits the user's mood and, if given, what they shared about their day.
+
+    Args:
+        prompt_set (PromptSet): The set to adapt.
+        note (str, optional): A few words from the user about their day.
+        deadline (float): Optional. Seconds the call may take, retries included.
+
+    Returns:
+        PromptSet: The adapted set, or `prompt_set` unchanged if the request fails,
+                   the circuit is open, the deadline passes or the answer is invalid.
+    """
+    try:
+        response = _create(
+            deadline=Deadline.coerce(deadline),
+            model=MODEL,
+            messages=_build_personalize_messages(prompt_set, note),
+            response_format={"type": "json_object"} # Enforce JSON mode
+        )
+        usage_tracker.record(extract_usage(response))
+        return PromptSet.from_json(response.choices[0].message.content, prompt_set.mood)
+    except Exception:
+        # The local set is already valid, so it is the fallback for any failure
+        return prompt_set
+
+async def personalize_prompt_async(prompt_set, note=None, deadline=None, limiter=None):
+    """
+    Async version of personalize_prompt, built on AsyncOpenAI.
+    """
+    limiter = limiter or default_limiter
+    try:
+        async with limiter.slot():
+            response = await _create_async(
+                deadline=Deadline.coerce(deadline),
+                model=MODEL,
+                messages=_build_personalize_messages(prompt_set, note),
+                response_format={"type": "json_object"} # Enforce JSON mode
+            )
+        usage_tracker.record(extract_usage(response))
+        return PromptSet.from_json(response.choices[0].message.content, prompt_set.mood)
+    except Exception:
+        return prompt_set
+
+def top_up_prompt(mood, count, existing, deadline=None):
+    """
+    Asks the model for `count` more questions for `mood` that differ from
+    `existing`, to fill the slots left after near-duplicates were filtered out
+    of a set (see question_dedup).
+
+    Returns:
+        list: Up to `count` new questions; empty if the request fails, the circuit
+              is open, the deadline passes or the answer is invalid.
+    """
+    try:
+        response = _create(
+            deadline=Deadline.coerce(deadline),
+            model=MODEL,
+            messages=_build_top_up_messages(mood, count, existing),
+            response_format={"type": "json_object"} # Enforce JSON mode
+        )
+        usage_tracker.record(extract_usage(response))
+        return list(PromptSet.from_json(response.choices[0].message.content, mood, min_questions=1).questions[:count])
+    except Exception:
+        return []
+
+async def top_up_prompt_async(mood, count, existing, deadline=None, limiter=None):
+    """
+    Async version of top_up_prompt, built on AsyncOpenAI.
+    """
+    limiter = limiter or default_limiter
+    try:
+        async with limiter.slot():
+            response = await _create_async(
+                deadline=Deadline.coerce(deadline),
+                model=MODEL,
+                messages=_build_top_up_messages(mood, count, existing),
+                response_format={"type": "json_object"} # Enforce JSON mode
+            )
+        usage_tracker.record(extract_usage(response))
+        return list(PromptSet.from_json(response.choices[0].message.content, mood, min_questions=1).questions[:count])
+    except Exception:
+        return []
+
+def generate_prompts_batch(moods, max_workers=8, pack=False, pack_size=5, use_cache=True):
+    """
+    Generates journal prompts for many moods concurrently.
+
+    Each mood is handled independently: a failure for one mood is reported in
+    its own result and does not affect the others.
+
+    Args:
+        moods (list): Moods to generate prompts for (duplicates are allowed).
+        max_workers (int): Most requests in flight at once.
+        pack (bool): Ask for up to `pack_size` moods in one JSON-mode request and split
+                     the answer, instead of one request per mood. Moods missing from a
+                     packed answer are retried individually.
+        pack_size (int): Moods per packed request.
+        use_cache (bool): Read from and write to the persistent cache, if one is set.
+
+    Returns:
+        list: One dict per input mood, in input order, with keys 'mood', 'result'
+              (PromptSet, or None), 'error' (str or None), 'elapsed' (seconds) and
+              'packed' (bool).
+    """
+    moods = list(moods)
+    if not moods:
+        return []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        if not pack:
+            return list(executor.map(lambda mood: _batch_item(mood, use_cache), moods))
+
+        results = [None] * len(moods)
+        active_cache = cache if use_cache else None
+        pending = []
+        for index, mood in enumerate(moods):
+            cached = _cache_get(active_cache, mood)
+            if cached is not None:
+                results[index] = {"mood": mood, "result": cached, "error": None, "elapsed": 0.0, "packed": False}
+            else:
+                pending.append(index)
+
+        chunks = [pending[i:i + pack_size] for i in range(0, len(pending), pack_size)]
+        for chunk, packed in zip(chunks, executor.map(lambda c: _generate_packed([moods[i] for i in c]), chunks)):
+            for index, item in zip(chunk, packed):
+                results[index] = item
+
+        # Anything the packed answers left out gets its own request
+        retry = [index for index, item in enumerate(results) if item is None]
+        for index, item in zip(retry, executor.map(lambda i: _batch_item(moods[i], use_cache), retry)):
+            results[index] = item
+
+    for item in results:
+        if item["packed"] and item["error"] is None:
+            _cache_set(active_cache, item["mood"], item["result"])
+    return results
+
+def _batch_item(mood, use_cache):
+    start = time.perf_counter()
+    try:
+        result = generate_prompt(mood, use_cache=use_cache)
+    except Exception as e:
+        result = None
+        error = str(e)
+    else:
+        error = None if result.ok else result.message
+        if error is not None:
+            result = None
+    return {"mood": mood, "result": result, "error": error, "elapsed": time.perf_counter() - start, "packed": False}
+
+def _generate_packed(moods):
+    """
+    One JSON-mode request for several moods. Returns a list aligned with
+    `moods`, holding a result dict for each mood found in the answer and None
+    for moods that are missing (so the caller can retry them).
+    """
+    start = time.perf_counter()
+    listing = "\n".join(f"{n}. {mood}" for n, mood in enumerate(moods, 1))
+    try:
+        response = _create(
+            model=MODEL,
             messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"The user is feeling: {mood}"}
+                {"role": "system", "content": SYSTEM_PROMPT + PACKED_INSTRUCTIONS},
+                {"role": "user", "content": f"Generate a prompt set for each of these moods, in this order:\n{listing}"}
             ],
             response_format={"type": "json_object"} # Enforce JSON mode
         )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        return f'{{"error": "Failed to generate prompt: {e}"}}'
+        usage_tracker.record(extract_usage(response))
+        entries = json.loads(response.choices[0].message.content)["results"]
+    except Exception:
+        return [None] * len(moods)
+    elapsed = time.perf_counter() - start
+
+    items = []
+    for index, mood in enumerate(moods):
+        entry = entries[index] if index < len(entries) and isinstance(entries[index], dict) else None
+        if entry is None or str(entry.get("mood", "")).casefold() != mood.casefold():
+            # Fall back to matching by mood in case the model reordered the list
+            entry = next((e for e in entries if isinstance(e, dict) and str(e.get("mood", "")).casefold() == mood.casefold()), None)
+        try:
+            result = PromptSet.from_data(entry, mood)
+        except PromptValidationError:
+            # Missing or invalid entries get their own request
+            items.append(None)
+            continue
+        items.append({"mood": mood, "result": result, "error": None, "elapsed": elapsed, "packed": True})
+    return items
 
 if __name__ == "__main__":
     # Test
-    print(generate_prompt("Happy"))
+    print(generate_prompt("Happy").to_json())
@@ -0,0 +1,139 @@
+import functools
+import threading
+import time
+from collections import deque
+from prompt_generator import generate_prompt, valid_moods
+
+def _is_unpoolable(result):
+    # Errors and offline fallback sets (served while the API is down) are never pooled
+    return result is None or not result.ok or result.fallback
+
+class PromptPool:
+    """
+    Keeps a few ready-made journal prompt sets per mood in memory so a request
+    can be served instantly instead of waiting on the API.
+
+    Each mood has its own pool of up to `size` sets. Taking a set removes it,
+    so a user never sees the same set twice from one pool. When a pool drops to
+    `low_watermark` sets or fewer, a background thread tops it back up. Sets
+    older than `ttl` seconds are discarded so content stays varied.
+
+    Only moods in `moods` (the prompt generator's valid_moods by default) are
+    pooled; any other mood goes straight to the generator.
+    """
+    def __init__(self, size=3, ttl=3600, low_watermark=1, moods=None, generator=None):
+        self.size = size
+        self.ttl = ttl
+        self.low_watermark = low_watermark
+        # Pooled sets must differ from each other, so the pool bypasses the persistent cache
+        self.generator = generator or functools.partial(generate_prompt, use_cache=False)
+        self._moods = {self._key(m): m for m in (moods or valid_moods)}
+        self._pools = {key: deque() for key in self._moods}
+        self._lock = threading.Lock()
+        self._refills = {}
+        self._stats = {"hits": 0, "misses": 0, "refills": 0, "expired": 0, "refill_errors": 0}
+
+    @staticmethod
+    def _key(mood):
+        return mood.strip().casefold()
+
+    def take(self, mood):
+        """
+        Removes and returns a ready prompt set for `mood`, or None if the pool is
+        empty (or the mood is not pooled). Schedules a refill when running low.
+
+        Returns:
+            PromptSet or None: A set in the generate_prompt format.
+        """
+        key = self._key(mood)
+        pool = self._pools.get(key)
+        if pool is None:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        now = time.monotonic()
+        result = None
+        with self._lock:
+            while pool:
+                created_at, candidate = pool.popleft()
+                if now - created_at < self.ttl:
+                    result = candidate
+                    break
+                self._stats["expired"] += 1
+            self._stats["hits" if result is not None else "misses"] += 1
+            running_low = len(pool) <= self.low_watermark
+
+        if running_low:
+            self._schedule_refill(key)
+        return result
+
+    def get(self, mood):
+        """
+        Returns a prompt set for `mood`, from the pool when one is ready and
+        from the generator otherwise.
+
+        Returns:
+            PromptSet or PromptError: As from generate_prompt.
+        """
+        result = self.take(mood)
+        if result is None:
+            result = self.generator(mood)
+        return result
+
+    def prewarm(self):
+        """
+        Starts background refills for every pooled mood.
+        """
+        for key in self._moods:
+            self._schedule_refill(key)
+
+    def wait_for_refills(self, timeout=None):
+        """
+        Blocks until refills running right now have finished (or `timeout` seconds pass).
+        """
+        with self._lock:
+            threads = list(self._refills.values())
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in threads:
+            thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
+
+    def stats(self):
+        """
+        Returns hit/miss/refill counters plus the number of ready sets per mood.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["ready"] = {self._moods[key]: len(pool) for key, pool in self._pools.items()}
+        return stats
+
+    def _schedule_refill(self, key):
+        with self._lock:
+            if key in self._refills:
+                return
+            thread = threading.Thread(target=self._refill, args=(key,), daemon=True)
+            self._refills[key] = thread
+        thread.start()
+
+    def _refill(self, key):
+        mood = self._moods[key]
+        pool = self._pools[key]
+        try:
+            while True:
+                with self._lock:
+                    if len(pool) >= self.size:
+                        break
+                try:
+                    result = self.generator(mood)
+                except Exception:
+                    result = None
+                with self._lock:
+                    if _is_unpoolable(result):
+                        # Try again on the next low-watermark hit rather than spinning
+                        self._stats["refill_errors"] += 1
+                        break
+                    pool.append((time.monotonic(), result))
+                    self._stats["refills"] += 1
+        finally:
+            with self._lock:
+                self._refills.pop(key, None)
@@ -0,0 +1,130 @@
+import json
+
+# A prompt set must have at least this many distinct questions; extra ones are dropped
+MIN_QUESTIONS = 6
+MAX_QUESTIONS = 8
+
+class PromptValidationError(ValueError):
+    """
+    Raised when a model answer does not match the journal prompt schema.
+    """
+
+class PromptSet:
+    """
+    A validated set of journal prompt questions for one mood.
+
+    Attributes:
+        mood (str): The mood the questions are for.
+        questions (tuple): The question texts, in order.
+        fallback (bool): True for curated offline sets served while the API is unavailable.
+    """
+    __slots__ = ("mood", "questions", "fallback")
+    ok = True
+
+    def __init__(self, mood, questions, fallback=False):
+        self.mood = mood
+        self.questions = tuple(questions)
+        self.fallback = fallback
+
+    @classmethod
+    def from_data(cls, data, mood, min_questions=MIN_QUESTIONS):
+        """
+        Validates decoded JSON in one pass and builds a PromptSet from it.
+
+        Questions may be strings or {"question": str} objects; blank, non-text
+        and repeated questions are skipped. A list holding a single set (an
+        older answer shape) is accepted too.
+
+        Raises:
+            PromptValidationError: If the data is not a prompt set or has fewer
+                                   than `min_questions` usable questions.
+        """
+        if isinstance(data, list) and len(data) == 1:
+            data = data[0]
+        if not isinstance(data, dict):
+            raise PromptValidationError("expected a JSON object")
+        raw_questions = data.get("questions")
+        if not isinstance(raw_questions, list):
+            raise PromptValidationError("'questions' must be a list")
+
+        questions = []
+        seen = set()
+        for item in raw_questions:
+            text = item.get("question") if isinstance(item, dict) else item
+            if not isinstance(text, str):
+                continue
+            text = " ".join(text.split())
+            if text and text.casefold() not in seen:
+                seen.add(text.casefold())
+                questions.append(text)
+        if len(questions) < min_questions:
+            raise PromptValidationError(f"{len(questions)} usable questions, expected at least {min_questions}")
+
+        name = data.get("mood")
+        name = name.strip() if isinstance(name, str) and name.strip() else mood
+        return cls(name, questions[:MAX_QUESTIONS], fallback=data.get("fallback") is True)
+
+    @classmethod
+    def from_json(cls, text, mood, min_questions=MIN_QUESTIONS):
+        """
+        Parses and validates a JSON answer (see from_data).
+
+        Raises:
+            PromptValidationError: If `text` is not JSON or fails validation.
+        """
+        try:
+            data = json.loads(text)
+        except (TypeError, ValueError):
+            raise PromptValidationError("not valid JSON")
+        return cls.from_data(data, mood, min_questions)
+
+    def to_dict(self):
+        data = {"mood": self.mood, "questions": [{"question": q} for q in self.questions]}
+        if self.fallback:
+            data["fallback"] = True
+        return data
+
+    def to_json(self):
+        """
+        The set as a JSON string: {"mood": ..., "questions": [{"question": ...}, ...]},
+        plus "fallback": true for offline sets.
+        """
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    def __eq__(self, other):
+        return isinstance(other, PromptSet) and (self.mood, self.questions, self.fallback) == (
+            other.mood, other.questions, other.fallback)
+
+    def __repr__(self):
+        return f"PromptSet(mood={self.mood!r}, questions={len(self.questions)}, fallback={self.fallback})"
+
+class PromptError:
+    """
+    A journal prompt request that failed.
+
+    Attributes:
+        mood (str): The mood that was requested.
+        kind (str): "api_error" (the request failed) or "invalid_response" (the
+                    answer failed validation, even after a re-request).
+        message (str): What went wrong, for logs and error displays.
+    """
+    __slots__ = ("mood", "kind", "message")
+    ok = False
+
+    def __init__(self, mood, kind, message):
+        self.mood = mood
+        self.kind = kind
+        self.message = message
+
+    def to_dict(self):
+        return {"error": self.message}
+
+    def to_json(self):
+        """
+        The error as a JSON string: {"error": ...}. Quotes and other special
+        characters in the message are escaped.
+        """
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    def __repr__(self):
+        return f"PromptError(mood={self.mood!r}, kind={self.kind!r}, message={self.message!r})"
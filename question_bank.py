@@ -0,0 +1,127 @@
+import datetime
+import json
+import os
+import random
+import threading
+from collections import OrderedDict
+from prompt_schema import MIN_QUESTIONS, MAX_QUESTIONS, PromptSet
+
+BANK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "question_bank.json")
+
+class RecentQuestions:
+    """
+    The questions each user was shown most recently, so the next draw can skip them.
+
+    Keeps the last `per_user` questions for each of the `max_users` most recently
+    active users, in memory.
+    """
+    def __init__(self, max_users=10000, per_user=40):
+        self.max_users = max_users
+        self.per_user = per_user
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """
+        The user's recent questions, oldest first.
+        """
+        with self._lock:
+            seen = self._seen.get(user_id)
+            return list(seen) if seen else []
+
+    def add(self, user_id, questions):
+        with self._lock:
+            seen = self._seen.pop(user_id, None) or {}
+            for question in questions:
+                seen.pop(question, None)
+                seen[question] = None
+            while len(seen) > self.per_user:
+                del seen[next(iter(seen))]
+            self._seen[user_id] = seen
+            while len(self._seen) > self.max_users:
+                self._seen.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._seen.clear()
+
+class QuestionBank:
+    """
+    Journal prompt sets drawn locally from a bundled bank of questions, without
+    an API call.
+
+    Questions are grouped by tone ("gentle", "savoring", "steadying", ...) and
+    each mood draws from a few tones, alternating between them so a set mixes
+    its tones evenly. Draws are seeded by user, day and mood: the same user gets
+    the same set for a mood all day unless questions drop out as recently seen,
+    and different users get different sets.
+    """
+    def __init__(self, moods, tones, aliases=None, recent=None):
+        self.tones = {tone: tuple(questions) for tone, questions in tones.items()}
+        # Keyed by casefolded mood, like the fallback bank
+        self.moods = {mood.casefold(): (mood, tuple(self.tones[tone] for tone in mood_tones))
+                      for mood, mood_tones in moods.items()}
+        self.aliases = {alias.casefold(): mood.casefold() for alias, mood in (aliases or {}).items()}
+        self.recent = recent or RecentQuestions()
+
+    @classmethod
+    def from_file(cls, path=BANK_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["moods"], data["tones"], data.get("aliases"))
+
+    def draw(self, mood, user_id=None, day=None):
+        """
+        Draws a prompt set for `mood` and records it as seen by `user_id`.
+
+        Args:
+            mood (str): One of the bank's moods or aliases (case-insensitive). Unknown
+                        moods get the "Neutral" tones under the requested mood name.
+            user_id (str, optional): Seeds the draw and excludes the questions this user
+                                     saw recently. Anonymous draws are seeded by day only.
+            day (str, optional): The day to seed with. Defaults to today's date (UTC).
+
+        Returns:
+            PromptSet: 6 to 8 questions.
+        """
+        key = str(mood).strip().casefold()
+        name, pools = self.moods.get(self.aliases.get(key, key), (None, None))
+        if pools is None:
+            name, pools = mood, self.moods["neutral"][1]
+        if day is None:
+            day = datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+
+        rng = random.Random(f"{user_id or ''}|{day}|{name.casefold()}")
+        count = rng.randint(MIN_QUESTIONS, MAX_QUESTIONS)
+        recent = self.recent.get(user_id) if user_id is not None else ()
+        skip = set(recent)
+
+        streams = []
+        for pool in pools:
+            stream = [question for question in pool if question not in skip]
+            rng.shuffle(stream)
+            streams.append(stream)
+        questions = []
+        while len(questions) < count and any(streams):
+            for stream in streams:
+                if stream and len(questions) < count:
+                    questions.append(stream.pop())
+        if len(questions) < count:
+            # The user has seen nearly everything for this mood: repeat the oldest first
+            candidates = {question for pool in pools for question in pool}
+            questions.extend([question for question in recent if question in candidates][:count - len(questions)])
+
+        if user_id is not None:
+            self.recent.add(user_id, questions)
+        return PromptSet(name, questions)
+
+_default_bank = None
+
+def get_question_bank():
+    """
+    The bank loaded from data/question_bank.json (loaded once, on first use).
+    """
+    global _default_bank
+    if _default_bank is None:
+        _default_bank = QuestionBank.from_file()
+    return _default_bank
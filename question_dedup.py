@@ -0,0 +1,229 @@
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+# MinHash signature length and its split into LSH bands. 16 bands of 2 rows make
+# pairs above roughly 0.5 Jaccard similarity near-certain candidates; candidates
+# are then checked against THRESHOLD on the full signature.
+NUM_PERM = 32
+BANDS = 16
+SHINGLE_SIZE = 4
+THRESHOLD = 0.55
+
+_NON_WORD = re.compile(r"[\W_]+")
+_EMPTY = 1 << 27  # Above any 27-bit bin value
+
+def shingles(text, size=SHINGLE_SIZE):
+    """
+    Hashes of the overlapping `size`-character pieces of the casefolded text with
+    punctuation dropped, so "What made you smile today?" and "what made you
+    smile, today" match.
+    """
+    data = _NON_WORD.sub(" ", text.casefold()).strip().encode()
+    if len(data) <= size:
+        return {zlib.crc32(data)}
+    return {zlib.crc32(data[i:i + size]) for i in range(len(data) - size + 1)}
+
+class MinHasher:
+    """
+    One-permutation MinHash: each shingle is hashed once, its low bits pick one
+    of `num_perm` bins and the rest is the value; a signature holds each bin's
+    minimum. Empty bins borrow from the next filled bin (rotation densification)
+    so short questions still get comparable signatures. The fraction of
+    positions where two signatures agree estimates the Jaccard similarity of the
+    texts' shingle sets.
+
+    This costs one hash per shingle instead of one per shingle and permutation,
+    which keeps filtering a set well under a millisecond in pure Python.
+    """
+    def __init__(self, num_perm=NUM_PERM):
+        if num_perm & (num_perm - 1):
+            raise ValueError("num_perm must be a power of two")
+        self.num_perm = num_perm
+        self._mask = num_perm - 1
+        self._shift = num_perm.bit_length() - 1
+
+    def signature(self, text):
+        mask, shift = self._mask, self._shift
+        bins = [_EMPTY] * self.num_perm
+        for h in shingles(text):
+            index = h & mask
+            value = (h >> shift) & (_EMPTY - 1)
+            if value < bins[index]:
+                bins[index] = value
+        if _EMPTY in bins:
+            size = self.num_perm
+            filled = list(bins)
+            for index in range(size):
+                if bins[index] == _EMPTY:
+                    distance = 1
+                    while bins[(index + distance) % size] == _EMPTY:
+                        distance += 1
+                    filled[index] = bins[(index + distance) % size] + distance * _EMPTY
+            bins = filled
+        return tuple(bins)
+
+def similarity(sig_a, sig_b):
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / len(sig_a)
+
+class SimilarityIndex:
+    """
+    An LSH index over the last `max_questions` questions one user was served.
+
+    Each question is stored as its MinHash signature, bucketed by band, so a
+    lookup only compares against questions that share a band.
+    """
+    def __init__(self, hasher, max_questions=64, threshold=THRESHOLD, bands=BANDS):
+        self.hasher = hasher
+        self.max_questions = max_questions
+        self.threshold = threshold
+        self.rows = hasher.num_perm // bands
+        self.bands = bands
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def sign(self, question):
+        """
+        The question's signature and its LSH band keys.
+        """
+        signature = self.hasher.signature(question)
+        rows = self.rows
+        return signature, [(band, signature[band * rows:(band + 1) * rows]) for band in range(self.bands)]
+
+    def find(self, signature, band_keys):
+        """
+        The highest similarity at or above the threshold between `signature` and a
+        stored one that shares a band with it, or None.
+        """
+        candidates = set()
+        for key in band_keys:
+            candidates.update(self._buckets.get(key, ()))
+        best = None
+        for entry_id in candidates:
+            score = similarity(signature, self._entries[entry_id][0])
+            if score >= self.threshold and (best is None or score > best):
+                best = score
+        return best
+
+    def add(self, signature, band_keys):
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (signature, band_keys)
+        for key in band_keys:
+            self._buckets.setdefault(key, []).append(entry_id)
+        while len(self._entries) > self.max_questions:
+            old_id, (_, old_keys) = self._entries.popitem(last=False)
+            for key in old_keys:
+                bucket = self._buckets[key]
+                bucket.remove(old_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def filter(self, questions, signed=None, limit=None):
+        """
+        Keeps the questions that are not near-duplicates of one served earlier or
+        of one kept earlier in the same call, and records the kept ones as served.
+
+        Args:
+            questions (list): Question texts.
+            signed (list, optional): Their sign() results, if already computed.
+            limit (int, optional): Stop once this many are kept; later questions are
+                                   neither checked nor recorded.
+
+        Returns:
+            tuple: (kept, dropped) lists of questions, in input order.
+        """
+        kept, dropped = [], []
+        for question, (signature, band_keys) in zip(questions, signed or map(self.sign, questions)):
+            if limit is not None and len(kept) >= limit:
+                break
+            if self.find(signature, band_keys) is None:
+                self.add(signature, band_keys)
+                kept.append(question)
+            else:
+                dropped.append(question)
+        return kept, dropped
+
+class QuestionDedup:
+    """
+    Per-user near-duplicate filters for journal prompt questions, so a user is
+    not shown the same question twice in different words, within a set or
+    across recent sets.
+
+    Keeps an index of the last `per_user` questions for each of the `max_users`
+    most recently active users, in memory.
+    """
+    def __init__(self, max_users=10000, per_user=64, threshold=THRESHOLD):
+        self.max_users = max_users
+        self.per_user = per_user
+        self.threshold = threshold
+        self.hasher = MinHasher()
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"sets": 0, "checked": 0, "dropped": 0}
+
+    def filter(self, user_id, questions):
+        """
+        Filters one set for `user_id` in a single pass (see SimilarityIndex.filter).
+
+        Returns:
+            tuple: (kept, dropped) lists of questions, in input order.
+        """
+        return self._filter(user_id, questions, None, new_set=True)
+
+    def top_up(self, user_id, questions, limit):
+        """
+        Filters candidates for the free slots of a set already filtered for
+        `user_id`: keeps at most `limit`, so only questions that are served get
+        recorded, and does not count as a new set.
+
+        Returns:
+            tuple: (kept, dropped) lists of the questions checked, in input order.
+        """
+        return self._filter(user_id, questions, limit, new_set=False)
+
+    def _filter(self, user_id, questions, limit, new_set):
+        # Hashing is the costly part and needs no shared state, so it runs unlocked
+        signer = SimilarityIndex(self.hasher, self.per_user, self.threshold)
+        signed = [signer.sign(question) for question in questions]
+        with self._lock:
+            index = self._indexes.pop(user_id, None)
+            if index is None:
+                index = signer
+            self._indexes[user_id] = index
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+            kept, dropped = index.filter(questions, signed, limit)
+            self._stats["sets"] += new_set
+            self._stats["checked"] += len(kept) + len(dropped)
+            self._stats["dropped"] += len(dropped)
+        return kept, dropped
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["users"] = len(self._indexes)
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+_default_dedup = None
+_default_lock = threading.Lock()
+
+def get_question_dedup():
+    """
+    The process-wide filter (created on first use).
+    """
+    global _default_dedup
+    if _default_dedup is None:
+        with _default_lock:
+            if _default_dedup is None:
+                _default_dedup = QuestionDedup()
+    return _default_dedup
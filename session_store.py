@@ -0,0 +1,287 @@
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from sqlite_connections import LocalConnections
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT NOT NULL, last_active REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS sessions_last_active ON sessions (last_active)",
+)
+
+class SessionNotFound(KeyError):
+    """
+    Raised for a session id that was never opened, was closed, or expired.
+    """
+
+class Session:
+    """
+    One conversation: its messages (oldest first), the user's location and
+    when it was last used.
+    """
+    __slots__ = ("id", "messages", "location", "last_active", "chars")
+
+    def __init__(self, session_id, messages=None, location=None, last_active=0.0):
+        self.id = session_id
+        self.messages = list(messages or [])
+        self.location = location
+        self.last_active = last_active
+        self.chars = sum(len(m.get("content") or "") for m in self.messages)
+
+    def to_json(self):
+        return json.dumps({"messages": self.messages, "location": self.location})
+
+    @classmethod
+    def from_json(cls, session_id, data, last_active):
+        data = json.loads(data)
+        return cls(session_id, data["messages"], data.get("location"), last_active)
+
+class SessionStore:
+    """
+    Server-side conversation histories, so each chat request only carries the
+    new message.
+
+    Sessions live in memory, least recently used first. Sessions idle for more
+    than `idle_ttl` seconds are deleted. Above `max_sessions`, the least
+    recently used ones are dropped, or moved to a SQLite file if `spill_path` is
+    set and loaded back on their next message.
+
+    Each session keeps at most `max_messages` messages and `max_chars`
+    characters. Over either cap, the oldest quarter is dropped at once rather
+    than one message per turn: the chatbot's summary of older turns is cached
+    by the exact messages it covers, so this way it is rebuilt only rarely.
+    """
+    def __init__(self, max_sessions=10000, idle_ttl=3600, max_messages=200, max_chars=100000,
+                 spill_path=None, clock=time.time):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_messages = max_messages
+        self.max_chars = max_chars
+        self.spill_path = spill_path
+        self.clock = clock
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._connections = LocalConnections(spill_path, SCHEMA) if spill_path else None
+        self._stats = {"opened": 0, "expired": 0, "dropped": 0, "spilled": 0, "restored": 0}
+        if spill_path:
+            self._connect()
+
+    def _connect(self):
+        return self._connections.get()
+
+    def open(self, history=None, location=None):
+        """
+        Starts a session.
+
+        Args:
+            history (list): Optional. Earlier messages to start from.
+            location (str): Optional. The user's location, used for every message
+                            of the session unless one is passed with the message.
+
+        Returns:
+            str: The new session's id.
+        """
+        session = Session(uuid.uuid4().hex, history, location, self.clock())
+        self._trim(session)
+        with self._lock:
+            self._sessions[session.id] = session
+            self._stats["opened"] += 1
+            self._expire(session.last_active)
+            self._shed()
+        return session.id
+
+    def get(self, session_id):
+        """
+        Returns the session and marks it as used.
+
+        Raises:
+            SessionNotFound: If the session does not exist or has expired.
+        """
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._restore(session_id, now)
+            session.last_active = now
+            self._sessions.move_to_end(session_id)
+            self._shed()
+            return session
+
+    def history(self, session_id):
+        """
+        A copy of the session's messages, oldest first.
+        """
+        return list(self.get(session_id).messages)
+
+    def append(self, session_id, *messages):
+        """
+        Adds messages (dicts with 'role' and 'content') to the end of the session.
+        """
+        session = self.get(session_id)
+        with self._lock:
+            session.messages.extend(messages)
+            session.chars += sum(len(m.get("content") or "") for m in messages)
+            self._trim(session)
+
+    def close(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        if self.spill_path:
+            self._connect().execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def _trim(self, session):
+        if len(session.messages) <= self.max_messages and session.chars <= self.max_chars:
+            return
+        keep_messages = self.max_messages * 3 // 4
+        keep_chars = self.max_chars * 3 // 4
+        start = max(0, len(session.messages) - keep_messages)
+        chars = sum(len(m.get("content") or "") for m in session.messages[start:])
+        while chars > keep_chars and start < len(session.messages) - 1:
+            chars -= len(session.messages[start].get("content") or "")
+            start += 1
+        session.messages = session.messages[start:]
+        session.chars = chars
+
+    def _expire(self, now):
+        # Oldest first, so stop at the first session that is still active
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_active < self.idle_ttl:
+                break
+            self._sessions.popitem(last=False)
+            self._stats["expired"] += 1
+
+    def _shed(self):
+        excess = len(self._sessions) - self.max_sessions
+        if excess <= 0:
+            return
+        evicted = [self._sessions.popitem(last=False)[1] for _ in range(excess)]
+        if not self.spill_path:
+            self._stats["dropped"] += excess
+            return
+        conn = self._connect()
+        conn.executemany(
+            "INSERT OR REPLACE INTO sessions (id, data, last_active) VALUES (?, ?, ?)",
+            [(s.id, s.to_json(), s.last_active) for s in evicted],
+        )
+        conn.execute("DELETE FROM sessions WHERE last_active <= ?", (self.clock() - self.idle_ttl,))
+        self._stats["spilled"] += excess
+
+    def _restore(self, session_id, now):
+        if not self.spill_path:
+            raise SessionNotFound(session_id)
+        conn = self._connect()
+        row = conn.execute("SELECT data, last_active FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None or now - row[1] >= self.idle_ttl:
+            raise SessionNotFound(session_id)
+        conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        session = Session.from_json(session_id, row[0], row[1])
+        self._sessions[session_id] = session
+        self._stats["restored"] += 1
+        return session
+
+    def stats(self):
+        """
+        Returns the number of sessions in memory ('active') and in the spill file
+        ('spilled_now'), plus counters of sessions opened, expired, dropped
+        (evicted without a spill file), spilled and restored.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["active"] = len(self._sessions)
+        if self.spill_path:
+            stats["spilled_now"] = self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return stats
+
+class SharedSessionStore(SessionStore):
+    """
+    A SessionStore whose SQLite file at `path` is the only copy of every
+    session, so all processes on the host see the same sessions. Use it when
+    several worker processes share one listening socket (api_server.py
+    --workers N): the next request of a session can land on any of them.
+
+    Every call reads or writes the file; nothing is kept in memory. Appends
+    run in an immediate transaction, so two workers adding to one session
+    cannot lose each other's messages. Sessions idle for more than `idle_ttl`
+    seconds are deleted, and above `max_sessions` the least recently used ones
+    are dropped. Message caps work as in SessionStore. Counters in stats()
+    are this process's own.
+    """
+    def __init__(self, path, max_sessions=10000, idle_ttl=3600, max_messages=200, max_chars=100000,
+                 clock=time.time):
+        super().__init__(max_sessions=max_sessions, idle_ttl=idle_ttl, max_messages=max_messages,
+                         max_chars=max_chars, spill_path=path, clock=clock)
+
+    def open(self, history=None, location=None):
+        session = Session(uuid.uuid4().hex, history, location, self.clock())
+        self._trim(session)
+        conn = self._connect()
+        conn.execute("INSERT INTO sessions (id, data, last_active) VALUES (?, ?, ?)",
+                     (session.id, session.to_json(), session.last_active))
+        self._count("opened")
+        self._expire(session.last_active)
+        self._shed()
+        return session.id
+
+    def get(self, session_id):
+        now = self.clock()
+        conn = self._connect()
+        session = self._load(conn, session_id, now)
+        conn.execute("UPDATE sessions SET last_active = ? WHERE id = ?", (now, session_id))
+        session.last_active = now
+        return session
+
+    def append(self, session_id, *messages):
+        now = self.clock()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            session = self._load(conn, session_id, now)
+            session.messages.extend(messages)
+            session.chars += sum(len(m.get("content") or "") for m in messages)
+            self._trim(session)
+            conn.execute("UPDATE sessions SET data = ?, last_active = ? WHERE id = ?",
+                         (session.to_json(), now, session_id))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self, session_id):
+        self._connect().execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def _load(self, conn, session_id, now):
+        row = conn.execute("SELECT data, last_active FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None or now - row[1] >= self.idle_ttl:
+            raise SessionNotFound(session_id)
+        return Session.from_json(session_id, row[0], row[1])
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _expire(self, now):
+        expired = self._connect().execute("DELETE FROM sessions WHERE last_active <= ?", (now - self.idle_ttl,))
+        if expired.rowcount > 0:
+            self._count("expired", expired.rowcount)
+
+    def _shed(self):
+        dropped = self._connect().execute(
+            "DELETE FROM sessions WHERE id IN (SELECT id FROM sessions ORDER BY last_active DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,),
+        )
+        if dropped.rowcount > 0:
+            self._count("dropped", dropped.rowcount)
+
+    def stats(self):
+        """
+        Returns the number of sessions in the file ('active'), plus this
+        process's counters of sessions opened, expired and dropped.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["active"] = self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return stats
@@ -0,0 +1,33 @@
+import os
+import sqlite3
+import threading
+
+class LocalConnections:
+    """
+    Connections to one SQLite file in WAL mode, so many processes can read
+    while one writes.
+
+    sqlite3 connections must not be shared across threads or forked
+    processes, so each (process, thread) pair opens its own on first use and
+    runs `schema` (CREATE ... IF NOT EXISTS statements) on it.
+    """
+    def __init__(self, path, schema=()):
+        self.path = path
+        self.schema = tuple(schema)
+        self._local = threading.local()
+
+    def get(self):
+        """
+        This thread's connection, in autocommit mode.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.schema:
+            conn.execute(statement)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
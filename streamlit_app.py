@@ -1,7 +1,12 @@
 import streamlit as st
 import os
-import json
-from backend_interface import process_chat_message, generate_journal_prompts
+import uuid
+import backend_interface
+from backend_interface import open_session, send_stream, get_journal_prompts
+
+# Messages rendered in full; older ones are shown on request, CHAT_WINDOW at a time,
+# so a rerun's render cost stays bounded however long the conversation gets
+CHAT_WINDOW = 30
 
 # Page configuration
 st.set_page_config(page_title="Mood Tracker AI", page_icon="🧠")
@@ -10,6 +15,27 @@ st.set_page_config(page_title="Mood Tracker AI", page_icon="🧠")
 if "OPENAI_API_KEY" in st.secrets:
     os.environ["OPENAI_API_KEY"] = st.secrets["OPENAI_API_KEY"]
 
+@st.cache_resource
+def load_backend():
+    """
+    Builds the API clients, topic gate and question bank once per server process
+    instead of checking for them on every rerun.
+    """
+    backend_interface.warm_up()
+    return backend_interface.get_session_store()
+
+def load_journal_prompts(mood, user_id):
+    """
+    The validated PromptSet for a mood, drawn for this user (so repeat clicks
+    skip questions they have just seen). Errors raise.
+    """
+    result = get_journal_prompts(mood, user_id=user_id)
+    if not result.ok:
+        raise RuntimeError(result.message)
+    return result
+
+load_backend()
+
 # Title
 st.title("🧠 Mood Tracker AI Companion")
 
@@ -19,16 +45,26 @@ tab1, tab2 = st.tabs(["💬 Chatbot", "📝 Journal Prompts"])
 # --- Chatbot Tab ---
 with tab1:
     st.header("Mental Health Chatbot")
-    
+
     # Location input for crisis support
     user_location = st.text_input("Your Location (Optional - for local crisis resources):", placeholder="e.g., London, UK")
 
-    # Initialize chat history
+    # Initialize chat history (kept for display; the backend session holds the model's context)
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = open_session()
+    if "chat_window" not in st.session_state:
+        st.session_state.chat_window = CHAT_WINDOW
 
-    # Display chat messages from history on app rerun
-    for message in st.session_state.messages:
+    # Display the most recent chat messages on app rerun
+    messages = st.session_state.messages
+    hidden = max(0, len(messages) - st.session_state.chat_window)
+    if hidden:
+        if st.button(f"Show earlier messages ({hidden} hidden)"):
+            st.session_state.chat_window += CHAT_WINDOW
+            st.rerun()
+    for message in messages[hidden:]:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
 
@@ -39,68 +75,57 @@ with tab1:
         # Add user message to chat history
         st.session_state.messages.append({"role": "user", "content": prompt})
 
-        # Get response from backend
-        with st.spinner("Thinking..."):
-            # Prepare history for backend (list of dicts)
-            history = st.session_state.messages[:-1] # Exclude current message as it's passed as input
-            response = process_chat_message(prompt, history=history, location=user_location)
+        # Only the new message is sent; the session holds the history
+        timings = {}
+        try:
+            stream = send_stream(st.session_state.session_id, prompt, location=user_location, timings=timings)
+        except KeyError:
+            # The session expired while the tab was idle: continue from what is on screen
+            st.session_state.session_id = open_session(history=st.session_state.messages[:-1])
+            stream = send_stream(st.session_state.session_id, prompt, location=user_location, timings=timings)
 
-        # Display assistant response in chat message container
+        # Stream assistant response into the chat message container as it arrives
         with st.chat_message("assistant"):
-            st.markdown(response)
+            response = st.write_stream(stream)
+            if "first_token" in timings:
+                st.caption(f"First token: {timings['first_token']:.2f}s · Total: {timings['total']:.2f}s")
+            else:
+                st.caption(f"Total: {timings['total']:.2f}s")
         # Add assistant response to chat history
         st.session_state.messages.append({"role": "assistant", "content": response})
 
 # --- Journal Prompts Tab ---
 with tab2:
     st.header("Journal Prompt Generator")
-    
+
     st.write("Select your current mood to get personalized journal questions.")
-    
+
     # Moods list matching the backend
     moods = [
-        "Excited", "Happy", "Calm", "Neutral", "Tired", 
+        "Excited", "Happy", "Calm", "Neutral", "Tired",
         "Slightly Off", "Anxious", "Stressed", "Sad", "Awful"
     ]
-    
+
     selected_mood = st.selectbox("How are you feeling?", moods)
-    
+
+    if "user_id" not in st.session_state:
+        st.session_state.user_id = uuid.uuid4().hex
+
     if st.button("Generate Prompts"):
         with st.spinner("Generating prompts..."):
             try:
-                json_response = generate_journal_prompts(selected_mood)
-                data = json.loads(json_response)
-                
-                # Display nicely
-                if isinstance(data, dict):
-                    item = data
-                    st.subheader(f"Prompts for mood: {item.get('mood', selected_mood)}")
-                    
-                    questions = item.get("questions", [])
-                    for i, q_obj in enumerate(questions, 1):
-                        # Handle both string (old) and object (new) formats for robustness
-                        q_text = q_obj.get("question") if isinstance(q_obj, dict) else q_obj
-                        st.markdown(f"**{i}.** {q_text}")
-                    
-                    # Show raw JSON for verification
-                    with st.expander("View Raw JSON"):
-                        st.json(data)
-                elif isinstance(data, list) and len(data) > 0:
-                    item = data[0]
-                    st.subheader(f"Prompts for mood: {item.get('mood', selected_mood)}")
-                    
-                    questions = item.get("questions", [])
-                    for i, q_obj in enumerate(questions, 1):
-                        # Handle both string (old) and object (new) formats for robustness
-                        q_text = q_obj.get("question") if isinstance(q_obj, dict) else q_obj
-                        st.markdown(f"**{i}.** {q_text}")
-                    
-                    # Show raw JSON for verification
-                    with st.expander("View Raw JSON"):
-                        st.json(data)
-                else:
-                    st.error("Unexpected response format.")
-                    st.json(data)
-                    
+                prompt_set = load_journal_prompts(selected_mood, st.session_state.user_id)
+                # Kept so the prompts stay on screen across reruns
+                st.session_state.journal_prompts = prompt_set
             except Exception as e:
                 st.error(f"An error occurred: {e}")
+
+    if "journal_prompts" in st.session_state:
+        prompt_set = st.session_state.journal_prompts
+        st.subheader(f"Prompts for mood: {prompt_set.mood}")
+        for i, question in enumerate(prompt_set.questions, 1):
+            st.markdown(f"**{i}.** {question}")
+
+        # Show raw JSON for verification
+        with st.expander("View Raw JSON"):
+            st.json(prompt_set.to_dict())
@@ -0,0 +1,351 @@
+import json
+import math
+import random
+import socket
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_REPLY = "That sounds like a lot to carry. What has been on your mind the most?"
+
+def latency_profile(name="fixed", median=0.2, seed=0):
+    """
+    A latency function for StubOpenAIServer(latency=...).
+
+    Args:
+        name (str): "fixed", "uniform" (0.5x to 1.5x the median), "lognormal"
+                    (long right tail, like real model latency) or "bimodal"
+                    (5% of requests take 5x the median).
+        median (float): Typical latency in seconds.
+        seed (int): Seed, so runs are reproducible.
+    """
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    draws = {
+        "fixed": lambda: median,
+        "uniform": lambda: rng.uniform(0.5 * median, 1.5 * median),
+        "lognormal": lambda: median * math.exp(rng.gauss(0, 0.5)),
+        "bimodal": lambda: median * (5 if rng.random() < 0.05 else 1),
+    }
+    if name not in draws:
+        raise ValueError(f"Unknown latency profile: {name}")
+    draw = draws[name]
+
+    def latency():
+        with lock:
+            return draw()
+    return latency
+
+def _prompt_set(mood):
+    questions = [{"question": f"What is one thing that shaped feeling {mood.lower()} today? ({n})"} for n in range(1, 7)]
+    return {"mood": mood, "questions": questions}
+
+def _json_answer(messages):
+    user = messages[-1]["content"] if messages else ""
+    if "in this order" in user:
+        moods = [line.split(". ", 1)[1] for line in user.splitlines()[1:] if ". " in line]
+        return json.dumps({"results": [_prompt_set(m) for m in moods]})
+    return json.dumps(_prompt_set(user.split(": ", 1)[-1]))
+
+def _completion(request):
+    if request.get("response_format", {}).get("type") == "json_object":
+        content = _json_answer(request.get("messages", []))
+    else:
+        content = STUB_REPLY
+    # About four characters per token, like the real tokenizer on English text
+    prompt_tokens = max(1, sum(len(str(m.get("content") or "")) for m in request.get("messages", [])) // 4)
+    completion_tokens = len(content) // 4
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+             "total_tokens": prompt_tokens + completion_tokens}
+    return content, usage
+
+def _completion_body(model, content, usage):
+    return {
+        "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": usage,
+    }
+
+def _multipart_fields(content_type, body):
+    message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    return {part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+            for part in message.iter_parts()}
+
+class StubOpenAIServer:
+    """
+    Minimal local stand-in for the Chat Completions endpoint, for tests and
+    benchmarks. Speaks HTTP/1.1 with keep-alive and can inject latency and errors.
+
+    Args:
+        latency (float or callable): Seconds to wait before answering, or a
+                                     zero-argument function returning them.
+        error_rate (float): Share of requests answered with a 503.
+        seed (int): Seed for the error-rate draws.
+        chunk_delay (float): Seconds between streamed chunks.
+        batch_polls (int): Status checks a batch answers "in_progress" to
+                           before it completes.
+        model_latency (dict): Optional. Latency (seconds or a function) per
+                              model name, used instead of `latency` for
+                              requests to that model.
+
+    Also serves the Files and Batch endpoints the Batch API uses (upload,
+    create, retrieve, list, download), keeping everything in memory.
+    """
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0, chunk_delay=0.0, batch_polls=1, model_latency=None,
+                 host="127.0.0.1", port=0):
+        self.latency = latency
+        self.model_latency = dict(model_latency or {})
+        self.error_rate = error_rate
+        self.chunk_delay = chunk_delay
+        self.batch_polls = batch_polls
+        self.files = {}
+        self.batches = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._scripted = []
+        self.requests = 0
+        self.connections = 0
+        self.errors = 0
+        # Seconds each request spent in the server (injected latency included)
+        self.server_times = []
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def fail_next(self, status=429, headers=None, count=1):
+        """
+        Answers the next `count` requests with `status` (and extra headers such
+        as {"Retry-After": "1"}).
+        """
+        with self._lock:
+            self._scripted.extend([(status, headers or {})] * count)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _next_failure(self):
+        with self._lock:
+            self.requests += 1
+            if self._scripted:
+                self.errors += 1
+                return self._scripted.pop(0)
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors += 1
+                return 503, {}
+        return None
+
+    def _add_file(self, filename, purpose, data):
+        with self._lock:
+            file_id = f"file-stub{len(self.files) + 1}"
+            self.files[file_id] = data
+        return {"id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+                "filename": filename, "purpose": purpose, "status": "processed"}
+
+    def _create_batch(self, request):
+        with self._lock:
+            batch_id = f"batch_stub{len(self.batches) + 1}"
+            batch = {
+                "id": batch_id, "object": "batch", "endpoint": request.get("endpoint"),
+                "input_file_id": request.get("input_file_id"), "completion_window": request.get("completion_window"),
+                "status": "validating", "created_at": int(time.time()), "output_file_id": None,
+                "error_file_id": None, "request_counts": {"total": 0, "completed": 0, "failed": 0},
+                "metadata": request.get("metadata") or {}, "_polls": 0,
+            }
+            self.batches[batch_id] = batch
+        return batch
+
+    def _poll_batch(self, batch):
+        # Runs the batch once it has been checked `batch_polls` times
+        with self._lock:
+            batch["_polls"] += 1
+            if batch["status"] not in ("validating", "in_progress"):
+                return
+            if batch["_polls"] <= self.batch_polls:
+                batch["status"] = "in_progress"
+                return
+            lines = self.files.get(batch["input_file_id"], b"").splitlines()
+        output, errors = [], []
+        for n, line in enumerate(lines):
+            item = json.loads(line)
+            if item.get("url") != batch["endpoint"]:
+                errors.append({"id": f"batch_req_{n}", "custom_id": item.get("custom_id"), "response": None,
+                               "error": {"code": "invalid_url", "message": f"url must be {batch['endpoint']}"}})
+                continue
+            body = item.get("body", {})
+            content, usage = _completion(body)
+            output.append({"id": f"batch_req_{n}", "custom_id": item.get("custom_id"), "error": None,
+                           "response": {"status_code": 200, "request_id": f"req_{n}",
+                                        "body": _completion_body(body.get("model"), content, usage)}})
+        dump = lambda records: "".join(json.dumps(r) + "\n" for r in records).encode()
+        output_file = self._add_file("batch_output.jsonl", "batch_output", dump(output)) if output else None
+        error_file = self._add_file("batch_errors.jsonl", "batch_output", dump(errors)) if errors else None
+        with self._lock:
+            batch.update(status="completed", output_file_id=output_file and output_file["id"],
+                         error_file_id=error_file and error_file["id"],
+                         request_counts={"total": len(lines), "completed": len(output), "failed": len(errors)})
+
+    @staticmethod
+    def _public(batch):
+        return {key: value for key, value in batch.items() if not key.startswith("_")}
+
+    def _delay(self, model=None):
+        latency = self.model_latency.get(model, self.latency)
+        latency = latency() if callable(latency) else latency
+        if latency > 0:
+            time.sleep(latency)
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out in separate writes; without this, Nagle's
+                # algorithm holds the body back for the client's delayed ACK (~40ms)
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with stub._lock:
+                    stub.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                self._timed(self._handle_post)
+
+            def do_GET(self):
+                self._timed(self._handle_get)
+
+            def _timed(self, handle):
+                start = time.perf_counter()
+                try:
+                    handle()
+                finally:
+                    with stub._lock:
+                        stub.server_times.append(time.perf_counter() - start)
+
+            def _failed(self):
+                failure = stub._next_failure()
+                if failure is None:
+                    return False
+                status, headers = failure
+                self._send_json(status, {"error": {"message": f"stub error {status}", "type": "stub"}}, headers)
+                return True
+
+            def _handle_post(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                path = self.path.split("?", 1)[0]
+                if path.endswith("/files"):
+                    if not self._failed():
+                        fields = _multipart_fields(self.headers.get("Content-Type", ""), body)
+                        self._send_json(200, stub._add_file("upload.jsonl", (fields.get("purpose") or b"").decode(),
+                                                            fields.get("file") or b""))
+                    return
+                request = json.loads(body or b"{}")
+                if path.endswith("/batches"):
+                    if request.get("input_file_id") not in stub.files:
+                        self._send_json(404, {"error": {"message": "input file not found"}})
+                    elif not self._failed():
+                        self._send_json(200, stub._public(stub._create_batch(request)))
+                    return
+                if not path.endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+                stub._delay(request.get("model"))
+                if self._failed():
+                    return
+                content, usage = _completion(request)
+                if request.get("stream"):
+                    self._stream(request.get("model"), content, usage)
+                else:
+                    self._send_json(200, _completion_body(request.get("model"), content, usage))
+
+            def _handle_get(self):
+                path = self.path.split("?", 1)[0].rstrip("/")
+                parts = ["", "", ""] + path.split("/")
+                if self._failed():
+                    return
+                if parts[-1] == "batches":
+                    with stub._lock:
+                        batches = [stub._public(b) for b in reversed(list(stub.batches.values()))]
+                    self._send_json(200, {"object": "list", "data": batches, "has_more": False,
+                                          "first_id": batches[0]["id"] if batches else None,
+                                          "last_id": batches[-1]["id"] if batches else None})
+                elif parts[-2] == "batches" and parts[-1] in stub.batches:
+                    batch = stub.batches[parts[-1]]
+                    stub._poll_batch(batch)
+                    self._send_json(200, stub._public(batch))
+                elif parts[-1] == "content" and parts[-3] == "files" and parts[-2] in stub.files:
+                    data = stub.files[parts[-2]]
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/octet-stream")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def _stream(self, model, content, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                words = content.split(" ")
+                pieces = [w if i == 0 else " " + w for i, w in enumerate(words)]
+                for piece in pieces:
+                    if stub.chunk_delay:
+                        time.sleep(stub.chunk_delay)
+                    self._event({"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                                 "model": model, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+                self._event({"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model, "choices": [], "usage": usage})
+                self._chunk(b"data: [DONE]\n\n")
+                self._chunk(b"")
+
+            def _event(self, payload):
+                self._chunk(f"data: {json.dumps(payload)}\n\n".encode())
+
+            def _chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+if __name__ == "__main__":
+    with StubOpenAIServer(latency=0.2) as server:
+        print(f"Stub OpenAI server on {server.url} (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
@@ -16,7 +16,7 @@ def test_prompt_generator():
         print(f"Mood: {mood}")
         try:
             response = generate_prompt(mood)
-            print(f"Raw Response: {response}")
+            print(f"Raw Response: {response.to_json()}")
                 
         except json.JSONDecodeError:
             print(f"Error: Response was not valid JSON. Raw: {response}")
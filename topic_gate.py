@@ -0,0 +1,190 @@
+import json
+import math
+import os
+import re
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "topic_corpus.jsonl")
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+# Keyword groups used as features. Off-topic groups double as the topic named
+# in the redirect; any emotion keyword vetoes the gate, so "this bug is making
+# me panic" always reaches the model.
+KEYWORD_GROUPS = {
+    "emotion": {
+        "feel", "feeling", "feelings", "felt", "anxious", "anxiety", "stress", "stressed", "stressing", "sad",
+        "sadness", "lonely", "alone", "scared", "afraid", "fear", "worried", "worry", "worrying", "panic",
+        "panicking", "overwhelmed", "depressed", "upset", "angry", "frustrated", "guilty", "ashamed",
+        "hopeless", "cry", "crying", "tired", "exhausted", "burnout", "burnt", "nervous", "hurt", "miss",
+        "grieving", "grief", "mood", "happy", "proud", "jealous", "numb", "empty", "terrible", "awful",
+        "miserable", "struggling", "vent", "therapy", "therapist", "embarrassed", "insecure", "worthless",
+        "stupid", "failure", "motivation", "unmotivated", "overthinking", "sleep", "calm", "helpless",
+        "myself",
+    },
+    "trivia": {
+        "capital", "population", "tallest", "largest", "invented", "who", "year", "president", "country",
+        "planets", "ocean", "continents", "fact", "history", "gdp", "painted", "wrote",
+    },
+    "coding": {
+        "python", "java", "javascript", "c", "code", "function", "class", "sql", "query", "regex", "css",
+        "html", "react", "bash", "script", "debug", "install", "pip", "api", "nginx", "linked", "list",
+        "tuple", "json", "xml", "programming", "algorithm", "tcp", "udp", "compile", "neural", "blockchain",
+    },
+    "math": {
+        "solve", "equation", "derivative", "integrate", "calculate", "times", "plus", "percent", "squared",
+        "square", "root", "prove", "area", "radius", "x",
+    },
+    "politics": {"vote", "election", "politics", "political", "party", "policy", "news", "headlines", "minister", "war"},
+    "entertainment": {
+        "movie", "movies", "film", "series", "netflix", "album", "song", "game", "oscar", "score", "team",
+        "player", "football", "book", "actor", "directed", "marvel", "champions", "league", "super", "bowl",
+    },
+    "creative": {"poem", "story", "haiku", "limerick", "rap", "verse", "essay", "joke", "compose"},
+    "errands": {
+        "recipe", "bake", "cook", "weather", "flight", "translate", "buy", "laptop", "stocks", "exchange",
+        "rate", "car", "tire", "pizza", "airport", "password", "workout",
+    },
+}
+
+# Self-harm method and lethality vocabulary. Like emotion keywords, any hit
+# vetoes the gate: "how much tylenol is a lethal dose" reads like trivia to the
+# classifier but must reach the model's crisis protocol. Kept out of the
+# features, so the veto does not depend on what the corpus taught the model.
+RISK_WORDS = {
+    "overdose", "overdosed", "overdosing", "od", "lethal", "fatal", "deadly", "dose", "doses", "dosage",
+    "pill", "pills", "tablets", "noose", "hang", "hanging", "hanged", "bridge", "jump", "jumping", "gun",
+    "guns", "firearm", "rope", "painless", "suicide", "suicidal", "die", "dying", "kill", "survive",
+}
+RISK_PHRASES = re.compile(r"\b(?:not|never) wake up\b|\bend it\b|\bway to go\b")
+
+TOPIC_NAMES = {
+    "trivia": "general knowledge questions",
+    "coding": "coding or technical questions",
+    "math": "math problems",
+    "politics": "politics or the news",
+    "entertainment": "entertainment recommendations",
+    "creative": "creative writing",
+    "errands": "everyday tasks like that",
+}
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower().replace("’", "'"))
+
+def extract_features(text):
+    """
+    Sparse binary features: unigrams, bigrams, keyword-group hits and a
+    question-mark flag.
+    """
+    tokens = tokenize(text)
+    features = {"bias"}
+    features.update(f"w:{t}" for t in tokens)
+    features.update(f"b:{a}_{b}" for a, b in zip(tokens, tokens[1:]))
+    token_set = set(tokens)
+    for group, words in KEYWORD_GROUPS.items():
+        if token_set & words:
+            features.add(f"kw:{group}")
+    if text.strip().endswith("?"):
+        features.add("question")
+    return features
+
+def has_risk_language(text):
+    """
+    True if `text` uses self-harm method or lethality vocabulary.
+    """
+    tokens = tokenize(text)
+    return bool(RISK_WORDS.intersection(tokens)) or bool(RISK_PHRASES.search(" ".join(tokens)))
+
+def _sigmoid(z):
+    if z < -30:
+        return 0.0
+    if z > 30:
+        return 1.0
+    return 1.0 / (1.0 + math.exp(-z))
+
+class GateDecision:
+    __slots__ = ("off_topic", "probability", "topic")
+
+    def __init__(self, off_topic, probability, topic):
+        self.off_topic = off_topic
+        self.probability = probability
+        self.topic = topic
+
+    def __repr__(self):
+        return f"GateDecision(off_topic={self.off_topic!r}, probability={self.probability:.3f}, topic={self.topic!r})"
+
+class TopicGate:
+    """
+    Local classifier that recognizes clearly off-topic requests (trivia, coding,
+    politics, ...) so they can get the templated redirect without an API call.
+
+    A logistic regression over keyword and n-gram features, trained in pure
+    Python from the bundled corpus. Only confident predictions (at or above
+    `threshold`) with no emotional language are gated; everything else goes to
+    the model, which enforces the domain rules itself. Messages with risk
+    vocabulary (RISK_WORDS, RISK_PHRASES) are never gated either.
+    """
+    def __init__(self, weights, threshold=0.85):
+        self.weights = weights
+        self.threshold = threshold
+
+    @classmethod
+    def train(cls, examples, epochs=60, learning_rate=0.3, l2=1e-4, threshold=0.85):
+        """
+        Trains on (text, is_off_topic) pairs with plain stochastic gradient
+        descent. Deterministic: examples are visited in the given order.
+        """
+        data = [(extract_features(text), 1.0 if label else 0.0) for text, label in examples]
+        weights = {}
+        for _ in range(epochs):
+            for features, target in data:
+                error = _sigmoid(sum(weights.get(f, 0.0) for f in features)) - target
+                for f in features:
+                    w = weights.get(f, 0.0)
+                    weights[f] = w - learning_rate * (error + l2 * w)
+        return cls(weights, threshold=threshold)
+
+    @classmethod
+    def from_corpus(cls, path=CORPUS_PATH, **kwargs):
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        return cls.train([(row["text"], row["label"] == "off_topic") for row in rows], **kwargs)
+
+    def probability(self, text):
+        """
+        Probability that `text` is an off-topic request.
+        """
+        return _sigmoid(sum(self.weights.get(f, 0.0) for f in extract_features(text)))
+
+    def check(self, text):
+        """
+        Returns:
+            GateDecision: off_topic is True only for confident predictions with no
+                          emotional or risk language; topic names the matched
+                          off-topic keyword group, if any.
+        """
+        features = extract_features(text)
+        probability = _sigmoid(sum(self.weights.get(f, 0.0) for f in features))
+        topic = next((g for g in TOPIC_NAMES if f"kw:{g}" in features), None)
+        off_topic = probability >= self.threshold and "kw:emotion" not in features and not has_risk_language(text)
+        return GateDecision(off_topic, probability, topic)
+
+def off_topic_response(topic=None):
+    """
+    The redirect from the chatbot system prompt's domain restrictions.
+    """
+    subject = TOPIC_NAMES.get(topic, "that")
+    return (
+        f"I'm here to support your well-being, so I can't help with {subject}. "
+        "But I'm here to listen if anything is on your mind. How are you feeling right now?"
+    )
+
+_default_gate = None
+
+def get_default_gate():
+    """
+    The gate trained on the bundled corpus (trained once, on first use).
+    """
+    global _default_gate
+    if _default_gate is None:
+        _default_gate = TopicGate.from_corpus()
+    return _default_gate
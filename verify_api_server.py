@@ -0,0 +1,212 @@
+import unittest
+from unittest.mock import patch
+import asyncio
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from api_server import ApiServer
+from prompt_schema import PromptError, PromptSet
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+class RunningServer:
+    """Runs an ApiServer on its own event loop thread, on a free port."""
+    def __init__(self, **kwargs):
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        self.server = ApiServer(**kwargs)
+        self.thread = threading.Thread(target=lambda: asyncio.run(self.server.serve(sock=self.sock)), daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while self.server._server is None:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.stop()
+        self.thread.join(5)
+
+    def connection(self):
+        return http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+
+def post(conn, path, payload):
+    conn.request("POST", path, body=json.dumps(payload), headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    return response.status, response.read().decode()
+
+class TestApiServer(unittest.TestCase):
+    @patch('backend_interface.process_chat_message_async')
+    def test_chat_json_over_keep_alive(self, mock_chat):
+        async def chat(message, history=None, location=None, usage=None, deadline=None):
+            usage["prompt_tokens"] = 12
+            return f"You said: {message} ({len(history or [])} earlier, {location})"
+        mock_chat.side_effect = chat
+
+        with RunningServer() as running:
+            conn = running.connection()
+            history = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello!"}]
+            status, body = post(conn, "/v1/chat", {"message": "I feel low", "history": history, "location": "Oslo"})
+            self.assertEqual(status, 200)
+            self.assertEqual(json.loads(body), {"reply": "You said: I feel low (2 earlier, Oslo)",
+                                                "usage": {"prompt_tokens": 12}})
+            # Same connection, second request
+            status, body = post(conn, "/v1/chat", {"message": "Still low"})
+            self.assertEqual(status, 200)
+            conn.close()
+        print("\nAPI chat verification passed! JSON replies over one keep-alive connection.")
+
+    @patch('backend_interface.process_chat_message_stream_async')
+    def test_chat_stream_is_server_sent_events(self, mock_stream):
+        def stream(message, history=None, location=None, timings=None, usage=None, deadline=None):
+            async def deltas():
+                for delta in ["That", " sounds", " hard."]:
+                    yield delta
+                timings["total"] = 0.01
+            return deltas()
+        mock_stream.side_effect = stream
+
+        with RunningServer() as running:
+            conn = running.connection()
+            conn.request("POST", "/v1/chat/stream", body=json.dumps({"message": "Rough day"}))
+            response = conn.getresponse()
+            self.assertEqual(response.getheader("Content-Type"), "text/event-stream")
+            events = response.read().decode().strip().split("\n\n")
+            conn.close()
+
+        deltas = [json.loads(e[len("data: "):])["delta"] for e in events if e.startswith("data: ")]
+        self.assertEqual("".join(deltas), "That sounds hard.")
+        self.assertTrue(events[-1].startswith("event: done\ndata: "))
+        self.assertEqual(json.loads(events[-1].split("data: ", 1)[1])["timings"], {"total": 0.01})
+        print("API streaming verification passed! Deltas sent as Server-Sent Events.")
+
+    @patch('backend_interface.get_journal_prompts_async')
+    def test_journal_prompts_and_errors(self, mock_prompts):
+        async def prompts(mood, deadline=None, user_id=None, source=None, note=None):
+            if mood == "Broken":
+                return PromptError(mood, "api_error", "Failed to generate prompt: boom")
+            return PromptSet(mood, [f"Q{n}" for n in range(6)])
+        mock_prompts.side_effect = prompts
+
+        with RunningServer() as running:
+            conn = running.connection()
+            status, body = post(conn, "/v1/journal-prompts", {"mood": "Calm"})
+            self.assertEqual((status, json.loads(body)["mood"]), (200, "Calm"))
+            status, body = post(conn, "/v1/journal-prompts", {"mood": "Broken"})
+            self.assertEqual((status, json.loads(body)), (502, {"error": "Failed to generate prompt: boom"}))
+            self.assertEqual(post(conn, "/v1/journal-prompts", {"mood": "Calm", "source": "elsewhere"})[0], 400)
+            post(conn, "/v1/journal-prompts", {"mood": "Calm", "user_id": "u1", "source": "local"})
+            self.assertEqual(mock_prompts.call_args.kwargs["user_id"], "u1")
+
+            self.assertEqual(post(conn, "/v1/journal-prompts", {})[0], 400)
+            self.assertEqual(post(conn, "/v1/chat", {"message": "Hi", "history": ["not a message"]})[0], 400)
+            self.assertEqual(post(conn, "/v1/chat", {"message": "Hi", "session_id": "missing"})[0], 404)
+            self.assertEqual(post(conn, "/v1/nowhere", {})[0], 404)
+            conn.request("GET", "/v1/chat")
+            response = conn.getresponse()
+            response.read()
+            self.assertEqual(response.status, 405)
+
+            conn.request("POST", "/v1/chat", body=b"{not json")
+            response = conn.getresponse()
+            self.assertEqual((response.status, json.loads(response.read())["error"]), (400, "Request body must be JSON"))
+            conn.close()
+        print("API journal prompt and error verification passed!")
+
+    @patch('backend_interface.process_chat_message_async')
+    def test_shutdown_lets_in_flight_requests_finish(self, mock_chat):
+        started = threading.Event()
+        async def slow_chat(message, **kwargs):
+            started.set()
+            await asyncio.sleep(0.3)
+            return "finished"
+        mock_chat.side_effect = slow_chat
+
+        running = RunningServer(grace=5).__enter__()
+        result = {}
+        def client():
+            result["response"] = post(running.connection(), "/v1/chat", {"message": "Hello"})
+        thread = threading.Thread(target=client)
+        thread.start()
+        started.wait(2)
+        running.server.stop()
+        thread.join(5)
+        running.thread.join(5)
+
+        self.assertEqual(result["response"], (200, json.dumps({"reply": "finished", "usage": {}})))
+        self.assertFalse(running.thread.is_alive())
+        with self.assertRaises(ConnectionError):
+            post(running.connection(), "/v1/chat", {"message": "Too late"})
+        print("API graceful shutdown verification passed! In-flight request completed.")
+
+    def start_workers(self, workers=2, env=None):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(HERE, "api_server.py"), "--port", str(port), "--workers", str(workers),
+             "--grace", "2"],
+            cwd=HERE, stderr=subprocess.PIPE, text=True, env=env,
+        )
+        self.addCleanup(process.stderr.close)
+        self.addCleanup(lambda: process.poll() is None and process.kill())
+        return process, port
+
+    def wait_until_healthy(self, process, port, timeout=30):
+        # Connections are refused (or time out) until a worker is serving
+        deadline = time.time() + timeout
+        while True:
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+                conn.request("GET", "/healthz")
+                self.assertEqual(json.loads(conn.getresponse().read()), {"status": "ok"})
+                conn.close()
+                return
+            except OSError:
+                if time.time() > deadline or process.poll() is not None:
+                    raise
+                time.sleep(0.1)
+
+    def test_multiple_workers_start_and_stop(self):
+        process, port = self.start_workers()
+        self.wait_until_healthy(process, port)
+
+        # Fresh connections land on either worker; the session must be found on both
+        history = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello!"}]
+        status, body = post(http.client.HTTPConnection("127.0.0.1", port, timeout=5), "/v1/sessions",
+                            {"history": history})
+        self.assertEqual(status, 201)
+        session_id = json.loads(body)["session_id"]
+        for _ in range(10):
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", f"/v1/sessions/{session_id}")
+            response = conn.getresponse()
+            self.assertEqual((response.status, json.loads(response.read())["messages"]), (200, history))
+            conn.close()
+
+        process.send_signal(signal.SIGTERM)
+        self.assertEqual(process.wait(10), 0)
+        print("API worker verification passed! Two workers shared sessions and drained on SIGTERM.")
+
+    def test_failed_startup_exits_non_zero(self):
+        env = dict(os.environ)
+        env.pop("OPENAI_API_KEY", None)
+        process, port = self.start_workers(env=env)
+
+        # Warm-up fails in the parent before any worker starts, and nothing is left listening
+        self.assertEqual(process.wait(30), 1)
+        with self.assertRaises(OSError):
+            socket.create_connection(("127.0.0.1", port), timeout=2).close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import asyncio
+import os
+import json
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from chatbot_agent import AsyncMentalHealthChatbot
+from concurrency import InFlightLimiter
+from prompt_generator import generate_prompt_async
+
+def make_slow_create(content, tracker):
+    async def create(**kwargs):
+        tracker["current"] += 1
+        tracker["peak"] = max(tracker["peak"], tracker["current"])
+        await asyncio.sleep(0.01)
+        tracker["current"] -= 1
+        completion = MagicMock()
+        completion.choices[0].message.content = content
+        return completion
+    return create
+
+class TestAsyncBackend(unittest.TestCase):
+    @patch('chatbot_agent.AsyncOpenAI')
+    def test_concurrent_chats_are_capped(self, mock_openai):
+        # Setup mock
+        tracker = {"current": 0, "peak": 0}
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create = make_slow_create("Async response", tracker)
+
+        bot = AsyncMentalHealthChatbot(limiter=InFlightLimiter(max_in_flight=3))
+
+        async def run():
+            return await asyncio.gather(*(bot.get_response(f"msg {i}") for i in range(20)))
+
+        responses = asyncio.run(run())
+
+        self.assertEqual(responses, ["Async response"] * 20)
+        self.assertEqual(tracker["peak"], 3)
+        self.assertEqual(bot.limiter.in_flight, 0)
+
+        print("\nAsync chat verification passed! In-flight requests capped at 3.")
+
+    @patch('chatbot_agent.AsyncOpenAI')
+    def test_async_error_message(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+
+        async def failing_create(**kwargs):
+            raise Exception("boom")
+
+        mock_client.chat.completions.create = failing_create
+
+        bot = AsyncMentalHealthChatbot()
+        response = asyncio.run(bot.get_response("Hello, I had a rough day."))
+
+        self.assertEqual(response, "Error generating response: boom")
+        print("Async error verification passed!")
+
+    @patch('prompt_generator.async_client')
+    def test_async_prompt_generation(self, mock_client):
+        # Setup mock
+        tracker = {"current": 0, "peak": 0}
+        expected_json = json.dumps({"mood": "Calm", "questions": [{"question": f"What felt easy today? ({n})"} for n in range(6)]})
+        mock_client.chat.completions.create = make_slow_create(expected_json, tracker)
+
+        limiter = InFlightLimiter(max_in_flight=2)
+
+        async def run():
+            return await asyncio.gather(*(generate_prompt_async("Calm", limiter=limiter) for _ in range(6)))
+
+        results = asyncio.run(run())
+
+        self.assertEqual([result.to_json() for result in results], [expected_json] * 6)
+        self.assertEqual(tracker["peak"], 2)
+
+        print("Async prompt verification passed! In-flight requests capped at 2.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import json
+import tempfile
+from types import SimpleNamespace
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+import httpx
+from openai import OpenAI
+from llm_client import DeadlineExceeded, RetryPolicy, client_options
+from persistent_cache import PersistentCache
+from prompt_batch import PromptBatchRunner, build_batch_file, parse_result_line
+from stub_openai_server import StubOpenAIServer
+import prompt_generator
+
+def no_retry_waits():
+    return RetryPolicy(max_retries=2, sleep=lambda seconds: None)
+
+def batch(batch_id, status, job_id="nightly-1"):
+    return SimpleNamespace(id=batch_id, status=status, metadata={"job_id": job_id},
+                           output_file_id=None, error_file_id=None)
+
+class TestBatchAgainstStubServer(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = PersistentCache(os.path.join(self.tmpdir.name, "prompts.sqlite"))
+        prompt_generator.set_cache(self.cache)
+
+    def tearDown(self):
+        prompt_generator.set_cache(None)
+        self.tmpdir.cleanup()
+
+    def test_batch_fills_the_cache_once_per_job_id(self):
+        with StubOpenAIServer(batch_polls=2) as server:
+            client = OpenAI(**client_options(base_url=server.url))
+            sleeps = []
+            runner = PromptBatchRunner(client=client, retry_policy=no_retry_waits(), sleep=sleeps.append)
+            summary = runner.run(["Happy", "Sad", "Happy"], "nightly-1")
+
+            self.assertEqual((summary["status"], summary["submitted"]), ("completed", True))
+            self.assertEqual((summary["stored"], summary["failed"]), (2, 0))
+            self.assertEqual(len(sleeps), 2)
+            self.assertEqual(len(server.batches), 1)
+
+            # A retried job collects the same batch instead of submitting another
+            again = runner.run(["Happy", "Sad"], "nightly-1")
+            self.assertEqual((again["batch_id"], again["submitted"]), (summary["batch_id"], False))
+            self.assertEqual(len(server.batches), 1)
+
+            # Cached moods are served without a request
+            with patch('prompt_generator.client') as mock_client:
+                result = prompt_generator.generate_prompt("Sad")
+                mock_client.chat.completions.create.assert_not_called()
+            self.assertTrue(result.ok)
+            self.assertEqual(len(result.questions), 6)
+        print(f"\nBatch API verification passed! {summary['stored']} sets cached from one batch, resubmit skipped.")
+
+    def test_submit_only_then_collect(self):
+        with StubOpenAIServer(batch_polls=1) as server:
+            client = OpenAI(**client_options(base_url=server.url))
+            runner = PromptBatchRunner(client=client, retry_policy=no_retry_waits(), sleep=lambda seconds: None)
+            submitted = runner.run(["Calm"], "nightly-2", wait=False)
+            self.assertEqual((submitted["status"], submitted["stored"]), ("validating", 0))
+
+            collected = runner.run(["Calm"], "nightly-2")
+            self.assertEqual((collected["submitted"], collected["stored"]), (False, 1))
+            self.assertEqual(len(server.batches), 1)
+
+class TestBatchIdempotency(unittest.TestCase):
+    def test_failed_create_is_not_submitted_twice(self):
+        client = MagicMock()
+        created = batch("batch_1", "validating")
+        # Nothing for the job yet; after the broken create, the batch turns out to exist
+        client.batches.list.side_effect = [[], [created]]
+        client.batches.create.side_effect = httpx.ConnectError("connection reset")
+        runner = PromptBatchRunner(client=client, retry_policy=no_retry_waits())
+
+        found, submitted = runner.submit(["Happy"], "nightly-1")
+        self.assertEqual((found, submitted), (created, False))
+        self.assertEqual(client.batches.create.call_count, 1)
+        self.assertEqual(client.files.create.call_count, 1)
+        print("Batch idempotency verification passed! A broken create is not sent again.")
+
+    def test_only_dead_batches_are_resubmitted(self):
+        client = MagicMock()
+        client.batches.list.return_value = [batch("batch_0", "completed", job_id="other"), batch("batch_1", "expired")]
+        client.batches.create.return_value = batch("batch_2", "validating")
+        runner = PromptBatchRunner(client=client, retry_policy=no_retry_waits())
+
+        found, submitted = runner.submit(["Happy"], "nightly-1")
+        self.assertEqual((found.id, submitted), ("batch_2", True))
+        self.assertEqual(client.batches.create.call_args.kwargs["metadata"], {"job_id": "nightly-1"})
+
+    def test_polling_backs_off_until_the_timeout(self):
+        client = MagicMock()
+        client.batches.retrieve.side_effect = [batch("b", "in_progress")] * 3 + [batch("b", "completed")]
+        sleeps = []
+        runner = PromptBatchRunner(client=client, retry_policy=no_retry_waits(), sleep=sleeps.append)
+        self.assertEqual(runner.wait("b", interval=2.0, max_interval=5.0).status, "completed")
+        for pause, delay in zip(sleeps, [2.0, 4.0, 5.0]):
+            self.assertTrue(delay / 2 <= pause <= delay)
+
+        client.batches.retrieve.side_effect = None
+        client.batches.retrieve.return_value = batch("b", "in_progress")
+        runner.sleep = lambda seconds: None
+        with self.assertRaises(DeadlineExceeded):
+            runner.wait("b", timeout=0.01)
+
+class TestBatchFiles(unittest.TestCase):
+    def test_request_lines_match_generate_prompt(self):
+        lines = [json.loads(line) for line in build_batch_file({"user-1": "Tired", "user-2": "Awful"}).splitlines()]
+        self.assertEqual([line["custom_id"] for line in lines], ["user-1|Tired", "user-2|Awful"])
+        self.assertEqual(lines[0]["body"]["messages"], prompt_generator._build_messages("Tired"))
+        self.assertEqual(lines[0]["body"]["response_format"], {"type": "json_object"})
+
+    def test_result_lines_are_validated(self):
+        answer = json.dumps({"mood": "Tired", "questions": [f"Question number {n}?" for n in range(6)]})
+        ok = {"custom_id": "user-1|Tired", "error": None, "response": {"status_code": 200, "body": {
+            "choices": [{"message": {"content": answer}}], "usage": {"prompt_tokens": 10}}}}
+        key, result = parse_result_line(ok)
+        self.assertEqual((key, result.ok, len(result.questions)), ("user-1", True, 6))
+
+        ok["response"]["body"]["choices"][0]["message"]["content"] = '{"questions": []}'
+        self.assertEqual(parse_result_line(ok)[1].kind, "invalid_response")
+        failed = {"custom_id": "user-2|Awful", "response": {"status_code": 500, "body": {"error": {"message": "boom"}}}}
+        self.assertEqual(parse_result_line(failed)[1].kind, "api_error")
+
+if __name__ == '__main__':
+    unittest.main()
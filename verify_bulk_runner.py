@@ -0,0 +1,162 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import json
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from bulk_runner import BulkRunner, JobError
+import backend_interface
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def write_jobs(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        for n in range(count):
+            f.write(json.dumps({"id": f"job-{n}", "type": "echo", "text": f"message {n}"}) + "\n")
+
+def read_records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def echo(job):
+    if job["text"] == "message 3":
+        raise JobError("bad_job", "no good")
+    time.sleep(0.001)
+    return {"text": job["text"]}
+
+# Used by the crash test's subprocess: every job is slow enough to be killed mid-run
+CHILD = """
+import sys, time
+sys.path.insert(0, {here!r})
+from bulk_runner import BulkRunner
+def slow(job):
+    time.sleep(0.01)
+    return {{"text": job["text"]}}
+BulkRunner(sys.argv[1], sys.argv[2], workers=4, checkpoint_every=5, job_types={{"echo": slow}}, log=None).run()
+"""
+
+class TestBulkRunner(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.tmpdir.name, "jobs.jsonl")
+        self.output = os.path.join(self.tmpdir.name, "results.jsonl")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_runs_every_line_once_and_reports_failures(self):
+        write_jobs(self.input, 50)
+        with open(self.input, "a", encoding="utf-8") as f:
+            f.write("\nnot json\n" + json.dumps({"type": "nope"}) + "\n")
+
+        stats = BulkRunner(self.input, self.output, workers=4, checkpoint_every=7, job_types={"echo": echo}, log=None).run()
+
+        records = read_records(self.output)
+        self.assertEqual(sorted(r["line"] for r in records), list(range(1, 51)) + [52, 53])
+        self.assertEqual((stats["ok"], stats["failed"]), (49, 3))
+        self.assertEqual(stats["failures"], {"bad_job": 1, "invalid_job": 2})
+        self.assertEqual(next(r for r in records if r["line"] == 2)["result"], {"text": "message 1"})
+
+        # A finished file is not run again
+        again = BulkRunner(self.input, self.output, job_types={"echo": echo}, log=None).run()
+        self.assertEqual((again["skipped"], len(read_records(self.output))), (52, 52))
+        print(f"\nBulk runner verification passed! {stats['jobs_per_second']} jobs/s with 4 workers.")
+
+    def test_interrupted_run_resumes_without_duplicates(self):
+        write_jobs(self.input, 40)
+        calls = []
+        def interrupt_once(job):
+            calls.append(job["text"])
+            if job["text"] == "message 20" and calls.count("message 20") == 1:
+                raise KeyboardInterrupt
+            if job["text"] == "message 2":
+                raise JobError("bad_job", "no good")
+            return {"text": job["text"]}
+
+        runner = BulkRunner(self.input, self.output, workers=3, checkpoint_every=4, job_types={"echo": interrupt_once}, log=None)
+        first = runner.run()
+        self.assertTrue(first["interrupted"])
+        self.assertLess(first["ok"], 40)
+
+        second = runner.run()
+        self.assertFalse(second["interrupted"])
+        self.assertEqual((second["ok"], second["failed"]), (39, 1))
+        # Failures from before the interruption are still reported by kind
+        self.assertEqual(second["failures"], {"bad_job": 1})
+        records = read_records(self.output)
+        self.assertEqual(sorted(r["line"] for r in records), list(range(1, 41)))
+        print("Bulk runner resume verification passed! Interrupted run finished without duplicates.")
+
+    def test_killed_process_resumes_without_duplicates(self):
+        write_jobs(self.input, 200)
+        script = CHILD.format(here=HERE)
+        child = subprocess.Popen([sys.executable, "-c", script, self.input, self.output])
+        checkpoint = self.output + ".checkpoint"
+        deadline = time.monotonic() + 10
+        while not os.path.exists(checkpoint) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        child.send_signal(signal.SIGKILL)
+        child.wait()
+        with open(checkpoint, encoding="utf-8") as f:
+            self.assertFalse(json.load(f)["complete"])
+
+        subprocess.run([sys.executable, "-c", script, self.input, self.output], check=True, timeout=60)
+        records = read_records(self.output)
+        self.assertEqual(sorted(r["line"] for r in records), list(range(1, 201)))
+        print("Bulk runner crash verification passed! Killed run resumed without duplicates.")
+
+    @patch('chatbot_agent.OpenAI')
+    def test_backend_jobs(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.return_value.choices[0].message.content = "That sounds like a lot."
+        backend_interface._chatbot_instance = None
+
+        with open(self.input, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"id": "c1", "type": "chat", "message": "Work has been rough this week."}) + "\n")
+            f.write(json.dumps({"id": "p1", "type": "journal_prompts", "mood": "Calm", "source": "local"}) + "\n")
+            f.write(json.dumps({"id": "c2", "type": "chat"}) + "\n")
+        try:
+            stats = BulkRunner(self.input, self.output, workers=2, log=None).run()
+        finally:
+            backend_interface._chatbot_instance = None
+
+        records = {r["id"]: r for r in read_records(self.output)}
+        self.assertEqual(records["c1"]["result"]["reply"], "That sounds like a lot.")
+        self.assertGreaterEqual(len(records["p1"]["result"]["questions"]), 6)
+        self.assertEqual((records["c2"]["ok"], records["c2"]["kind"]), (False, "invalid_job"))
+        self.assertEqual((stats["ok"], stats["failed"]), (2, 1))
+
+    @patch('chatbot_agent.OpenAI')
+    def test_chat_error_replies_fail_the_job(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = Exception("boom")
+        backend_interface._chatbot_instance = None
+
+        with open(self.input, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"id": "c1", "type": "chat", "message": "Work has been rough this week."}) + "\n")
+        try:
+            stats = BulkRunner(self.input, self.output, workers=1, log=None).run()
+        finally:
+            backend_interface._chatbot_instance = None
+
+        record = read_records(self.output)[0]
+        self.assertEqual((record["ok"], record["kind"], record["error"]),
+                         (False, "chat_error", "Error generating response: boom"))
+        self.assertEqual(stats["failures"], {"chat_error": 1})
+        self.assertTrue(backend_interface.is_error_reply("I hear you.\n\nError generating response: reset"))
+        self.assertFalse(backend_interface.is_error_reply("I hear you."))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from canned_replies import get_canned_replies, normalize
+from chatbot_agent import MentalHealthChatbot
+from metrics import registry
+
+class TestCannedReplies(unittest.TestCase):
+    def test_normalization(self):
+        self.assertEqual(normalize("  HEYYY!!! 👋 "), "hey")
+        self.assertEqual(normalize("What’s your name?"), "whats your name")
+        self.assertEqual(normalize("Ｗｈｏ ａｒｅ ｙｏｕ？"), "who are you")  # Fullwidth forms
+        self.assertEqual(normalize("Good-morning :)"), "good morning")
+
+    def test_matching(self):
+        canned = get_canned_replies()
+        self.assertEqual(canned.match("Hi!"), "greeting")
+        self.assertEqual(canned.match("who are u??"), "identity")
+        self.assertEqual(canned.match("Are you a real person?", opening=False), "identity")
+        # Greetings are only canned as the opening turn
+        self.assertIsNone(canned.match("hello", opening=False))
+        # Anything more than the bare phrase goes to the model
+        self.assertIsNone(canned.match("hi, I feel awful today"))
+        self.assertIsNone(canned.match("who are you to tell me that"))
+
+    @patch('chatbot_agent.OpenAI')
+    def test_hits_skip_the_api_rotate_and_are_counted(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.return_value.choices[0].message.content = "Model reply"
+        registry.reset()
+
+        bot = MentalHealthChatbot()
+        first = bot.get_response("Hello!")
+        second = bot.get_response("hello")
+        self.assertNotEqual(first, second)
+        self.assertIn(first, get_canned_replies().replies["greeting"])
+        identity = "".join(bot.get_response_stream("Who are you?", conversation_history=[
+            {"role": "user", "content": "I'm tired"}, {"role": "assistant", "content": "That sounds draining."}]))
+        self.assertIn("not a therapist", identity)
+        mock_client.chat.completions.create.assert_not_called()
+
+        # A greeting mid-conversation goes to the model
+        history = [{"role": "user", "content": "I'm tired"}, {"role": "assistant", "content": "That sounds draining."}]
+        self.assertEqual(bot.get_response("hi", conversation_history=history), "Model reply")
+
+        text = registry.export_prometheus()
+        self.assertIn('llm_local_replies_total{feature="chat",reason="greeting"} 2', text)
+        self.assertIn('llm_local_replies_total{feature="chat",reason="identity"} 1', text)
+        print("\nCanned reply verification passed! Greetings and identity answered locally and counted.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import json
+import time
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from fallback_bank import get_fallback_bank
+from llm_client import RetryPolicy
+from chatbot_agent import MentalHealthChatbot
+import prompt_generator
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+        self.response = MagicMock(headers={})
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_trips_fails_fast_and_recovers(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=10, clock=clock)
+        failing = MagicMock(side_effect=StatusError(503))
+
+        for _ in range(3):
+            with self.assertRaises(StatusError):
+                breaker.call(failing)
+        self.assertEqual(breaker.state, "open")
+        with self.assertRaises(CircuitOpenError):
+            breaker.call(failing)
+        self.assertEqual(failing.call_count, 3)
+
+        # Half-open: one probe; a failure re-opens for another recovery period
+        clock.now = 10
+        self.assertEqual(breaker.state, "half_open")
+        with self.assertRaises(StatusError):
+            breaker.call(failing)
+        self.assertEqual(breaker.state, "open")
+
+        clock.now = 20
+        self.assertEqual(breaker.call(lambda: "ok"), "ok")
+        self.assertEqual(breaker.state, "closed")
+        self.assertEqual(breaker.stats()["times_opened"], 2)
+        print("\nCircuit breaker verification passed! closed -> open -> half_open -> closed.")
+
+    def test_request_errors_do_not_trip(self):
+        breaker = CircuitBreaker("test", failure_threshold=2)
+        bad_request = MagicMock(side_effect=StatusError(400))
+        for _ in range(5):
+            with self.assertRaises(StatusError):
+                breaker.call(bad_request)
+        self.assertEqual(breaker.state, "closed")
+
+class TestFallbacks(unittest.TestCase):
+    @patch('chatbot_agent.OpenAI')
+    def test_chat_serves_fallback_while_open(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = StatusError(503)
+
+        bot = MentalHealthChatbot(summarize_history=False)
+        bot.breaker = CircuitBreaker("chat", failure_threshold=2, recovery_timeout=60)
+        bot.retry_policy = RetryPolicy(max_retries=0)
+
+        for _ in range(2):
+            self.assertIn("Error generating response", bot.get_response("I had a rough day."))
+
+        start = time.perf_counter()
+        response = bot.get_response("I had a rough day.")
+        elapsed = time.perf_counter() - start
+
+        self.assertIn(response, get_fallback_bank().chat_replies)
+        self.assertEqual(mock_client.chat.completions.create.call_count, 2)
+        self.assertIn(list(bot.get_response_stream("Still here."))[0], get_fallback_bank().chat_replies)
+        print(f"Chat fallback verification passed! Answered in {elapsed * 1000:.2f}ms while open.")
+
+    @patch('prompt_generator.client')
+    def test_journal_prompts_serve_curated_set_while_open(self, mock_client):
+        breaker = CircuitBreaker("journal_prompts", failure_threshold=1, recovery_timeout=60)
+        mock_client.chat.completions.create.side_effect = StatusError(502)
+        with patch('prompt_generator.get_breaker', return_value=breaker), \
+             patch('prompt_generator.default_retry_policy', return_value=RetryPolicy(max_retries=0)):
+            self.assertEqual(prompt_generator.generate_prompt("Sad", use_cache=False).kind, "api_error")
+            result = prompt_generator.generate_prompt("sad", use_cache=False)
+
+        self.assertEqual(result.mood, "Sad")
+        self.assertTrue(result.fallback)
+        self.assertGreaterEqual(len(result.questions), 6)
+        self.assertTrue(json.loads(result.to_json())["fallback"])
+        self.assertEqual(mock_client.chat.completions.create.call_count, 1)
+        print("Journal prompt fallback verification passed! Curated set served without an API call.")
+
+if __name__ == '__main__':
+    unittest.main()
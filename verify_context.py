@@ -70,23 +70,27 @@ class TestContextHandling(unittest.TestCase):
         _, kwargs = call_args
         messages = kwargs['messages']
         
-        # Expected: System (1) + History (20) + User (1) = 22 messages
-        self.assertEqual(len(messages), 22)
+        # Expected: System (1) + Summary of older turns (1) + History (20) + User (1) = 23 messages
+        self.assertEqual(len(messages), 23)
         
         # First message should be system
         self.assertEqual(messages[0]['role'], 'system')
+
+        # The 5 trimmed messages are folded into a summary message
+        self.assertEqual(messages[1]['role'], 'system')
+        self.assertIn("Summary of the earlier conversation", messages[1]['content'])
         
         # First history message in payload should be the 6th message from original history (index 5)
         # because we took the last 20: history[5] to history[24]
-        self.assertEqual(messages[1]['content'], "msg 5")
+        self.assertEqual(messages[2]['content'], "msg 5")
         
         # Last history message should be the last one
-        self.assertEqual(messages[20]['content'], "msg 24")
+        self.assertEqual(messages[21]['content'], "msg 24")
         
         # Final message is user input
-        self.assertEqual(messages[21]['content'], user_input)
+        self.assertEqual(messages[22]['content'], user_input)
         
-        print("History limit verification passed! Only last 20 messages retained.")
+        print("History limit verification passed! Only last 20 messages retained verbatim.")
 
 if __name__ == '__main__':
     unittest.main()
@@ -29,14 +29,17 @@ class TestCrisisResponse(unittest.TestCase):
         _, kwargs = call_args
         messages = kwargs['messages']
         
-        system_message = messages[0]['content']
+        # The shared system prompt stays unchanged; location info follows it
+        self.assertEqual(messages[0]['content'], bot.system_prompt)
+        location_message = messages[1]
+        self.assertEqual(location_message['role'], 'system')
         
         # Check if location info is injected
-        self.assertIn("USER LOCATION INFO:", system_message)
-        self.assertIn(location, system_message)
-        self.assertIn("suggest searching for or contacting emergency services in London, UK", system_message)
+        self.assertIn("USER LOCATION INFO:", location_message['content'])
+        self.assertIn(location, location_message['content'])
+        self.assertIn("suggest searching for or contacting emergency services in London, UK", location_message['content'])
         
-        print("\nCrisis location verification passed! System prompt includes location info.")
+        print("\nCrisis location verification passed! Location info follows the system prompt.")
 
     @patch('chatbot_agent.OpenAI')
     def test_no_location_no_injection(self, mock_openai):
@@ -58,10 +61,11 @@ class TestCrisisResponse(unittest.TestCase):
         _, kwargs = call_args
         messages = kwargs['messages']
         
-        system_message = messages[0]['content']
+        system_messages = [m['content'] for m in messages if m['role'] == 'system']
         
         # Check that location info is NOT injected
-        self.assertNotIn("USER LOCATION INFO:", system_message)
+        self.assertEqual(system_messages, [bot.system_prompt])
+        self.assertFalse(any("USER LOCATION INFO:" in m for m in system_messages))
         
         print("No location verification passed! System prompt is standard.")
 
@@ -0,0 +1,120 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import json
+import time
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from crisis_detector import CrisisDetector, crisis_response
+from chatbot_agent import MentalHealthChatbot
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "crisis_corpus.jsonl")
+
+def load_corpus():
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+class TestCrisisDetector(unittest.TestCase):
+    def test_precision_and_recall_on_corpus(self):
+        detector = CrisisDetector()
+        true_pos = false_pos = false_neg = 0
+        for row in load_corpus():
+            predicted = detector.assess(row["text"]).is_crisis
+            actual = row["label"] == "crisis"
+            true_pos += predicted and actual
+            false_pos += predicted and not actual
+            false_neg += actual and not predicted
+
+        precision = true_pos / (true_pos + false_pos)
+        recall = true_pos / (true_pos + false_neg)
+        print(f"\nCrisis detector on labeled corpus: precision={precision:.3f} recall={recall:.3f}")
+
+        # A false alarm costs a gentle safety check-in; a miss still reaches the LLM's own protocol
+        self.assertGreaterEqual(precision, 0.95)
+        self.assertGreaterEqual(recall, 0.9)
+
+    def test_negation_handling(self):
+        detector = CrisisDetector()
+        self.assertEqual(detector.assess("I would never hurt myself").level, "negated")
+        self.assertFalse(detector.assess("I'm not suicidal, just tired").is_crisis)
+        self.assertTrue(detector.assess("I don't want to live anymore").is_crisis)
+        self.assertTrue(detector.assess("I'm not sure why, but I want to die").is_crisis)
+        self.assertEqual(detector.assess("This traffic is killing me").level, "none")
+        print("Crisis negation verification passed!")
+
+    def test_method_questions_are_elevated(self):
+        detector = CrisisDetector()
+        rows = load_corpus()
+        for row in rows:
+            level = detector.assess(row["text"]).level
+            if row["label"] == "elevated":
+                self.assertEqual(level, "elevated", row["text"])
+            elif row["label"] == "not_crisis":
+                self.assertNotEqual(level, "elevated", row["text"])
+        self.assertFalse(detector.assess("How many pills does it take to overdose?").is_crisis)
+        self.assertTrue(detector.assess("how much tylenol is a lethal dose").at_risk)
+        print(f"Elevated tier verification passed! {sum(r['label'] == 'elevated' for r in rows)} method questions flagged.")
+
+    def test_assess_is_sub_millisecond(self):
+        detector = CrisisDetector()
+        texts = [row["text"] for row in load_corpus()]
+        start = time.perf_counter()
+        for _ in range(20):
+            for text in texts:
+                detector.assess(text)
+        per_message = (time.perf_counter() - start) / (20 * len(texts))
+        print(f"Crisis detector: {per_message * 1e6:.1f} us per message")
+        self.assertLess(per_message, 0.001)
+
+    @patch('chatbot_agent.OpenAI')
+    def test_chatbot_short_circuits(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+
+        bot = MentalHealthChatbot()
+        response = bot.get_response("I want to hurt myself.", user_location="London, UK")
+
+        self.assertEqual(response, crisis_response("London, UK"))
+        self.assertIn("emergency services in London, UK", response)
+        self.assertIn("Are you safe right now?", response)
+        mock_client.chat.completions.create.assert_not_called()
+
+        # Streaming yields the same message without touching the API
+        self.assertEqual(list(bot.get_response_stream("I want to kill myself")), [crisis_response()])
+        mock_client.chat.completions.create.assert_not_called()
+
+        print("Crisis short-circuit verification passed! No API call made.")
+
+    @patch('chatbot_agent.OpenAI')
+    def test_elevated_messages_reach_the_model(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.return_value.choices[0].message.content = "I'm worried about you."
+
+        bot = MentalHealthChatbot(summarize_history=False)
+        # These read like trivia or errands, but no local shortcut may answer them
+        for text in ["how do i buy a gun", "What is the lethal dose of sertraline?", "whats the best way to tie a noose"]:
+            self.assertEqual(bot.get_response(text), "I'm worried about you.")
+        self.assertEqual(mock_client.chat.completions.create.call_count, 3)
+        print("Elevated risk verification passed! Method questions reach the model.")
+
+    @patch('chatbot_agent.OpenAI')
+    def test_followup_survives_api_errors(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = Exception("API down")
+
+        bot = MentalHealthChatbot(crisis_followup=True)
+        response = bot.get_response("I'm going to end it all tonight.")
+
+        # The safety message is still returned when the follow-up fails
+        self.assertEqual(response, crisis_response())
+        print("Crisis follow-up verification passed! Safety message survives API errors.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import asyncio
+import os
+import threading
+import time
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from hedging import HedgingPolicy
+from llm_client import Deadline, DeadlineExceeded, RetryPolicy
+from circuit_breaker import CircuitBreaker
+from fallback_bank import get_fallback_bank
+from chatbot_agent import MentalHealthChatbot
+
+class RequestTimeout(Exception):
+    status_code = 408
+
+class SlowOnce:
+    """Attempts numbered in `slow_calls` (counting from 1) take `slow` seconds; the rest are fast."""
+    def __init__(self, slow_calls, slow=0.5, fast=0.01):
+        self.slow_calls = slow_calls
+        self.slow = slow
+        self.fast = fast
+        self.attempts = 0
+        self.lock = threading.Lock()
+
+    def latency(self):
+        with self.lock:
+            self.attempts += 1
+            attempt = self.attempts
+        return self.slow if attempt in self.slow_calls else self.fast
+
+    def __call__(self, **kwargs):
+        delay = self.latency()
+        time.sleep(delay)
+        return f"answer after {delay}s"
+
+def trained_policy(samples=20, **kwargs):
+    policy = HedgingPolicy(min_samples=samples, min_delay=0.02, **kwargs)
+    for _ in range(samples):
+        policy.record_latency(0.01)
+    return policy
+
+class TestDeadlines(unittest.TestCase):
+    def test_timeout_is_capped_and_retries_stop_at_deadline(self):
+        timeouts = []
+        def create(**kwargs):
+            timeouts.append(kwargs["timeout"])
+            error = RequestTimeout("busy")
+            error.response = MagicMock(headers={"retry-after": "5"})
+            raise error
+
+        start = time.perf_counter()
+        with self.assertRaises(RequestTimeout):
+            RetryPolicy(max_retries=3).call(create, deadline=Deadline(0.3))
+        self.assertLess(time.perf_counter() - start, 0.1)
+        # The server asked for 5s but only 0.3s were left, so no retry was attempted
+        self.assertEqual(len(timeouts), 1)
+        self.assertLessEqual(timeouts[0], 0.3)
+        print("\nDeadline verification passed! Timeout capped, hopeless retry skipped.")
+
+    @patch('chatbot_agent.OpenAI')
+    def test_chat_deadline_serves_fallback_without_tripping_breaker(self, mock_openai):
+        # Setup mock: the request honors its timeout like the real client
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        def slow_create(**kwargs):
+            time.sleep(kwargs["timeout"])
+            raise RequestTimeout("Request timed out.")
+        mock_client.chat.completions.create.side_effect = slow_create
+
+        bot = MentalHealthChatbot(summarize_history=False)
+        bot.breaker = CircuitBreaker("chat", failure_threshold=1)
+
+        start = time.perf_counter()
+        response = bot.get_response("I had a long day.", deadline=0.2)
+        elapsed = time.perf_counter() - start
+
+        self.assertIn(response, get_fallback_bank().chat_replies)
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(bot.breaker.state, "closed")
+        print(f"Chat deadline verification passed! Fallback after {elapsed:.2f}s, breaker still closed.")
+
+class TestHedging(unittest.TestCase):
+    def test_sync_hedge_wins_and_budget_caps_extra_requests(self):
+        policy = trained_policy(budget=0.05)
+        # Attempts 1 and 3 are slow: the first attempt of each of the two calls below
+        fn = SlowOnce(slow_calls={1, 3})
+
+        start = time.perf_counter()
+        result = policy.call(fn)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(result, "answer after 0.01s")
+        self.assertLess(elapsed, 0.3)
+        self.assertEqual(policy.stats()["hedges_won"], 1)
+
+        # 2 requests against a 5% budget: the next slow call is not hedged
+        start = time.perf_counter()
+        self.assertEqual(policy.call(fn), "answer after 0.5s")
+        self.assertGreaterEqual(time.perf_counter() - start, 0.5)
+        stats = policy.stats()
+        self.assertEqual((stats["requests"], stats["hedges_fired"], stats["hedges_won"]), (2, 1, 1))
+        print(f"Hedging verification passed! Slow call answered in {elapsed:.2f}s; budget respected.")
+
+    def test_async_hedge_cancels_loser(self):
+        policy = trained_policy()
+        cancelled = []
+
+        async def create(delay):
+            try:
+                await asyncio.sleep(delay)
+                return delay
+            except asyncio.CancelledError:
+                cancelled.append(delay)
+                raise
+
+        delays = iter([0.5, 0.01])
+        async def attempt(**kwargs):
+            return await create(next(delays))
+
+        async def main():
+            result = await policy.call_async(attempt)
+            await asyncio.sleep(0)
+            return result
+
+        self.assertEqual(asyncio.run(main()), 0.01)
+        self.assertEqual(cancelled, [0.5])
+        self.assertEqual(policy.stats()["hedges_won"], 1)
+        print("Async hedging verification passed! The slower attempt was cancelled.")
+
+    def test_expired_deadline_raises(self):
+        deadline = Deadline(0.0)
+        with self.assertRaises(DeadlineExceeded):
+            trained_policy().call(lambda **kwargs: "never", deadline=deadline)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import asyncio
+import os
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+import history_budget
+from history_budget import HistoryTrimmer, TokenCounter
+from chatbot_agent import MentalHealthChatbot
+
+class RecordingSummarizer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, previous_summary, messages):
+        self.calls.append((previous_summary, [m["content"] for m in messages]))
+        return f"summary of {len(self.calls)} folds"
+
+def conversation(turns):
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"user message {i}"})
+        history.append({"role": "assistant", "content": f"assistant reply {i}"})
+    return history
+
+class TestHistoryBudget(unittest.TestCase):
+    def test_long_message_trimmed_by_budget(self):
+        trimmer = HistoryTrimmer(max_messages=20)
+        history = [
+            {"role": "user", "content": "word " * 2000},
+            {"role": "assistant", "content": "That sounds like a lot."},
+            {"role": "user", "content": "It is."},
+        ]
+
+        summary, recent = trimmer.trim(history, token_budget=100)
+
+        # The long vent does not fit and is dropped; the short turns are kept
+        self.assertIsNone(summary)
+        self.assertEqual(recent, history[1:])
+        print("\nToken budget verification passed! Long message trimmed.")
+
+    def test_token_counts_are_cached(self):
+        counter = TokenCounter()
+        message = {"role": "user", "content": "I feel stuck at work."}
+        with patch.object(history_budget, "count_text_tokens", wraps=history_budget.count_text_tokens) as counted:
+            for _ in range(5):
+                counter.count_message(message)
+            self.assertEqual(counted.call_count, 1)
+        print("Token count cache verification passed!")
+
+    def test_summary_is_updated_incrementally(self):
+        trimmer = HistoryTrimmer(max_messages=4)
+        summarizer = RecordingSummarizer()
+
+        history = conversation(4) # 8 messages, 4 fall out of the window
+        summary, recent = trimmer.trim(history, token_budget=10000, summarizer=summarizer)
+        self.assertEqual(summary, "summary of 1 folds")
+        self.assertEqual(len(recent), 4)
+        self.assertEqual(summarizer.calls[0][1], [m["content"] for m in history[:4]])
+
+        # Same history again: cached summary, no new summarizer call
+        trimmer.trim(history, token_budget=10000, summarizer=summarizer)
+        self.assertEqual(len(summarizer.calls), 1)
+
+        # One more turn: only the two newly dropped messages are summarized
+        history = conversation(5)
+        summary, recent = trimmer.trim(history, token_budget=10000, summarizer=summarizer)
+        self.assertEqual(summarizer.calls[1], ("summary of 1 folds", ["user message 2", "assistant reply 2"]))
+        self.assertEqual(summary, "summary of 2 folds")
+
+        print("Rolling summary verification passed! Only new turns are folded.")
+
+    def test_failed_summary_keeps_previous(self):
+        trimmer = HistoryTrimmer(max_messages=2)
+        summary, recent = trimmer.trim(conversation(2), token_budget=10000, summarizer=lambda prev, msgs: None)
+        self.assertIsNone(summary)
+        self.assertEqual(len(recent), 2)
+
+        async def async_summarizer(previous_summary, messages):
+            return "async summary"
+
+        summary, _ = asyncio.run(trimmer.trim_async(conversation(2), 10000, async_summarizer))
+        self.assertEqual(summary, "async summary")
+        print("Summary failure verification passed!")
+
+    @patch('chatbot_agent.OpenAI')
+    def test_chatbot_respects_input_budget(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_completion = MagicMock()
+        mock_completion.choices[0].message.content = "Test response"
+        mock_client.chat.completions.create.return_value = mock_completion
+
+        bot = MentalHealthChatbot(input_token_budget=1500, summarize_history=False)
+        history = [{"role": "user", "content": "long vent " * 150} for _ in range(10)]
+
+        bot.get_response("Thanks for listening", history)
+
+        _, kwargs = mock_client.chat.completions.create.call_args
+        messages = kwargs['messages']
+        total = sum(history_budget.count_text_tokens(m["content"]) + history_budget.MESSAGE_OVERHEAD_TOKENS for m in messages)
+        self.assertLessEqual(total, 1500)
+        self.assertGreater(len(messages), 2)
+
+        print("Chatbot input budget verification passed!")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,7 +18,7 @@ class TestBackendInterface(unittest.TestCase):
         mock_completion.choices[0].message.content = "Chat response"
         mock_client.chat.completions.create.return_value = mock_completion
 
-        response = process_chat_message("Hello", location="Test City")
+        response = process_chat_message("Hello, I had a rough day.", location="Test City")
         
         self.assertEqual(response, "Chat response")
         
@@ -26,8 +26,8 @@ class TestBackendInterface(unittest.TestCase):
         call_args = mock_client.chat.completions.create.call_args
         _, kwargs = call_args
         messages = kwargs['messages']
-        system_message = messages[0]['content']
-        self.assertIn("Test City", system_message)
+        location_message = messages[1]['content']
+        self.assertIn("Test City", location_message)
         print("\nBackend Chatbot interface verification passed!")
 
     @patch('prompt_generator.OpenAI')
@@ -36,12 +36,13 @@ class TestBackendInterface(unittest.TestCase):
         mock_client = MagicMock()
         mock_openai.return_value = mock_client
         mock_completion = MagicMock()
-        expected_json = '[{"mood": "good", "questions": ["Q1"]}]'
-        mock_completion.choices[0].message.content = expected_json
+        mock_completion.choices[0].message.content = '[{"mood": "good", "questions": ["Q1", "Q2", "Q3", "Q4", "Q5", "Q6"]}]'
         mock_client.chat.completions.create.return_value = mock_completion
 
         response = generate_journal_prompts("good")
-        
+
+        # The answer comes back validated, in the canonical shape
+        expected_json = json.dumps({"mood": "good", "questions": [{"question": f"Q{n}"} for n in range(1, 7)]})
         self.assertEqual(response, expected_json)
         print("Backend Prompt Generator interface verification passed!")
 
@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import time
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from openai import OpenAI
+from llm_client import RetryPolicy, client_options, parse_retry_after
+from chatbot_agent import MentalHealthChatbot
+from stub_openai_server import StubOpenAIServer
+
+class StatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = MagicMock(headers=headers or {})
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_honors_retry_after_and_gives_up(self):
+        sleeps = []
+        policy = RetryPolicy(max_retries=2, backoff_base=0.5, backoff_max=8, sleep=sleeps.append)
+        fn = MagicMock(side_effect=[StatusError(429, {"retry-after": "3"}), StatusError(503), "ok"])
+
+        self.assertEqual(policy.call(fn), "ok")
+        self.assertEqual(sleeps[0], 3.0)
+        self.assertTrue(0 <= sleeps[1] <= 1.0)  # jittered: uniform(0, 0.5 * 2**1)
+
+        fn = MagicMock(side_effect=StatusError(500))
+        with self.assertRaises(StatusError):
+            policy.call(fn)
+        self.assertEqual(fn.call_count, 3)
+        print("\nRetry policy verification passed! Retry-After honored, bounded attempts.")
+
+    def test_does_not_retry_client_errors(self):
+        policy = RetryPolicy(max_retries=3, sleep=lambda s: None)
+        fn = MagicMock(side_effect=StatusError(400))
+        with self.assertRaises(StatusError):
+            policy.call(fn)
+        self.assertEqual(fn.call_count, 1)
+        self.assertEqual(parse_retry_after(StatusError(429, {"retry-after-ms": "250"})), 0.25)
+
+    @patch('chatbot_agent.OpenAI')
+    def test_clients_share_one_pool(self, mock_openai):
+        MentalHealthChatbot()
+        MentalHealthChatbot()
+        first, second = (c.kwargs for c in mock_openai.call_args_list)
+        self.assertIs(first["http_client"], second["http_client"])
+        self.assertEqual(first["max_retries"], 0)
+        print("Shared client verification passed! One connection pool for every chatbot.")
+
+class TestAgainstStubServer(unittest.TestCase):
+    def test_retries_and_keep_alive(self):
+        with StubOpenAIServer(latency=0.01) as server:
+            client = OpenAI(**client_options(base_url=server.url))
+            policy = RetryPolicy(max_retries=3)
+            server.fail_next(429, {"Retry-After": "0.2"})
+            server.fail_next(503)
+
+            start = time.perf_counter()
+            response = policy.call(client.chat.completions.create, model="gpt-4o", messages=[{"role": "user", "content": "hi"}])
+            elapsed = time.perf_counter() - start
+
+            self.assertTrue(response.choices[0].message.content)
+            self.assertEqual(server.requests, 3)
+            self.assertGreaterEqual(elapsed, 0.2)
+
+            for _ in range(5):
+                policy.call(client.chat.completions.create, model="gpt-4o", messages=[{"role": "user", "content": "hi"}])
+            # Error responses and successes alike reuse the kept-alive connection
+            self.assertEqual(server.connections, 1)
+            print(f"Stub server verification passed! 8 requests over {server.connections} connection.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import json
+import threading
+import urllib.request
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from metrics import MetricsRegistry, registry, serve_metrics
+from chatbot_agent import MentalHealthChatbot
+import prompt_generator
+
+class BadRequest(Exception):
+    status_code = 400  # Not retried, so the test stays fast
+
+def make_response(text, prompt_tokens=120, completion_tokens=30, cached_tokens=64):
+    response = MagicMock()
+    response.choices[0].message.content = text
+    response.usage.prompt_tokens = prompt_tokens
+    response.usage.completion_tokens = completion_tokens
+    response.usage.prompt_tokens_details.cached_tokens = cached_tokens
+    return response
+
+def make_chunk(text):
+    chunk = MagicMock()
+    chunk.choices[0].delta.content = text
+    return chunk
+
+def sample(text, line_start):
+    """The value of the first exposition line starting with `line_start`."""
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_threads_merge_into_one_export(self):
+        metrics = MetricsRegistry(buckets=(0.1, 1.0))
+
+        def record():
+            for _ in range(1000):
+                metrics.record_call("chat", "gpt-4o", 0.05, usage={"prompt_tokens": 2, "completion_tokens": 1})
+
+        threads = [threading.Thread(target=record) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        metrics.record_call("chat", "gpt-4o", 0.5, first_token=0.2, error=BadRequest("bad request"))
+
+        text = metrics.export_prometheus()
+        labels = 'feature="chat",model="gpt-4o"'
+        self.assertEqual(sample(text, f'llm_requests_total{{{labels},status="ok"}}'), 8000)
+        self.assertEqual(sample(text, f'llm_errors_total{{{labels},error="BadRequest"}}'), 1)
+        self.assertEqual(sample(text, f'llm_tokens_total{{{labels},type="prompt"}}'), 16000)
+        # Buckets are cumulative
+        self.assertEqual(sample(text, f'llm_request_duration_seconds_bucket{{{labels},le="0.1"}}'), 8000)
+        self.assertEqual(sample(text, f'llm_request_duration_seconds_bucket{{{labels},le="1"}}'), 8001)
+        self.assertEqual(sample(text, f'llm_request_duration_seconds_bucket{{{labels},le="+Inf"}}'), 8001)
+        self.assertEqual(sample(text, f'llm_request_duration_seconds_count{{{labels}}}'), 8001)
+        self.assertEqual(sample(text, f'llm_time_to_first_token_seconds_count{{{labels}}}'), 1)
+        self.assertIn("# TYPE llm_request_duration_seconds histogram", text)
+        print("\nMetrics registry verification passed! 8 threads merged into one export.")
+
+    def test_finished_threads_do_not_grow_the_registry(self):
+        metrics = MetricsRegistry(buckets=(0.1, 1.0))
+
+        # One short-lived thread per request, as with ThreadingHTTPServer or Streamlit reruns
+        for _ in range(500):
+            thread = threading.Thread(target=metrics.record_call, args=("chat", "gpt-4o", 0.05))
+            thread.start()
+            thread.join()
+            self.assertLessEqual(metrics.shard_count(), 3)
+
+        text = metrics.export_prometheus()
+        self.assertEqual(sample(text, 'llm_requests_total{feature="chat",model="gpt-4o",status="ok"}'), 500)
+        self.assertEqual(metrics.shard_count(), 1)
+        print(f"Metrics shard verification passed! 500 threads kept to {metrics.shard_count()} shard.")
+
+    def test_http_endpoint(self):
+        metrics = MetricsRegistry()
+        metrics.record_call("journal_prompts", "gpt-4o", 0.3)
+        server = serve_metrics(port=0, metrics_registry=metrics)
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+                body = response.read().decode()
+                content_type = response.headers["Content-Type"]
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertTrue(content_type.startswith("text/plain; version=0.0.4"))
+        self.assertIn('llm_requests_total{feature="journal_prompts",model="gpt-4o",status="ok"} 1', body)
+        print("Metrics endpoint verification passed!")
+
+class TestCallPaths(unittest.TestCase):
+    def setUp(self):
+        registry.reset()
+
+    @patch('chatbot_agent.OpenAI')
+    def test_chat_records_latency_tokens_and_errors(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.return_value = make_response("I hear you.")
+
+        bot = MentalHealthChatbot(summarize_history=False)
+        bot.get_response("I had a rough day at work.")
+        mock_client.chat.completions.create.side_effect = BadRequest("Error code: 400")
+        bot.get_response("I had a rough day at work.")
+
+        text = registry.export_prometheus()
+        labels = f'feature="chat",model="{bot.model}"'
+        self.assertEqual(sample(text, f'llm_requests_total{{{labels},status="ok"}}'), 1)
+        self.assertEqual(sample(text, f'llm_errors_total{{{labels},error="BadRequest"}}'), 1)
+        self.assertEqual(sample(text, f'llm_tokens_total{{{labels},type="cached"}}'), 64)
+        self.assertEqual(sample(text, f'llm_request_duration_seconds_count{{{labels}}}'), 2)
+        print("Chat metrics verification passed! Latency, tokens and error class recorded.")
+
+    @patch('chatbot_agent.OpenAI')
+    def test_stream_records_time_to_first_token(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        usage_chunk = make_response("")
+        usage_chunk.choices = []
+        mock_client.chat.completions.create.return_value = iter(
+            [make_chunk("That"), make_chunk(" sounds heavy."), usage_chunk]
+        )
+
+        bot = MentalHealthChatbot(summarize_history=False)
+        list(bot.get_response_stream("I feel tired"))
+
+        text = registry.export_prometheus()
+        labels = f'feature="chat",model="{bot.model}"'
+        self.assertEqual(sample(text, f'llm_time_to_first_token_seconds_count{{{labels}}}'), 1)
+        self.assertEqual(sample(text, f'llm_tokens_total{{{labels},type="completion"}}'), 30)
+        self.assertEqual(sample(text, f'llm_request_duration_seconds_count{{{labels}}}'), 1)
+        print("Stream metrics verification passed! Time to first token recorded.")
+
+    @patch('prompt_generator.OpenAI')
+    def test_prompt_path_is_recorded(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.return_value = make_response(json.dumps({"mood": "Calm", "questions": [f"Q{n}" for n in range(6)]}))
+        prompt_generator.client = None
+
+        prompt_generator.generate_prompt("Calm", use_cache=False)
+
+        text = registry.export_prometheus()
+        labels = f'feature="journal_prompts",model="{prompt_generator.MODEL}"'
+        self.assertEqual(sample(text, f'llm_requests_total{{{labels},status="ok"}}'), 1)
+        self.assertEqual(sample(text, f'llm_tokens_total{{{labels},type="prompt"}}'), 120)
+        prompt_generator.client = None
+        print("Journal prompt metrics verification passed!")
+
+if __name__ == '__main__':
+    unittest.main()
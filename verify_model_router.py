@@ -0,0 +1,120 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import json
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from chatbot_agent import MentalHealthChatbot
+from crisis_detector import get_default_detector
+from metrics import registry
+from model_router import DecisionLog, ModelRouter, get_decision_log, get_profile
+from benchmark_router import REPLAY_PATH, load_turns, measure
+import backend_interface
+
+def reply(mock_client, text="That sounds hard."):
+    response = MagicMock()
+    response.choices[0].message.content = text
+    response.usage = None
+    mock_client.chat.completions.create.return_value = response
+
+class TestModelRouter(unittest.TestCase):
+    def test_replay_turns_are_routed_as_labeled(self):
+        router = ModelRouter("gpt-4o-mini", "gpt-4o-search-preview", log=DecisionLog())
+        turns = load_turns()
+        wrong = []
+        for turn in turns:
+            crisis = get_default_detector().assess(turn["text"]).is_crisis
+            decision = router.route(turn["text"], turn.get("location"), crisis)
+            if decision.reason != turn["reason"]:
+                wrong.append((turn["text"], decision.reason))
+        self.assertEqual(wrong, [])
+
+        stats = router.log.stats()
+        search_share = stats["by_model"]["gpt-4o-search-preview"] / stats["decisions"]
+        self.assertLess(search_share, 0.5)
+        print(f"\nModel router verification passed! {len(turns)} replayed turns routed as labeled, "
+              f"{search_share:.0%} to the search model.")
+
+    def test_profiles_drop_rejected_parameters(self):
+        search = get_profile("gpt-4o-search-preview").request_kwargs(messages=[], max_tokens=300, temperature=0.2)
+        self.assertNotIn("temperature", search)
+        self.assertEqual((search["model"], search["max_tokens"]), ("gpt-4o-search-preview", 300))
+        self.assertIn("web_search_options", search)
+        self.assertEqual(get_profile("gpt-4o-mini").request_kwargs()["temperature"], 0.7)
+        self.assertEqual(get_profile("some-new-model").request_kwargs(), {"model": "some-new-model"})
+
+        usage = {"prompt_tokens": 1_000_000, "completion_tokens": 0}
+        self.assertAlmostEqual(get_profile("gpt-4o-mini").cost(usage), 0.15)
+        self.assertAlmostEqual(get_profile("gpt-4o-search-preview").cost({}), 0.03)
+
+class TestChatbotRouting(unittest.TestCase):
+    def setUp(self):
+        get_decision_log().clear()
+        registry.reset()
+
+    @patch('chatbot_agent.OpenAI')
+    def test_each_turn_goes_to_its_model(self, mock_openai):
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        reply(mock_client)
+        bot = MentalHealthChatbot(summarize_history=False, crisis_followup=True)
+        create = mock_client.chat.completions.create
+
+        bot.get_response("I had a rough day at work and I can't switch off.")
+        self.assertEqual(create.call_args.kwargs["model"], "gpt-4o-mini")
+        self.assertEqual(create.call_args.kwargs["temperature"], 0.7)
+
+        bot.get_response("What are the side effects of sertraline?")
+        self.assertEqual(create.call_args.kwargs["model"], "gpt-4o-search-preview")
+        self.assertNotIn("temperature", create.call_args.kwargs)
+
+        # The helpline request is not taken for trivia by the off-topic gate
+        bot.get_response("What's the number for a suicide helpline?")
+        self.assertEqual(create.call_args.kwargs["model"], "gpt-4o-search-preview")
+
+        response = bot.get_response("I want to kill myself.", user_location="Leeds, UK")
+        self.assertIn("Leeds, UK", response)
+        self.assertEqual(create.call_args.kwargs["model"], "gpt-4o-search-preview")
+        self.assertEqual(create.call_count, 4)
+
+        stats = backend_interface.get_model_routing_stats()
+        self.assertEqual(stats["by_reason"], {"listening": 1, "health_question": 1, "resource_lookup": 1,
+                                              "crisis_with_location": 1})
+        self.assertNotIn("sertraline", json.dumps(stats["recent"]))
+        self.assertIn('llm_route_decisions_total{feature="chat",model="gpt-4o-mini",reason="listening"} 1',
+                      registry.export_prometheus())
+        print("Chatbot routing verification passed! Listening on the fast model, lookups on the search model.")
+
+    @patch('chatbot_agent.OpenAI')
+    def test_routing_can_be_turned_off(self, mock_openai):
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.return_value = iter([])
+        bot = MentalHealthChatbot(summarize_history=False, route_models=False)
+
+        list(bot.get_response_stream("I feel lonely since I moved."))
+        kwargs = mock_client.chat.completions.create.call_args.kwargs
+        self.assertEqual((kwargs["model"], kwargs["stream"]), ("gpt-4o-search-preview", True))
+        # The request sent before routing existed, with no profile parameters
+        self.assertEqual(set(kwargs), {"model", "messages", "max_tokens", "stream", "stream_options"})
+        self.assertEqual(kwargs["stream_options"], {"include_usage": True})
+
+        mock_client.chat.completions.create.return_value = MagicMock()
+        bot.get_response("Where can I find a therapist near me?", user_location="Leeds")
+        kwargs = mock_client.chat.completions.create.call_args.kwargs
+        self.assertEqual(set(kwargs), {"model", "messages", "max_tokens"})
+        self.assertEqual((kwargs["model"], kwargs["max_tokens"]), ("gpt-4o-search-preview", 300))
+        self.assertEqual(get_decision_log().stats()["decisions"], 0)
+
+class TestRouterBenchmark(unittest.TestCase):
+    def test_routing_saves_latency_and_cost(self):
+        result = measure(load_turns(REPLAY_PATH)[:24], search_latency=0.02, listening_latency=0.005)
+        self.assertEqual((result["unrouted"]["errors"], result["routed"]["errors"]), (0, 0))
+        self.assertGreater(result["latency_saved"], 0)
+        self.assertGreater(result["cost_saved"], 0.3)
+        print(f"Router replay benchmark: {result['latency_saved']:.0%} latency and {result['cost_saved']:.0%} cost saved.")
+
+if __name__ == '__main__':
+    unittest.main()
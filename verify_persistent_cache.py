@@ -0,0 +1,105 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import multiprocessing
+import os
+import json
+import tempfile
+import time
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from persistent_cache import PersistentCache
+import prompt_generator
+
+def write_entries(path, worker, count):
+    cache = PersistentCache(path)
+    for i in range(count):
+        cache.set(f"worker-{worker}-{i}", f"value {i}")
+
+class TestPersistentCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_ttl_and_warm_start(self):
+        cache = PersistentCache(self.path, ttl=0.2)
+        key = PersistentCache.make_key("gpt-4o", "system prompt", "The user is feeling: Happy")
+        cache.set(key, '{"mood": "Happy"}')
+
+        # A second instance (e.g. a restarted worker) sees the same entry
+        restarted = PersistentCache(self.path, ttl=0.2)
+        self.assertEqual(restarted.get(key), '{"mood": "Happy"}')
+
+        time.sleep(0.25)
+        self.assertIsNone(restarted.get(key))
+
+        # Changing the system prompt changes the key
+        self.assertNotEqual(key, PersistentCache.make_key("gpt-4o", "new prompt", "The user is feeling: Happy"))
+
+        print("\nPersistent cache TTL verification passed!")
+
+    def test_lru_eviction(self):
+        cache = PersistentCache(self.path, max_entries=3)
+        cache.touch_interval = 0
+        for key in ["a", "b", "c"]:
+            cache.set(key, key)
+            time.sleep(0.01)
+
+        # Reading "a" makes "b" the least recently used entry
+        self.assertEqual(cache.get("a"), "a")
+        cache.set("d", "d")
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "a")
+        self.assertEqual(cache.stats()["entries"], 3)
+
+        # Size bound evicts as many old entries as needed
+        sized = PersistentCache(os.path.join(self.tmpdir.name, "sized.sqlite3"), max_bytes=10)
+        sized.set("x", "12345")
+        sized.set("y", "12345")
+        sized.set("z", "123")
+        self.assertIsNone(sized.get("x"))
+        self.assertLessEqual(sized.stats()["bytes"], 10)
+
+        print("Persistent cache LRU verification passed!")
+
+    def test_concurrent_processes(self):
+        PersistentCache(self.path)
+        workers = [multiprocessing.Process(target=write_entries, args=(self.path, w, 50)) for w in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+            self.assertEqual(worker.exitcode, 0)
+
+        self.assertEqual(PersistentCache(self.path).stats()["entries"], 200)
+        print("Persistent cache multi-process verification passed!")
+
+    @patch('prompt_generator.client')
+    def test_generate_prompt_uses_cache(self, mock_client):
+        # Setup mock
+        mock_completion = MagicMock()
+        expected_json = json.dumps({"mood": "Calm", "questions": [{"question": f"What felt easy today? ({n})"} for n in range(6)]})
+        mock_completion.choices[0].message.content = expected_json
+        mock_client.chat.completions.create.return_value = mock_completion
+
+        prompt_generator.set_cache(PersistentCache(self.path))
+        try:
+            self.assertEqual(prompt_generator.generate_prompt("Calm").to_json(), expected_json)
+            self.assertEqual(prompt_generator.generate_prompt("Calm").to_json(), expected_json)
+            self.assertEqual(mock_client.chat.completions.create.call_count, 1)
+
+            # Bypassing the cache always calls the API
+            prompt_generator.generate_prompt("Calm", use_cache=False)
+            self.assertEqual(mock_client.chat.completions.create.call_count, 2)
+        finally:
+            prompt_generator.set_cache(None)
+
+        print("Prompt generator cache verification passed! Second call served from disk.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
+import os
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from chatbot_agent import MentalHealthChatbot
+import backend_interface
+
+def make_completion(prompt_tokens, cached_tokens):
+    completion = MagicMock()
+    completion.choices[0].message.content = "Test response"
+    completion.usage.prompt_tokens = prompt_tokens
+    completion.usage.completion_tokens = 20
+    completion.usage.prompt_tokens_details.cached_tokens = cached_tokens
+    return completion
+
+class TestPrefixCacheLayout(unittest.TestCase):
+    @patch('chatbot_agent.OpenAI')
+    def test_prefix_identical_across_users(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.return_value = make_completion(1200, 0)
+
+        bot = MentalHealthChatbot()
+        bot.get_response("I feel hopeless", user_location="London, UK")
+        bot.get_response("Hi there, work is draining me", user_location="Dhaka, Bangladesh")
+        bot.get_response("Hello, I had a rough day.")
+
+        first_messages = [call.kwargs['messages'][0] for call in mock_client.chat.completions.create.call_args_list]
+        self.assertEqual(len(first_messages), 3)
+        for message in first_messages:
+            self.assertEqual(message, {"role": "system", "content": bot.system_prompt})
+
+        print("\nPrefix verification passed! System prompt is byte-identical across users.")
+
+    @patch('chatbot_agent.OpenAI')
+    def test_cached_tokens_reported(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = [make_completion(1200, 0), make_completion(1250, 1024)]
+
+        bot = MentalHealthChatbot()
+        first_usage = {}
+        second_usage = {}
+        bot.get_response("Hello, I had a rough day.", usage=first_usage)
+        bot.get_response("Hello again, still feeling low", usage=second_usage)
+
+        self.assertEqual(first_usage, {"prompt_tokens": 1200, "completion_tokens": 20, "cached_tokens": 0})
+        self.assertEqual(second_usage["cached_tokens"], 1024)
+
+        totals = bot.usage.totals()
+        self.assertEqual(totals["calls"], 2)
+        self.assertEqual(totals["cached_tokens"], 1024)
+        self.assertAlmostEqual(totals["cache_hit_rate"], 1024 / 2450)
+
+        print("Cached token verification passed! Hit rate reported.")
+
+    @patch('chatbot_agent.AsyncOpenAI')
+    @patch('chatbot_agent.OpenAI')
+    def test_usage_stats_cover_sync_and_async_chat(self, mock_openai, mock_async_openai):
+        # Setup mocks
+        mock_openai.return_value.chat.completions.create.return_value = make_completion(1200, 0)
+        mock_async_openai.return_value.chat.completions.create = AsyncMock(return_value=make_completion(1250, 1024))
+        saved = (backend_interface._chatbot_instance, backend_interface._async_chatbot_instance,
+                 backend_interface._chat_usage)
+        backend_interface._chatbot_instance = backend_interface._async_chatbot_instance = None
+        backend_interface._chat_usage = None
+        try:
+            backend_interface.process_chat_message("Hello, I had a rough day.")
+            asyncio.run(backend_interface.process_chat_message_async("Hello again, still feeling low"))
+            totals = backend_interface.get_usage_stats()["chat"]
+        finally:
+            (backend_interface._chatbot_instance, backend_interface._async_chatbot_instance,
+             backend_interface._chat_usage) = saved
+
+        # The async path (used by the API server) is counted too
+        self.assertEqual((totals["calls"], totals["prompt_tokens"], totals["cached_tokens"]), (2, 2450, 1024))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import json
+import threading
+import time
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from prompt_generator import generate_prompts_batch
+
+def completion(content):
+    mock_completion = MagicMock()
+    mock_completion.choices[0].message.content = content
+    return mock_completion
+
+def prompt_set(mood):
+    return {"mood": mood, "questions": [{"question": f"What does {mood.lower()} feel like today? ({n})"} for n in range(6)]}
+
+class FakeCreate:
+    """Answers single and packed requests; 'Awful' fails, packed answers drop 'Tired'."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.in_flight = 0
+        self.peak = 0
+
+    def __call__(self, **kwargs):
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(0.02)
+            user_message = kwargs["messages"][1]["content"]
+            if "in this order" in user_message:
+                moods = [line.split(". ", 1)[1] for line in user_message.splitlines()[1:]]
+                return completion(json.dumps({"results": [prompt_set(m) for m in moods if m != "Tired"]}))
+            mood = user_message.split(": ", 1)[1]
+            if mood == "Awful":
+                raise Exception("rate limited")
+            return completion(json.dumps(prompt_set(mood)))
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+class TestPromptBatch(unittest.TestCase):
+    @patch('prompt_generator.client')
+    def test_concurrent_batch_in_order_with_isolation(self, mock_client):
+        fake = FakeCreate()
+        mock_client.chat.completions.create.side_effect = fake
+        moods = ["Happy", "Sad", "Awful", "Calm", "Tired", "Happy"]
+
+        results = generate_prompts_batch(moods, max_workers=3)
+
+        self.assertEqual([r["mood"] for r in results], moods)
+        self.assertEqual(results[1]["result"].mood, "Sad")
+        self.assertIsNone(results[2]["result"])
+        self.assertIn("rate limited", results[2]["error"])
+        self.assertTrue(all(r["error"] is None for i, r in enumerate(results) if i != 2))
+        self.assertTrue(all(r["elapsed"] > 0 for r in results))
+        self.assertLessEqual(fake.peak, 3)
+        self.assertGreater(fake.peak, 1)
+
+        print("\nBatch verification passed! Results in input order, failure isolated.")
+
+    @patch('prompt_generator.client')
+    def test_packed_batch_splits_and_retries_missing(self, mock_client):
+        fake = FakeCreate()
+        mock_client.chat.completions.create.side_effect = fake
+        moods = ["Happy", "Sad", "Tired", "Calm", "Anxious", "Excited", "Neutral"]
+
+        results = generate_prompts_batch(moods, pack=True, pack_size=5)
+
+        self.assertEqual([r["mood"] for r in results], moods)
+        self.assertTrue(all(r["error"] is None for r in results))
+        self.assertEqual(results[3]["result"].mood, "Calm")
+
+        # 2 packed requests + 1 individual retry for the mood the packed answer dropped
+        self.assertEqual(fake.calls, 3)
+        self.assertFalse(results[2]["packed"])
+        self.assertTrue(results[0]["packed"])
+
+        print("Packed batch verification passed! 7 moods in 3 requests.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -19,7 +19,11 @@ class TestPromptGenerator(unittest.TestCase):
             "mood": "happy",
             "questions": [
                 { "question": "What made you smile today?" },
-                { "question": "List three things you are grateful for." }
+                { "question": "List three things you are grateful for." },
+                { "question": "Who did you enjoy spending time with?" },
+                { "question": "What are you looking forward to tomorrow?" },
+                { "question": "Which moment today would you like to remember?" },
+                { "question": "How did you take care of yourself today?" }
             ]
         }
         mock_completion.choices[0].message.content = json.dumps(expected_json)
@@ -30,8 +34,9 @@ class TestPromptGenerator(unittest.TestCase):
         result = generate_prompt(mood)
         
         # Verify the result is valid JSON
+        self.assertTrue(result.ok)
         try:
-            parsed_result = json.loads(result)
+            parsed_result = json.loads(result.to_json())
         except json.JSONDecodeError:
             self.fail("Result is not valid JSON")
             
@@ -0,0 +1,72 @@
+import unittest
+import os
+import time
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from prompt_pool import PromptPool
+from prompt_schema import PromptError, PromptSet
+
+class FakeGenerator:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, mood):
+        self.calls += 1
+        return PromptSet(mood, [f"Question set {self.calls}, question {n}" for n in range(6)])
+
+class TestPromptPool(unittest.TestCase):
+    def test_miss_then_hits_after_refill(self):
+        generator = FakeGenerator()
+        pool = PromptPool(size=3, low_watermark=1, moods=["Happy"], generator=generator)
+
+        # Empty pool: served by the generator and a refill is started
+        first = pool.get("Happy")
+        self.assertEqual(first.mood, "Happy")
+        pool.wait_for_refills(timeout=5)
+
+        stats = pool.stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["refills"], 3)
+        self.assertEqual(stats["ready"]["Happy"], 3)
+
+        # Mood lookup is case-insensitive and each set is served once
+        served = {pool.get(" happy ").questions for _ in range(2)}
+        self.assertEqual(len(served), 2)
+        self.assertEqual(pool.stats()["hits"], 2)
+
+        print("\nPrompt pool verification passed! Hits served from refilled pool.")
+
+    def test_expired_sets_are_discarded(self):
+        generator = FakeGenerator()
+        pool = PromptPool(size=2, ttl=0.05, low_watermark=0, moods=["Sad"], generator=generator)
+        pool.prewarm()
+        pool.wait_for_refills(timeout=5)
+        self.assertEqual(pool.stats()["ready"]["Sad"], 2)
+
+        time.sleep(0.1)
+        self.assertIsNone(pool.take("Sad"))
+
+        stats = pool.stats()
+        self.assertEqual(stats["expired"], 2)
+        self.assertEqual(stats["misses"], 1)
+
+        print("Prompt pool TTL verification passed!")
+
+    def test_errors_are_not_pooled(self):
+        pool = PromptPool(size=2, moods=["Calm"], generator=lambda mood: PromptError(mood, "api_error", "Failed to generate prompt: boom"))
+        pool.prewarm()
+        pool.wait_for_refills(timeout=5)
+
+        stats = pool.stats()
+        self.assertEqual(stats["ready"]["Calm"], 0)
+        self.assertEqual(stats["refill_errors"], 1)
+
+        # Unknown moods bypass the pool entirely
+        self.assertIsNone(pool.take("Elated"))
+
+        print("Prompt pool error verification passed!")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import json
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from prompt_schema import PromptSet, PromptError, PromptValidationError
+import prompt_generator
+
+def completion(data):
+    response = MagicMock()
+    response.choices[0].message.content = data if isinstance(data, str) else json.dumps(data)
+    return response
+
+SIX = [f"What is one small thing you noticed today? ({n})" for n in range(6)]
+
+class TestPromptSchema(unittest.TestCase):
+    def test_validation_in_one_pass(self):
+        # Strings and {"question": ...} objects both count; blanks, non-text and repeats don't
+        data = {"mood": "Calm", "questions": SIX[:3] + [{"question": q} for q in SIX[3:]] + ["  ", 7, SIX[0].upper()]}
+        result = PromptSet.from_data(data, "calm")
+        self.assertEqual((result.mood, result.questions), ("Calm", tuple(SIX)))
+        self.assertFalse(result.fallback)
+
+        # An older single-item list answer is accepted, and the mood falls back to the request
+        self.assertEqual(PromptSet.from_data([{"questions": SIX}], "Sad").mood, "Sad")
+        # Extra questions are dropped
+        self.assertEqual(len(PromptSet.from_data({"questions": SIX + [f"Extra {n}" for n in range(5)]}, "Sad").questions), 8)
+
+        for bad in ("not json", "[]", '{"mood": "Calm"}', json.dumps({"questions": SIX[:5]})):
+            with self.assertRaises(PromptValidationError):
+                PromptSet.from_json(bad, "Calm")
+
+        round_trip = PromptSet.from_json(result.to_json(), "Calm")
+        self.assertEqual(round_trip, result)
+        self.assertEqual(PromptSet("Sad", SIX, fallback=True).to_dict()["fallback"], True)
+        print("\nPrompt schema verification passed!")
+
+    def test_errors_are_valid_json(self):
+        error = PromptError("Calm", "api_error", 'Failed to generate prompt: unexpected "token"')
+        self.assertFalse(error.ok)
+        self.assertEqual(json.loads(error.to_json()), {"error": 'Failed to generate prompt: unexpected "token"'})
+
+    @patch('prompt_generator.client')
+    def test_invalid_answer_is_requested_again(self, mock_client):
+        mock_client.chat.completions.create.side_effect = [
+            completion({"mood": "Calm", "questions": SIX[:4]}),
+            completion({"mood": "Calm", "questions": SIX}),
+        ]
+        result = prompt_generator.generate_prompt("Calm", use_cache=False)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.questions, tuple(SIX))
+        self.assertEqual(mock_client.chat.completions.create.call_count, 2)
+        print("Prompt re-request verification passed! Short answer replaced by a valid one.")
+
+    @patch('prompt_generator.client')
+    def test_structured_errors(self, mock_client):
+        # Still invalid after the re-request
+        mock_client.chat.completions.create.side_effect = None
+        mock_client.chat.completions.create.return_value = completion({"mood": "Calm", "questions": SIX[:2]})
+        result = prompt_generator.generate_prompt("Calm", use_cache=False)
+        self.assertEqual(result.kind, "invalid_response")
+        self.assertIn("2 usable questions", result.message)
+        self.assertEqual(mock_client.chat.completions.create.call_count, prompt_generator.VALIDATION_ATTEMPTS)
+
+        # A failed request is not re-requested here (the retry policy already handled it)
+        mock_client.chat.completions.create.reset_mock()
+        mock_client.chat.completions.create.side_effect = ValueError('bad "quote"')
+        result = prompt_generator.generate_prompt("Calm", use_cache=False)
+        self.assertEqual(result.kind, "api_error")
+        self.assertEqual(json.loads(result.to_json())["error"], 'Failed to generate prompt: bad "quote"')
+        print("Prompt error verification passed! Errors are typed and serialize to valid JSON.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from unittest.mock import patch
+import os
+import json
+import time
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from question_bank import QuestionBank, RecentQuestions, get_question_bank
+from question_dedup import get_question_dedup
+from prompt_generator import valid_moods
+import backend_interface
+
+class TestQuestionBank(unittest.TestCase):
+    def setUp(self):
+        get_question_bank().recent.clear()
+
+    def test_every_mood_and_alias_draws_a_valid_set(self):
+        bank = get_question_bank()
+        for mood in valid_moods + ["excellent", "very good", "good", "okay", "low", "slightly off"]:
+            result = bank.draw(mood, day="2026-01-01")
+            self.assertTrue(6 <= len(result.questions) <= 8, mood)
+            self.assertEqual(len(set(result.questions)), len(result.questions))
+            self.assertIn(result.mood, valid_moods)
+        self.assertEqual(bank.draw("good").mood, "Happy")
+        self.assertEqual(bank.draw("Elated").mood, "Elated")  # Unknown moods get the neutral tones
+
+        data = json.loads(bank.draw("Sad").to_json())
+        self.assertEqual(sorted(data), ["mood", "questions"])
+        self.assertIsInstance(data["questions"][0]["question"], str)
+        print("\nQuestion bank verification passed! Every mood and alias has a valid set.")
+
+    def test_draws_are_seeded_by_user_and_day(self):
+        bank = get_question_bank()
+        first = bank.draw("Anxious", day="2026-01-01")
+        self.assertEqual(bank.draw("anxious", day="2026-01-01"), first)
+        self.assertNotEqual(bank.draw("Anxious", day="2026-01-02"), first)
+
+        # Two fresh users get their own sets for the same mood and day
+        fresh = QuestionBank.from_file()
+        sets = {fresh.draw("Anxious", user_id=f"user-{n}", day="2026-01-01").questions for n in range(5)}
+        self.assertGreater(len(sets), 1)
+        print("Question bank seeding verification passed!")
+
+    def test_recent_questions_are_skipped(self):
+        bank = QuestionBank.from_file()
+        seen = set()
+        for _ in range(3):
+            questions = bank.draw("Tired", user_id="user-1", day="2026-01-01").questions
+            self.assertFalse(seen & set(questions))
+            seen.update(questions)
+
+        # Once the mood's questions run out, the oldest seen ones come back first
+        for _ in range(3):
+            self.assertTrue(6 <= len(bank.draw("Tired", user_id="user-1", day="2026-01-01").questions) <= 8)
+
+        recent = RecentQuestions(max_users=2, per_user=3)
+        recent.add("a", ["q1", "q2"])
+        recent.add("a", ["q3", "q1"])
+        self.assertEqual(recent.get("a"), ["q2", "q3", "q1"])
+        recent.add("b", ["q1"])
+        recent.add("c", ["q1"])
+        self.assertEqual(recent.get("a"), [])
+        print("Question bank dedup verification passed! Recently seen questions skipped.")
+
+    def test_draw_takes_microseconds(self):
+        bank = get_question_bank()
+        runs = 2000
+        start = time.perf_counter()
+        for n in range(runs):
+            bank.draw(valid_moods[n % len(valid_moods)], user_id=f"user-{n % 50}")
+        per_draw = (time.perf_counter() - start) / runs
+        self.assertLess(per_draw, 0.001)
+        print(f"Question bank speed: {per_draw * 1e6:.1f}us per draw.")
+
+class TestPromptSources(unittest.TestCase):
+    def setUp(self):
+        get_question_bank().recent.clear()
+        get_question_dedup().clear()
+
+    @patch('prompt_generator.client')
+    def test_local_source_skips_the_api(self, mock_client):
+        data = json.loads(backend_interface.generate_journal_prompts("Stressed", user_id="user-1", source="local"))
+        self.assertEqual(data["mood"], "Stressed")
+        mock_client.chat.completions.create.assert_not_called()
+        with self.assertRaises(ValueError):
+            backend_interface.get_journal_prompts("Stressed", source="elsewhere")
+
+    @patch('prompt_generator.client')
+    def test_personalize_rewords_and_falls_back(self, mock_client):
+        reworded = {"mood": "Sad", "questions": [
+            "What about losing your keys is sitting with you tonight?", "Who could you tell about this rough day?",
+            "What small comfort could you give yourself this evening?", "How did your body react when things went wrong?",
+            "What would you say to a friend who had the same day?", "What is one thing that still went okay?"]}
+        mock_client.chat.completions.create.return_value.choices[0].message.content = json.dumps(reworded)
+        result = backend_interface.get_journal_prompts("Sad", user_id="user-2", source="personalize", note="Lost my keys")
+        self.assertEqual(result.questions, tuple(reworded["questions"]))
+        user_message = mock_client.chat.completions.create.call_args.kwargs["messages"][-1]["content"]
+        self.assertIn("Lost my keys", user_message)
+
+        # An invalid answer keeps the local draw
+        mock_client.chat.completions.create.return_value.choices[0].message.content = '{"questions": []}'
+        result = backend_interface.get_journal_prompts("Sad", user_id="user-2", source="personalize")
+        self.assertTrue(result.ok)
+        self.assertNotIn(reworded["questions"][0], result.questions)
+        print("Personalize verification passed! Model rewords the local set, local set kept on failure.")
+
+if __name__ == '__main__':
+    unittest.main()
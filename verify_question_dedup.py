@@ -0,0 +1,121 @@
+import unittest
+from unittest.mock import patch
+import os
+import json
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from question_dedup import MinHasher, QuestionDedup, SimilarityIndex, get_question_dedup, similarity
+from question_bank import get_question_bank
+from prompt_schema import PromptSet
+import backend_interface
+from benchmark_dedup import measure
+
+FIRST_SET = [
+    "What made you smile today?",
+    "Who did you feel close to today?",
+    "What are three things you are grateful for today?",
+    "What is weighing on your heart right now?",
+    "What do you need most right now?",
+    "How did you take care of yourself today?",
+]
+
+def completion(mock_client, questions):
+    mock_client.chat.completions.create.return_value.choices[0].message.content = json.dumps(
+        {"mood": "Happy", "questions": questions})
+
+class TestSimilarityIndex(unittest.TestCase):
+    def test_near_duplicates_are_similar(self):
+        hasher = MinHasher()
+        sig = hasher.signature
+        self.assertEqual(sig("What made you smile today?"), sig("what made you smile, today"))
+        self.assertGreaterEqual(similarity(sig("Who did you feel close to today?"), sig("Who did you feel closest to today?")), 0.55)
+        self.assertLess(similarity(sig("What made you smile today?"), sig("What are you grateful for today?")), 0.55)
+
+    def test_filter_in_one_pass_within_and_across_sets(self):
+        index = SimilarityIndex(MinHasher(), max_questions=64)
+        kept, dropped = index.filter(FIRST_SET + ["What made you smile today, even a little?"])
+        self.assertEqual((kept, dropped), (FIRST_SET, ["What made you smile today, even a little?"]))
+
+        kept, dropped = index.filter(["Who did you feel closest to today?", "What surprised you today?"])
+        self.assertEqual((kept, dropped), (["What surprised you today?"], ["Who did you feel closest to today?"]))
+        print("\nNear-duplicate filter verification passed! Repeats dropped within and across sets.")
+
+    def test_memory_is_bounded(self):
+        dedup = QuestionDedup(max_users=2, per_user=4)
+        dedup.filter("a", FIRST_SET)
+        index = dedup._indexes["a"]
+        self.assertEqual(len(index), 4)
+        self.assertLessEqual(sum(len(bucket) for bucket in index._buckets.values()), 4 * index.bands)
+        # The oldest questions fall out and may be served again
+        self.assertEqual(dedup.filter("a", FIRST_SET[:1])[0], FIRST_SET[:1])
+
+        dedup.filter("b", FIRST_SET)
+        dedup.filter("c", FIRST_SET)
+        self.assertNotIn("a", dedup._indexes)
+        self.assertEqual(dedup.stats()["users"], 2)
+        print("Near-duplicate index bound verification passed!")
+
+    def test_filter_cost_benchmark(self):
+        result = measure(sets=50)
+        self.assertLess(result["us_per_set"], 20000)
+        self.assertGreater(result["dropped"], 0)
+        print(f"Near-duplicate filter cost: {result['us_per_set']:.0f}us per set.")
+
+class TestTopUp(unittest.TestCase):
+    def setUp(self):
+        get_question_dedup().clear()
+        get_question_bank().recent.clear()
+
+    @patch('prompt_generator.client')
+    def test_only_missing_slots_are_requested(self, mock_client):
+        completion(mock_client, FIRST_SET)
+        first = backend_interface.get_journal_prompts("Happy", user_id="user-1", source="api")
+        self.assertEqual(first.questions, tuple(FIRST_SET))
+
+        # The second set repeats two earlier questions in other words
+        second_set = ["What made you smile the most today?", "Who did you feel closest to today?",
+                      "What surprised you today?", "What are you looking forward to tomorrow?",
+                      "Which song matched your mood today?", "Where did you feel most at home today?"]
+        completion(mock_client, second_set)
+        with patch('prompt_generator.top_up_prompt', return_value=["What did you learn from a mistake this week?",
+                                                                     "What gave you energy this afternoon?"]) as top_up:
+            second = backend_interface.get_journal_prompts("Happy", user_id="user-1", source="api")
+        self.assertEqual(top_up.call_args.args[1], 2)
+        self.assertEqual(second.questions, tuple(second_set[2:]) + ("What did you learn from a mistake this week?",
+                                                                   "What gave you energy this afternoon?"))
+        self.assertEqual(mock_client.chat.completions.create.call_count, 2)
+
+        # If the top-up fails, the slots are filled from the local bank
+        with patch('prompt_generator.top_up_prompt', return_value=[]):
+            third = backend_interface.get_journal_prompts("Happy", user_id="user-1", source="api")
+        bank_questions = {question for pool in get_question_bank().moods["happy"][1] for question in pool}
+        self.assertEqual(len(third.questions), 6)
+        self.assertTrue(set(third.questions) <= bank_questions)
+        print("Top-up verification passed! Only the missing slots were requested.")
+
+    @patch('prompt_generator.client')
+    def test_user_who_has_seen_the_whole_bank(self, mock_client):
+        bank_set = PromptSet("Happy", ["Which song matched your mood today?", "Where did you feel most at home?",
+                                       "What surprised you this week?", "Who would you like to thank?",
+                                       "What are you looking forward to tomorrow?", "Which small win are you proud of?",
+                                       "What did your body enjoy today?", "When did time fly by lately?"])
+        completion(mock_client, FIRST_SET)
+        dedup = get_question_dedup()
+        sets_before = dedup.stats()["sets"]
+        with patch('prompt_generator.top_up_prompt', return_value=[]), \
+                patch.object(get_question_bank(), 'draw', return_value=bank_set):
+            sets = [backend_interface.get_journal_prompts("Happy", user_id="user-1", source="api") for _ in range(4)]
+
+        # Only the bank questions actually served are remembered, so the last two
+        # are still fresh next time; after that the model's own repeats fill the set
+        self.assertEqual(sets[1].questions, bank_set.questions[:6])
+        self.assertEqual(sets[2].questions, bank_set.questions[6:] + tuple(FIRST_SET[:4]))
+        self.assertEqual(len(dedup._indexes["user-1"]), 14)
+        self.assertEqual(sets[3].questions, tuple(FIRST_SET))
+        self.assertEqual(dedup.stats()["sets"] - sets_before, 4)
+        print("Exhausted bank verification passed! Sets stay complete.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import tempfile
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from session_store import SessionStore, SessionNotFound, SharedSessionStore
+import backend_interface
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def turn(n):
+    return [{"role": "user", "content": f"message {n}"}, {"role": "assistant", "content": f"reply {n}"}]
+
+class TestSessionStore(unittest.TestCase):
+    def test_idle_sessions_expire(self):
+        clock = FakeClock()
+        store = SessionStore(idle_ttl=60, clock=clock)
+        idle = store.open()
+        active = store.open()
+
+        clock.now += 45
+        store.append(active, *turn(1))
+        clock.now += 30
+        self.assertEqual(store.history(active), turn(1))
+        with self.assertRaises(SessionNotFound):
+            store.get(idle)
+        self.assertEqual(store.stats()["expired"], 1)
+        print("\nSession expiry verification passed! Idle session evicted, active one kept.")
+
+    def test_lru_spills_to_sqlite_and_restores(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SessionStore(max_sessions=2, spill_path=os.path.join(tmpdir, "sessions.sqlite3"))
+            first = store.open(location="London, UK")
+            store.append(first, *turn(1))
+            second = store.open()
+            third = store.open()
+
+            stats = store.stats()
+            self.assertEqual((stats["active"], stats["spilled_now"]), (2, 1))
+
+            # The oldest session comes back from disk on its next message
+            session = store.get(first)
+            self.assertEqual(session.messages, turn(1))
+            self.assertEqual(session.location, "London, UK")
+            stats = store.stats()
+            self.assertEqual((stats["restored"], stats["spilled"]), (1, 2))
+            # ...which pushed out the least recently used of the others
+            self.assertEqual(list(store._sessions), [third, first])
+            store.get(second)
+        print("Session spill verification passed! Evicted session restored from SQLite.")
+
+    def test_without_spill_evicted_sessions_are_gone(self):
+        store = SessionStore(max_sessions=1)
+        first = store.open()
+        store.open()
+        with self.assertRaises(SessionNotFound):
+            store.get(first)
+        self.assertEqual(store.stats()["dropped"], 1)
+
+    def test_memory_per_session_is_capped(self):
+        store = SessionStore(max_messages=8, max_chars=10000)
+        session_id = store.open()
+        for n in range(5):
+            store.append(session_id, *turn(n))
+        # Over 8 messages, the oldest are dropped down to 6 in one go
+        self.assertEqual(store.history(session_id), turn(2) + turn(3) + turn(4))
+
+        store = SessionStore(max_messages=100, max_chars=40)
+        session_id = store.open()
+        store.append(session_id, {"role": "user", "content": "x" * 25}, {"role": "assistant", "content": "y" * 25})
+        self.assertEqual(store.history(session_id), [{"role": "assistant", "content": "y" * 25}])
+        print("Session cap verification passed!")
+
+class TestSharedSessionStore(unittest.TestCase):
+    def test_workers_see_each_others_sessions(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "sessions.sqlite3")
+            # Two stores on one file stand in for two worker processes
+            first_worker, second_worker = SharedSessionStore(path), SharedSessionStore(path)
+            session_id = first_worker.open(location="London, UK")
+            second_worker.append(session_id, *turn(1))
+            first_worker.append(session_id, *turn(2))
+
+            self.assertEqual(second_worker.history(session_id), turn(1) + turn(2))
+            self.assertEqual(first_worker.get(session_id).location, "London, UK")
+            second_worker.close(session_id)
+            with self.assertRaises(SessionNotFound):
+                first_worker.get(session_id)
+        print("Shared session verification passed! A session opened on one worker continues on another.")
+
+    def test_limits_apply_to_the_shared_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            clock = FakeClock()
+            store = SharedSessionStore(os.path.join(tmpdir, "sessions.sqlite3"), max_sessions=2, idle_ttl=60,
+                                       max_messages=4, clock=clock)
+            idle = store.open()
+            clock.now += 45
+            active = store.open()
+            for n in range(3):
+                store.append(active, *turn(n))
+            # Over 4 messages, the oldest are dropped down to 3, as in SessionStore
+            self.assertEqual(store.history(active), turn(1)[1:] + turn(2))
+
+            clock.now += 30
+            store.open()
+            with self.assertRaises(SessionNotFound):
+                store.get(idle)
+            store.open()
+            stats = store.stats()
+            self.assertEqual((stats["active"], stats["expired"], stats["dropped"]), (2, 1, 1))
+
+        with self.assertRaises(ValueError):
+            backend_interface.enable_session_store(shared=True)
+
+class TestSessionApi(unittest.TestCase):
+    def setUp(self):
+        backend_interface._chatbot_instance = None
+        backend_interface.enable_session_store()
+
+    def tearDown(self):
+        backend_interface._chatbot_instance = None
+
+    @patch('chatbot_agent.OpenAI')
+    def test_send_keeps_history_server_side(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        replies = iter(["That sounds hard.", "What helped last time?"])
+        def create(**kwargs):
+            response = MagicMock()
+            response.choices[0].message.content = next(replies)
+            return response
+        mock_client.chat.completions.create.side_effect = create
+
+        session_id = backend_interface.open_session(location="Test City")
+        backend_interface.send(session_id, "I'm stressed about exams.")
+        reply = backend_interface.send(session_id, "I can't sleep.")
+
+        self.assertEqual(reply, "What helped last time?")
+        messages = mock_client.chat.completions.create.call_args.kwargs["messages"]
+        contents = [m["content"] for m in messages]
+        self.assertIn("I'm stressed about exams.", contents)
+        self.assertIn("That sounds hard.", contents)
+        self.assertEqual(contents[-1], "I can't sleep.")
+        self.assertTrue(any("Test City" in c for c in contents))
+        self.assertEqual(len(backend_interface.get_session_history(session_id)), 4)
+        print("Session API verification passed! History sent from the server-side session.")
+
+    @patch('chatbot_agent.OpenAI')
+    def test_failed_replies_are_not_recorded(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = Exception("boom")
+
+        session_id = backend_interface.open_session()
+        self.assertEqual(backend_interface.send(session_id, "Hello, I had a rough day."), "Error generating response: boom")
+        self.assertEqual("".join(backend_interface.send_stream(session_id, "Hello, I had a rough day.")),
+                         "Error generating response: boom")
+        self.assertEqual(backend_interface.get_session_history(session_id), [])
+
+        with self.assertRaises(KeyError):
+            backend_interface.send("no-such-session", "Hello")
+
+    @patch('chatbot_agent.OpenAI')
+    def test_stream_records_turn_when_consumed(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        chunk = MagicMock()
+        chunk.choices[0].delta.content = "I hear you."
+        mock_client.chat.completions.create.return_value = iter([chunk])
+
+        session_id = backend_interface.open_session()
+        stream = backend_interface.send_stream(session_id, "Long week.")
+        self.assertEqual(backend_interface.get_session_history(session_id), [])
+        self.assertEqual("".join(stream), "I hear you.")
+        self.assertEqual(backend_interface.get_session_history(session_id),
+                         [{"role": "user", "content": "Long week."}, {"role": "assistant", "content": "I hear you."}])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import os
+import json
+import subprocess
+import sys
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from stub_openai_server import StubOpenAIServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Cold-start budgets; generous enough for a slow CI machine, tight enough to
+# catch an eager import of openai or a client built at import time.
+IMPORT_BUDGET = 0.25
+FIRST_CALL_OVERHEAD_BUDGET = 2.0
+
+COLD_START_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import backend_interface
+import_time = time.perf_counter() - start
+heavy = [m for m in ("openai", "httpx", "chatbot_agent", "prompt_generator") if m in sys.modules]
+
+start = time.perf_counter()
+first = backend_interface.{call}
+first_call = time.perf_counter() - start
+start = time.perf_counter()
+backend_interface.{call}
+second_call = time.perf_counter() - start
+print(json.dumps({{"import": import_time, "heavy": heavy, "first": first_call, "second": second_call, "result": first}}))
+"""
+
+def cold_start(call, base_url):
+    env = dict(os.environ, OPENAI_BASE_URL=base_url, PROMPT_CACHE_PATH="")
+    output = subprocess.run(
+        [sys.executable, "-c", COLD_START_SCRIPT.format(call=call)],
+        cwd=HERE, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+class TestStartup(unittest.TestCase):
+    def test_cold_start_against_stub(self):
+        latency = 0.05
+        with StubOpenAIServer(latency=latency) as server:
+            for call in ['generate_journal_prompts("Happy")', 'process_chat_message("I had a long day at work.")']:
+                stats = cold_start(call, server.url)
+                # The first call pays for imports and client setup; the second shows the steady state
+                overhead = stats["first"] - stats["second"]
+                print(f"\n{call}: import={stats['import'] * 1000:.1f}ms first call={stats['first'] * 1000:.0f}ms "
+                      f"second call={stats['second'] * 1000:.0f}ms (stub latency {latency * 1000:.0f}ms)")
+
+                self.assertEqual(stats["heavy"], [])
+                self.assertLess(stats["import"], IMPORT_BUDGET)
+                self.assertLess(overhead, FIRST_CALL_OVERHEAD_BUDGET)
+                self.assertNotIn("error", stats["result"].lower())
+
+    def test_warm_up_builds_clients_without_requests(self):
+        with StubOpenAIServer() as server:
+            env = dict(os.environ, OPENAI_BASE_URL=server.url)
+            script = "import backend_interface, json; print(json.dumps(backend_interface.warm_up()))"
+            output = subprocess.run([sys.executable, "-c", script], cwd=HERE, env=env,
+                                    capture_output=True, text=True, check=True).stdout
+            timings = json.loads(output.strip().splitlines()[-1])
+            self.assertEqual(set(timings), {"chat", "journal_prompts"})
+            self.assertEqual(server.requests, 0)
+            print("Warm-up verification passed! Clients ready, no API requests made.")
+
+if __name__ == '__main__':
+    unittest.main()
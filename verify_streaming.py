@@ -0,0 +1,96 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from chatbot_agent import MentalHealthChatbot
+
+def make_chunk(text):
+    chunk = MagicMock()
+    chunk.choices[0].delta.content = text
+    return chunk
+
+class TestStreamingResponse(unittest.TestCase):
+    @patch('chatbot_agent.OpenAI')
+    def test_stream_yields_deltas(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.return_value = iter(
+            [make_chunk("  That"), make_chunk(None), make_chunk(" sounds"), make_chunk(" heavy.")]
+        )
+
+        bot = MentalHealthChatbot()
+        timings = {}
+        deltas = list(bot.get_response_stream("I feel tired", timings=timings))
+
+        self.assertEqual(deltas, ["That", " sounds", " heavy."])
+        self.assertIn("first_token", timings)
+        self.assertGreaterEqual(timings["total"], timings["first_token"])
+
+        # Verify streaming was requested
+        _, kwargs = mock_client.chat.completions.create.call_args
+        self.assertTrue(kwargs["stream"])
+        self.assertEqual(kwargs["messages"][-1]["content"], "I feel tired")
+
+        print("\nStreaming verification passed! Deltas and timings reported.")
+
+    @patch('chatbot_agent.OpenAI')
+    def test_joined_stream_matches_stripped_reply(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.return_value = iter(
+            [make_chunk("\nThat "), make_chunk(" "), make_chunk("sounds heavy.\n"), make_chunk("\n")]
+        )
+
+        bot = MentalHealthChatbot()
+        deltas = list(bot.get_response_stream("I feel tired"))
+
+        # Inner whitespace is kept, the reply's trailing whitespace never goes out
+        self.assertEqual("".join(deltas), "That  sounds heavy.")
+        self.assertEqual(deltas, ["That", "  sounds heavy."])
+
+    @patch('chatbot_agent.OpenAI')
+    def test_stream_error_before_first_token(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = Exception("boom")
+
+        bot = MentalHealthChatbot()
+        timings = {}
+        deltas = list(bot.get_response_stream("Hello, I had a rough day.", timings=timings))
+
+        self.assertEqual(deltas, ["Error generating response: boom"])
+        self.assertNotIn("first_token", timings)
+        self.assertIn("total", timings)
+
+        print("Streaming error verification passed! Error matches get_response.")
+
+    @patch('chatbot_agent.OpenAI')
+    def test_stream_breaks_partway(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+
+        def broken_stream():
+            yield make_chunk("I hear you")
+            raise ConnectionError("connection reset")
+
+        mock_client.chat.completions.create.return_value = broken_stream()
+
+        bot = MentalHealthChatbot()
+        deltas = list(bot.get_response_stream("Hello, I had a rough day."))
+
+        # Partial text is kept and the error is appended
+        self.assertEqual(deltas[0], "I hear you")
+        self.assertEqual(len(deltas), 2)
+        self.assertIn("Error generating response: connection reset", deltas[1])
+
+        print("Partial stream verification passed! Partial text kept.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import json
+
+# Mock env var
+os.environ["OPENAI_API_KEY"] = "fake-key"
+
+from topic_gate import CORPUS_PATH, TopicGate, get_default_gate, has_risk_language
+from chatbot_agent import MentalHealthChatbot
+
+REPLAY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "topic_replay.jsonl")
+
+class TestTopicGate(unittest.TestCase):
+    def test_accuracy_and_savings_on_replay_log(self):
+        # The replay log is held out: the gate is trained only on data/topic_corpus.jsonl
+        gate = TopicGate.from_corpus()
+        with open(REPLAY_PATH, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+        correct = gated = false_gates = 0
+        for row in rows:
+            decision = gate.check(row["text"])
+            actual = row["label"] == "off_topic"
+            correct += decision.off_topic == actual
+            gated += decision.off_topic
+            false_gates += decision.off_topic and not actual
+
+        accuracy = correct / len(rows)
+        saved = gated / len(rows)
+        print(f"\nTopic gate on {len(rows)} replayed requests: accuracy={accuracy:.3f}, "
+              f"API calls saved={saved:.1%}, on-topic messages wrongly gated={false_gates}")
+
+        # Gating a real user's message is the costly mistake, so none are allowed here
+        self.assertEqual(false_gates, 0)
+        self.assertGreaterEqual(accuracy, 0.9)
+
+    def test_emotion_vetoes_gate(self):
+        gate = get_default_gate()
+        self.assertTrue(gate.check("What is the capital of France?").off_topic)
+        self.assertFalse(gate.check("I can't fix this bug in my python code and it's making me panic.").off_topic)
+        self.assertFalse(gate.check("Who are you?").off_topic)
+        print("Topic gate emotion veto verification passed!")
+
+    def test_risk_language_vetoes_gate(self):
+        # Self-harm method questions read like trivia; the veto must not depend on the training rows
+        with open(CORPUS_PATH, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        untaught = TopicGate.train([(r["text"], r["label"] == "off_topic") for r in rows if not has_risk_language(r["text"])])
+        texts = [
+            "How many pills does it take to overdose?", "how much tylenol is a lethal dose",
+            "whats the best way to tie a noose", "what is the fastest painless way to go",
+            "how high does a building need to be to not survive a fall", "how do i buy a gun",
+            "What is the lethal dose of sertraline?", "How do I take enough sleeping pills to not wake up?",
+        ]
+        for gate in (get_default_gate(), untaught):
+            for text in texts:
+                self.assertFalse(gate.check(text).off_topic, text)
+        print("Topic gate risk veto verification passed!")
+
+    @patch('chatbot_agent.OpenAI')
+    def test_gate_passes_risk_questions_without_detector_or_router(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.create.return_value.choices[0].message.content = "I'm worried about you."
+
+        # Even with the crisis detector and the router's exemption both off, the gate lets these through
+        bot = MentalHealthChatbot(summarize_history=False, detect_crisis=False, route_models=False)
+        self.assertEqual(bot.get_response("What is the lethal dose of sertraline?"), "I'm worried about you.")
+        self.assertEqual(bot.get_response("how do i buy a gun"), "I'm worried about you.")
+        self.assertEqual(mock_client.chat.completions.create.call_count, 2)
+
+    @patch('chatbot_agent.OpenAI')
+    def test_chatbot_redirects_without_api_call(self, mock_openai):
+        # Setup mock
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+
+        bot = MentalHealthChatbot()
+        response = bot.get_response("Write a python function to sort a list.")
+
+        self.assertIn("I'm here to support your well-being", response)
+        self.assertIn("coding", response)
+        mock_client.chat.completions.create.assert_not_called()
+
+        print("Off-topic redirect verification passed! No API call made.")
+
+if __name__ == '__main__':
+    unittest.main()